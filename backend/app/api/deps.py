@@ -7,6 +7,8 @@ from sqlalchemy.orm import Session
 from app.core import security
 from app.core.database import get_db
 from app.models.user import User
+from app.services.principal_cache import Principal, principal_cache, principal_from_token
+from app.services.token_revocation import token_revocation
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
@@ -25,7 +27,7 @@ def get_current_user(
     )
 
     payload = security.verify_token(token, token_type="access")
-    if not payload:
+    if not payload or token_revocation.is_revoked(db, payload.get("jti")):
         raise credentials_exception
 
     user_id = payload.get("sub")
@@ -39,15 +41,53 @@ def get_current_user(
     return user
 
 
+def get_current_principal(
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme),
+) -> Principal:
+    """
+    Resolve apenas os campos de autorização do usuário autenticado: das claims
+    assinadas no token, quando a versão confere, ou do cache por
+    (user_id, iat do token); nos dois casos não há consulta a users.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+    payload = security.verify_token(token, token_type="access")
+    if not payload or token_revocation.is_revoked(db, payload.get("jti")):
+        raise credentials_exception
+
+    user_id = payload.get("sub")
+    if not user_id:
+        raise credentials_exception
+
+    principal = principal_from_token(db, int(user_id), payload)
+    if principal is not None:
+        return principal
+
+    issued_at = payload.get("iat")
+    principal = principal_cache.get(int(user_id), issued_at)
+    if principal is None:
+        principal = Principal.load(db, int(user_id))
+        if not principal:
+            raise credentials_exception
+        principal_cache.put(issued_at, principal)
+
+    return principal
+
+
 def get_current_user_optional(
     db: Session = Depends(get_db),
     token: Optional[str] = Depends(oauth2_scheme_optional),
-) -> Optional[User]:
+) -> Optional[Principal]:
     """Resolve o usuário autenticado, permitindo anônimo quando não há token."""
     if not token:
         return None
     try:
-        return get_current_user(db=db, token=token)
+        return get_current_principal(db=db, token=token)
     except HTTPException:
         return None
 
@@ -64,9 +104,21 @@ def get_current_active_user(
     return current_user
 
 
+def get_current_active_principal(
+    current_user: Principal = Depends(get_current_principal),
+) -> Principal:
+    """Como get_current_active_user, sem carregar a linha completa de users."""
+    if not current_user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Inactive user",
+        )
+    return current_user
+
+
 def get_current_superuser(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: Principal = Depends(get_current_principal),
+) -> Principal:
     """Restringe o acesso a usuários superusuários (diretório/coordenação)."""
     if not current_user.is_superuser:
         raise HTTPException(
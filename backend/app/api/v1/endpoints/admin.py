@@ -1,27 +1,35 @@
 from datetime import datetime, timedelta
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.api import deps
-from app.core.database import get_db
+from app.core.database import SessionLocal, get_db
+from app.core.logging import get_logger
 from app.models.repository import Repository
 from app.models.proposal import Proposal
 from app.models.issue import Issue
 from app.models.user import User
+from app.services.principal_cache import Principal
+from app.models.vote import VotingSession
 from app.schemas.repository import Repository as RepositorySchema, RepositoryUpdate
 from app.schemas.proposal import Proposal as ProposalSchema, ProposalUpdate
 from app.schemas.issue import Issue as IssueSchema, IssueUpdate
+from app.schemas.voting import TurnoutSeries
+from app.services.turnout import TURNOUT_GRANULARITIES, get_turnout_series
+from app.services.vote_export import EXPORT_FORMATS, FINALIZED_STATUSES, export_votes
 
 router = APIRouter()
+logger = get_logger("admin")
 
 
 @router.get("/metrics")
 def get_admin_metrics(
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser),
 ):
     """Retorna metricas basicas para o painel administrativo."""
     return {
@@ -35,7 +43,7 @@ def get_admin_metrics(
 @router.get("/repositories", response_model=List[RepositorySchema])
 def admin_list_repositories(
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser),
 ):
     """Lista todos os repositorios para o administrador."""
     return db.query(Repository).order_by(Repository.created_at.desc()).all()
@@ -46,7 +54,7 @@ def admin_update_repository(
     repository_id: int,
     payload: RepositoryUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser),
 ):
     """Atualiza os dados de um repositorio sem restricao de autoria."""
     repository = db.query(Repository).filter(Repository.id == repository_id).first()
@@ -65,7 +73,7 @@ def admin_update_repository(
 @router.get("/proposals", response_model=List[ProposalSchema])
 def admin_list_proposals(
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser),
 ):
     """Lista todas as propostas para o administrador."""
     return db.query(Proposal).order_by(Proposal.created_at.desc()).all()
@@ -76,7 +84,7 @@ def admin_update_proposal(
     proposal_id: int,
     payload: ProposalUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser),
 ):
     """Atualiza os dados de uma proposta sem restricao de autoria."""
     proposal = db.query(Proposal).filter(Proposal.id == proposal_id).first()
@@ -95,7 +103,7 @@ def admin_update_proposal(
 @router.get("/issues", response_model=List[IssueSchema])
 def admin_list_issues(
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser),
 ):
     """Lista todas as demandas (issues) para o administrador."""
     return db.query(Issue).order_by(Issue.created_at.desc()).all()
@@ -106,7 +114,7 @@ def admin_update_issue(
     issue_id: int,
     payload: IssueUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser),
 ):
     """Atualiza os dados de uma demanda sem restricao de autoria."""
     issue = db.query(Issue).filter(Issue.id == issue_id).first()
@@ -125,7 +133,7 @@ def admin_update_issue(
 @router.get("/activity")
 def get_admin_activity(
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser),
 ):
     """Retorna informa��es resumidas de atividade recente para o painel."""
     week_ago = datetime.utcnow() - timedelta(days=7)
@@ -145,3 +153,84 @@ def get_admin_activity(
         "new_users_week": new_users_week,
         "new_repositories_week": new_repositories_week,
     }
+
+
+@router.get("/voting-sessions/{session_id}/turnout", response_model=TurnoutSeries)
+def admin_voting_turnout(
+    session_id: int,
+    granularity: str = Query("minute", description="minute ou hour"),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(deps.get_current_superuser),
+):
+    """Comparecimento ao longo do tempo: votos por intervalo, acumulado e quebra por nivel."""
+    if granularity not in TURNOUT_GRANULARITIES:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unsupported granularity. Use one of: {', '.join(TURNOUT_GRANULARITIES)}",
+        )
+    session = db.query(VotingSession).filter(VotingSession.id == session_id).first()
+    if not session:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Voting session not found")
+    return get_turnout_series(db, session, granularity)
+
+
+@router.get("/votes/export")
+def admin_export_votes(
+    session_id: Optional[int] = Query(None, description="Sessao de votacao encerrada"),
+    since: Optional[datetime] = Query(None, description="Votos a partir desta data"),
+    until: Optional[datetime] = Query(None, description="Votos antes desta data"),
+    format: str = Query("ndjson", description="ndjson ou csv"),
+    gzip: bool = Query(False, description="Comprime a saida com gzip"),
+    include_voters: bool = Query(False, description="Inclui user_id de cada cedula"),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(deps.get_current_superuser),
+):
+    """Exporta em streaming as cedulas de sessoes encerradas, com checksum na ultima linha."""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unsupported format. Use one of: {', '.join(EXPORT_FORMATS)}",
+        )
+    if session_id is None and since is None and until is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Provide session_id or a date range",
+        )
+    if session_id is not None:
+        session_status = (
+            db.query(VotingSession.status).filter(VotingSession.id == session_id).scalar()
+        )
+        if session_status is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Voting session not found")
+        if session_status not in FINALIZED_STATUSES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Only closed voting sessions can be exported",
+            )
+
+    filename = f"votes-{session_id or 'range'}.{format}" + (".gz" if gzip else "")
+    logger.info(
+        "Vote export requested by %s (session=%s, since=%s, until=%s, format=%s)",
+        current_user.username,
+        session_id,
+        since,
+        until,
+        format,
+    )
+    # Libera a conexao do pool: o gerador abre a propria sessao e pode durar minutos.
+    db.commit()
+    return StreamingResponse(
+        export_votes(
+            SessionLocal,
+            fmt=format,
+            session_id=session_id,
+            since=since,
+            until=until,
+            include_voters=include_voters,
+            compress=gzip,
+        ),
+        media_type="application/gzip" if gzip else (
+            "text/csv" if format == "csv" else "application/x-ndjson"
+        ),
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -1,19 +1,23 @@
+import math
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
 from app.api import deps
 from app.core import security
-from app.core.config import settings  # noqa: F401  (usado se precisar em breve)
 from app.core.database import get_db
 from app.core.logging import get_logger
 from app.models.user import User as UserModel, UserLevel
 from app.schemas.auth import AuthResponse, Token, RefreshTokenRequest
 from app.schemas.user import User as UserSchema, UserCreate
+from app.services.login_throttle import login_throttle
+from app.services.principal_cache import access_token_data
+from app.services.token_revocation import token_revocation
 
 logger = get_logger("auth")
 router = APIRouter()
@@ -32,49 +36,112 @@ def _build_auth_response(
     )
 
 
-@router.post("/login", response_model=AuthResponse)
-async def login(
-    form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
-):
-    """Endpoint de login com username e senha."""
+def _raise_throttled(retry_after: float) -> None:
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many attempts, try again later",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def _client_ip(request: Request) -> Optional[str]:
+    return request.client.host if request.client else None
+
+
+def _find_login_user(db: Session, login: str) -> Optional[Tuple[UserModel, str, str, bool]]:
+    """Usuario e os campos lidos antes do bcrypt (o commit expira o objeto)."""
     user = (
         db.query(UserModel)
         .filter(
             or_(
-                UserModel.username == form_data.username,
-                UserModel.email == form_data.username,
+                UserModel.username == login,
+                UserModel.email == login,
             )
         )
         .first()
     )
+    found = (user, user.username, user.hashed_password, user.is_active) if user else None
+    # Devolve a conexao ao pool enquanto o bcrypt roda fora do event loop.
+    db.commit()
+    return found
+
+
+def _record_login(db: Session, user: UserModel) -> None:
+    user.last_login = datetime.utcnow()
+    db.commit()
+    db.refresh(user)
+
+
+def _username_or_email_taken(db: Session, payload: UserCreate) -> bool:
+    existing_user = (
+        db.query(UserModel.id)
+        .filter(
+            or_(
+                UserModel.username == payload.username,
+                UserModel.email == payload.email,
+            )
+        )
+        .first()
+    )
+    db.commit()
+    return existing_user is not None
+
 
-    if not user:
+def _save_new_user(db: Session, user: UserModel) -> None:
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+
+
+@router.post("/login", response_model=AuthResponse)
+async def login(
+    request: Request,
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: Session = Depends(get_db),
+):
+    """
+    Endpoint de login com username e senha. Consultas e commits rodam no
+    threadpool; no event loop fica so a espera do bcrypt no pool de hashing.
+    """
+    client_ip = _client_ip(request)
+    retry_after = await login_throttle.check_login(client_ip, form_data.username)
+    if retry_after:
+        logger.warning("Login attempt throttled: %s from %s", form_data.username, client_ip)
+        _raise_throttled(retry_after)
+
+    found = await run_in_threadpool(_find_login_user, db, form_data.username)
+
+    if not found:
         logger.warning(
             "Login attempt failed - user not found: %s",
             form_data.username,
         )
+        await login_throttle.record_login_failure(client_ip, form_data.username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    if not user.is_active:
+    user, username, hashed_password, is_active = found
+    if not is_active:
         logger.warning(
             "Login attempt failed - inactive user: %s",
-            user.username,
+            username,
         )
+        # Conta como falha: senao o limitador nao cobre contas desativadas.
+        await login_throttle.record_login_failure(client_ip, form_data.username)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Inactive user",
         )
 
-    if not security.verify_password(form_data.password, user.hashed_password):
+    if not await security.verify_password_async(form_data.password, hashed_password):
         logger.warning(
             "Login attempt failed - incorrect password: %s",
-            user.username,
+            username,
         )
+        await login_throttle.record_login_failure(client_ip, form_data.username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -82,12 +149,10 @@ async def login(
         )
 
     # Atualizar último login
-    user.last_login = datetime.utcnow()
-    db.commit()
-    db.refresh(user)
+    await run_in_threadpool(_record_login, db, user)
 
     # Criar tokens
-    access_token = security.create_access_token(data={"sub": str(user.id)})
+    access_token = security.create_access_token(data=access_token_data(user))
     refresh_token = security.create_refresh_token(data={"sub": str(user.id)})
 
     logger.info("User logged in successfully: %s", user.username)
@@ -101,21 +166,15 @@ async def login(
     status_code=status.HTTP_201_CREATED,
 )
 async def register(
+    request: Request,
     payload: UserCreate,
     db: Session = Depends(get_db),
 ):
-    existing_user = (
-        db.query(UserModel)
-        .filter(
-            or_(
-                UserModel.username == payload.username,
-                UserModel.email == payload.email,
-            )
-        )
-        .first()
-    )
+    retry_after = await login_throttle.check_register(_client_ip(request))
+    if retry_after:
+        _raise_throttled(retry_after)
 
-    if existing_user:
+    if await run_in_threadpool(_username_or_email_taken, db, payload):
         logger.warning(
             "Registration attempt failed - user already exists: %s",
             payload.username,
@@ -125,7 +184,7 @@ async def register(
             detail="Username or email already registered",
         )
 
-    hashed_password = security.hash_password(payload.password)
+    hashed_password = await security.hash_password_async(payload.password)
     user = UserModel(
         email=payload.email,
         username=payload.username,
@@ -135,12 +194,9 @@ async def register(
         is_verified=False,
         is_active=True,
     )
+    await run_in_threadpool(_save_new_user, db, user)
 
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-
-    access_token = security.create_access_token(data={"sub": str(user.id)})
+    access_token = security.create_access_token(data=access_token_data(user))
     refresh_token = security.create_refresh_token(data={"sub": str(user.id)})
 
     logger.info("User registered successfully: %s", user.username)
@@ -149,7 +205,7 @@ async def register(
 
 
 @router.post("/refresh", response_model=Token)
-async def refresh_token(
+def refresh_token(
     payload: RefreshTokenRequest,
     db: Session = Depends(get_db),
 ):
@@ -159,7 +215,7 @@ async def refresh_token(
         token_type="refresh",
     )
 
-    if not token_payload:
+    if not token_payload or token_revocation.is_revoked(db, token_payload.get("jti")):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid refresh token",
@@ -177,7 +233,7 @@ async def refresh_token(
         )
 
     # Criar novo access token
-    access_token = security.create_access_token(data={"sub": str(user.id)})
+    access_token = security.create_access_token(data=access_token_data(user))
 
     logger.info("Token refreshed for user: %s", user.username)
 
@@ -197,10 +253,19 @@ async def get_current_user(
 
 
 @router.post("/logout")
-async def logout(
+def logout(
+    payload: Optional[RefreshTokenRequest] = None,
+    db: Session = Depends(get_db),
+    token: str = Depends(deps.oauth2_scheme),
     current_user: UserModel = Depends(deps.get_current_user),
 ):
-    """Endpoint de logout (invalida tokens no client)."""
+    """Endpoint de logout: revoga o access token e, se enviado, o refresh token."""
+    token_revocation.revoke(db, security.verify_token(token, token_type="access"))
+    if payload is not None:
+        refresh_payload = security.verify_token(payload.refresh_token, token_type="refresh")
+        if refresh_payload and refresh_payload.get("sub") == str(current_user.id):
+            token_revocation.revoke(db, refresh_payload)
+    db.commit()
     logger.info("User logged out: %s", current_user.username)
     return {"message": "Successfully logged out"}
 
@@ -0,0 +1,129 @@
+from datetime import datetime
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.api import deps
+from app.core.database import get_db
+from app.core.logging import get_logger
+from app.models.delegation import VoteDelegation
+from app.models.repository import Repository as RepositoryModel
+from app.models.user import User as UserModel, UserPermissionsMixin
+from app.schemas.delegation import Delegation, DelegationCreate
+from app.services.delegation import DelegationGraph
+
+router = APIRouter()
+logger = get_logger("delegations")
+
+
+def _require_voter(user: UserPermissionsMixin) -> None:
+    if not user.can_vote:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Seu nivel de acesso nao permite votar nem delegar.",
+        )
+
+
+@router.get("/", response_model=List[Delegation])
+def list_my_delegations(
+    db: Session = Depends(get_db),
+    current_user=Depends(deps.get_current_active_principal),
+):
+    """Delegacoes feitas pelo usuario, uma por repositorio."""
+    return (
+        db.query(VoteDelegation)
+        .filter(VoteDelegation.delegator_id == current_user.id)
+        .order_by(VoteDelegation.repository_id)
+        .all()
+    )
+
+
+@router.put("/{repository_id}", response_model=Delegation)
+def set_delegation(
+    repository_id: int,
+    payload: DelegationCreate,
+    db: Session = Depends(get_db),
+    current_user=Depends(deps.get_current_active_principal),
+):
+    """Delega o voto do usuario nas votacoes do repositorio (substitui a anterior)."""
+    _require_voter(current_user)
+
+    repository = db.query(RepositoryModel).filter(RepositoryModel.id == repository_id).first()
+    if not repository or not deps.check_can_view_repository(current_user, repository):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Repositorio nao encontrado."
+        )
+
+    if payload.delegate_id == current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Nao e possivel delegar o voto para si mesmo.",
+        )
+    delegate = db.query(UserModel).filter(UserModel.id == payload.delegate_id).first()
+    if not delegate or not delegate.is_active or not delegate.can_vote:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="O delegado precisa ser um filiado ativo com direito a voto.",
+        )
+
+    edges = dict(
+        db.query(VoteDelegation.delegator_id, VoteDelegation.delegate_id)
+        .filter(VoteDelegation.repository_id == repository_id)
+        .all()
+    )
+    edges.pop(current_user.id, None)
+    if DelegationGraph(edges).would_create_cycle(current_user.id, payload.delegate_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Esta delegacao criaria um ciclo de delegacoes.",
+        )
+
+    delegation = (
+        db.query(VoteDelegation)
+        .filter(
+            VoteDelegation.delegator_id == current_user.id,
+            VoteDelegation.repository_id == repository_id,
+        )
+        .first()
+    )
+    if delegation is None:
+        delegation = VoteDelegation(
+            repository_id=repository_id,
+            delegator_id=current_user.id,
+        )
+    delegation.delegate_id = payload.delegate_id
+    delegation.updated_at = datetime.utcnow()
+    db.add(delegation)
+    db.commit()
+    db.refresh(delegation)
+
+    logger.info(
+        "User %s delegated votes in repository %s to user %s",
+        current_user.id,
+        repository_id,
+        payload.delegate_id,
+    )
+    return delegation
+
+
+@router.delete("/{repository_id}", status_code=status.HTTP_204_NO_CONTENT)
+def revoke_delegation(
+    repository_id: int,
+    db: Session = Depends(get_db),
+    current_user=Depends(deps.get_current_active_principal),
+):
+    """Revoga a delegacao do usuario no repositorio."""
+    deleted = (
+        db.query(VoteDelegation)
+        .filter(
+            VoteDelegation.delegator_id == current_user.id,
+            VoteDelegation.repository_id == repository_id,
+        )
+        .delete(synchronize_session=False)
+    )
+    if not deleted:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Delegacao nao encontrada."
+        )
+    db.commit()
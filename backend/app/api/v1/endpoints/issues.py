@@ -10,7 +10,8 @@ from app.core.logging import get_logger
 from app.models.issue import Issue as IssueModel, IssuePriority, IssueStatus, IssueType
 from app.models.repository import Repository as RepositoryModel, RepositoryVisibility
 from app.schemas.issue import Issue as IssueSchema, IssueCreate, IssueUpdate
-from app.models.user import User as UserModel
+from app.services.principal_cache import Principal
+from app.services.counters import increment_counter
 
 router = APIRouter()
 logger = get_logger("issues")
@@ -60,7 +61,7 @@ def list_issues(
     repository_id: Optional[int] = Query(None),
     search: Optional[str] = Query(None),
     db: Session = Depends(get_db),
-    current_user: Optional[UserModel] = Depends(deps.get_current_user_optional),
+    current_user: Optional[Principal] = Depends(deps.get_current_user_optional),
 ):
     """Lista demandas respeitando visibilidade dos repositórios."""
     query = db.query(IssueModel).join(
@@ -96,7 +97,7 @@ def list_issues(
 def get_issue(
     issue_id: int,
     db: Session = Depends(get_db),
-    current_user: Optional[UserModel] = Depends(deps.get_current_user_optional),
+    current_user: Optional[Principal] = Depends(deps.get_current_user_optional),
 ):
     issue = db.query(IssueModel).filter(IssueModel.id == issue_id).first()
     if not issue:
@@ -157,7 +158,7 @@ def create_issue(
     )
 
     db.add(issue)
-    repository.issues_count = (repository.issues_count or 0) + 1
+    increment_counter(db, RepositoryModel, repository.id, "issues_count")
     db.commit()
     db.refresh(issue)
 
@@ -199,9 +200,8 @@ def delete_issue(
         )
 
     db.delete(issue)
-    if repository and repository.issues_count and repository.issues_count > 0:
-        repository.issues_count -= 1
-        db.add(repository)
+    if repository:
+        increment_counter(db, RepositoryModel, repository.id, "issues_count", -1, floor=0)
     db.commit()
 
 
@@ -10,7 +10,8 @@ from app.core.logging import get_logger
 from app.models.proposal import Proposal as ProposalModel, ProposalStatus
 from app.models.repository import Repository as RepositoryModel, RepositoryVisibility
 from app.schemas.proposal import Proposal as ProposalSchema, ProposalUpdate
-from app.models.user import User as UserModel
+from app.services.principal_cache import Principal
+from app.services.counters import increment_counter
 
 router = APIRouter()
 logger = get_logger("proposals")
@@ -22,7 +23,7 @@ def list_proposals(
     repository_id: Optional[int] = Query(None, description="Filtrar por repositório"),
     search: Optional[str] = Query(None, description="Busca por título ou resumo"),
     db: Session = Depends(get_db),
-    current_user: Optional[UserModel] = Depends(deps.get_current_user_optional),
+    current_user: Optional[Principal] = Depends(deps.get_current_user_optional),
 ):
     """Retorna propostas com filtros opcionais respeitando a visibilidade do repositório."""
     query = db.query(ProposalModel).join(
@@ -62,7 +63,7 @@ def list_proposals(
 def get_proposal(
     proposal_id: int,
     db: Session = Depends(get_db),
-    current_user: Optional[UserModel] = Depends(deps.get_current_user_optional),
+    current_user: Optional[Principal] = Depends(deps.get_current_user_optional),
 ):
     """Retorna detalhes de uma proposta específica."""
     proposal = db.query(ProposalModel).filter(ProposalModel.id == proposal_id).first()
@@ -118,9 +119,8 @@ def delete_proposal(
         )
 
     db.delete(proposal)
-    if repository and repository.proposals_count and repository.proposals_count > 0:
-        repository.proposals_count -= 1
-        db.add(repository)
+    if repository:
+        increment_counter(db, RepositoryModel, repository.id, "proposals_count", -1, floor=0)
     db.commit()
 
 
@@ -17,6 +17,11 @@ from app.models.proposal import (
 )
 from app.models.vote import VotingMethod, VotingOption, VotingSession, VotingStatus
 from app.models.user import User as UserModel
+from app.services.principal_cache import Principal
+from app.services.counters import increment_counter
+from app.services.electorate import snapshot_electorate
+from app.services.session_cache import active_session_cache
+from app.services.voting_scheduler import voting_scheduler
 from app.schemas.repository import (
     Repository as RepositorySchema,
     RepositoryCreate,
@@ -59,6 +64,9 @@ def _create_voting_session(proposal: ProposalModel) -> VotingSession:
 
     proposal.voting_started_at = start_at
     proposal.voting_ended_at = end_at
+    initial_status = (
+        VotingStatus.SCHEDULED if start_at > datetime.utcnow() else VotingStatus.ACTIVE
+    )
 
     session = VotingSession(
         proposal_id=proposal.id,
@@ -69,7 +77,7 @@ def _create_voting_session(proposal: ProposalModel) -> VotingSession:
         quorum_required=proposal.quorum_required or 0,
         starts_at=start_at,
         ends_at=end_at,
-        status=VotingStatus.ACTIVE,
+        status=initial_status,
     )
     session.options = [
         VotingOption(
@@ -80,6 +88,7 @@ def _create_voting_session(proposal: ProposalModel) -> VotingSession:
         )
         for index, option in enumerate(DEFAULT_SIMPLE_OPTIONS)
     ]
+    active_session_cache.invalidate(proposal.id)
     return session
 
 
@@ -142,7 +151,7 @@ def list_repositories(
         description="Filtro por nome ou descrição",
     ),
     db: Session = Depends(get_db),
-    current_user: Optional[UserModel] = Depends(deps.get_current_user_optional),
+    current_user: Optional[Principal] = Depends(deps.get_current_user_optional),
 ):
     """Lista repositórios ativos com filtro opcional e visibilidade por papel."""
     query = db.query(RepositoryModel).filter(RepositoryModel.is_active.is_(True))
@@ -174,7 +183,7 @@ def list_repositories(
 def get_repository(
     repository_id: int,
     db: Session = Depends(get_db),
-    current_user: Optional[UserModel] = Depends(deps.get_current_user_optional),
+    current_user: Optional[Principal] = Depends(deps.get_current_user_optional),
 ):
     """Retorna detalhes de um repositório específico."""
     repository = (
@@ -344,12 +353,20 @@ def create_proposal(
     db.flush()
 
     voting_session = _create_voting_session(proposal)
+    if voting_session.status == VotingStatus.ACTIVE:
+        snapshot_electorate(db, voting_session)
     db.add(voting_session)
 
-    repository.proposals_count = (repository.proposals_count or 0) + 1
+    increment_counter(db, RepositoryModel, repository.id, "proposals_count")
     db.commit()
     db.refresh(proposal)
     db.refresh(voting_session)
+    voting_scheduler.schedule(
+        voting_session.id,
+        voting_session.status,
+        voting_session.starts_at,
+        voting_session.ends_at,
+    )
 
     logger.info(
         "Proposal '%s' created in repository %s by user %s",
@@ -1,26 +1,29 @@
+from datetime import datetime
 from typing import List
 
+import anyio
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
 
 from app.api import deps
+from app.core import security
 from app.core.database import get_db
 from app.core.logging import get_logger
 from app.schemas.user import User as UserSchema, UserUpdate, UserAdminUpdate, UserCreate
 from app.models.user import User as UserModel
+from app.services.principal_cache import Principal, authz_versions, principal_cache
 
 router = APIRouter()
 logger = get_logger("users")
 
-# Password hashing context - reusing from elsewhere or creating new
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Campos assinados nas claims do access token: mudar algum incrementa authz_version.
+_AUTHZ_FIELDS = ("username", "level", "is_active", "is_superuser", "is_verified")
 
 
 @router.get("/", response_model=List[UserSchema])
 def list_users(
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(deps.get_current_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser),
 ):
     """Lista todos os usuários (apenas administradores)."""
     return db.query(UserModel).order_by(UserModel.created_at.desc()).all()
@@ -63,7 +66,7 @@ def update_user_admin(
     user_id: int,
     payload: UserAdminUpdate,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(deps.get_current_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser),
 ):
     """Permite atualização de dados sensíveis (administradores)."""
     user = db.query(UserModel).filter(UserModel.id == user_id).first()
@@ -75,11 +78,21 @@ def update_user_admin(
         )
 
     try:
+        privileges_changed = False
         for field, value in payload.model_dump(exclude_unset=True).items():
+            if field in _AUTHZ_FIELDS and getattr(user, field) != value:
+                privileges_changed = True
             setattr(user, field, value)
+        if privileges_changed:
+            user.authz_version = UserModel.authz_version + 1
+            user.authz_changed_at = datetime.utcnow()
 
         db.add(user)
         db.commit()
+        principal_cache.invalidate(user.id)
+        if privileges_changed:
+            db.refresh(user)
+            authz_versions.record(user.id, user.authz_version)
         db.refresh(user)
         logger.info("Perfil administrativo atualizado para o usuário %s", user.username)
         return user
@@ -96,7 +109,7 @@ def update_user_admin(
 def create_user_admin(
     payload: UserCreate,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(deps.get_current_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser),
 ):
     """Cria um novo usuário (apenas administradores)."""
     # Check for duplicate username
@@ -113,8 +126,10 @@ def create_user_admin(
             detail="Email already registered",
         )
     
-    # Create new user
-    hashed_password = pwd_context.hash(payload.password)
+    # Create new user (connection goes back to the pool while bcrypt runs in the
+    # hashing pool; this threadpool worker just waits for it)
+    db.commit()
+    hashed_password = anyio.from_thread.run(security.hash_password_async, payload.password)
     new_user = UserModel(
         username=payload.username,
         email=payload.email,
@@ -134,7 +149,7 @@ def create_user_admin(
 def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(deps.get_current_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser),
 ):
     """Deleta um usuário (apenas administradores)."""
     user = db.query(UserModel).filter(UserModel.id == user_id).first()
@@ -147,4 +162,6 @@ def delete_user(
 
     db.delete(user)
     db.commit()
+    principal_cache.invalidate(user_id)
+    authz_versions.record(user_id, None)
     logger.info("Usuário deletado pelo admin: %s", user.username)
@@ -1,16 +1,35 @@
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime
 import hashlib
-from typing import Optional
+from typing import Dict, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session, selectinload
 
 from app.api import deps
+from app.core.config import settings
 from app.core.database import get_db
 from app.core.logging import get_logger
 from app.models.proposal import Proposal as ProposalModel, ProposalStatus
-from app.models.vote import Vote, VotingMethod, VotingOption, VotingSession, VotingStatus
-from app.schemas.vote import VoteRequest, VoteResponse
+from app.models.user import UserLevel
+from app.models.vote import VotingMethod, VotingOption, VotingSession, VotingStatus
+from app.schemas.vote import (
+    BatchVoteRequest,
+    BatchVoteResponse,
+    BatchVoteResult,
+    VoteRequest,
+    VoteResponse,
+)
+from app.services.session_cache import ActiveSessionInfo, SessionOption, active_session_cache
+from app.services.vote_ingestion import (
+    DuplicateVoteError,
+    PendingVote,
+    defer_vote_writes,
+    get_vote_batcher,
+    record_votes,
+)
+from app.services.voting_scheduler import voting_scheduler
 
 router = APIRouter()
 logger = get_logger("votes")
@@ -22,81 +41,293 @@ DEFAULT_SIMPLE_OPTIONS = {
 }
 
 
-def _get_active_session(db: Session, proposal_id: int) -> Optional[VotingSession]:
-    return (
+def _get_active_sessions(db: Session, proposal_ids: List[int]) -> Dict[int, VotingSession]:
+    sessions = (
         db.query(VotingSession)
+        .options(selectinload(VotingSession.options))
         .filter(
-            VotingSession.proposal_id == proposal_id,
+            VotingSession.proposal_id.in_(proposal_ids),
             VotingSession.status == VotingStatus.ACTIVE,
         )
-        .order_by(VotingSession.created_at.desc())
-        .first()
+        .order_by(VotingSession.created_at.asc())
+        .all()
     )
+    # A sessao mais recente de cada proposta vence.
+    return {session.proposal_id: session for session in sessions}
 
 
-def _require_open_session(db: Session, proposal: ProposalModel) -> VotingSession:
-    session = _get_active_session(db, proposal.id)
-    if not session:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="A votacao para esta proposta nao esta aberta.",
-        )
+def _load_active_sessions(db: Session, proposal_ids: List[int]) -> Dict[int, ActiveSessionInfo]:
+    """Metadados das sessoes ativas, do cache do processo ou em duas consultas."""
+    infos: Dict[int, ActiveSessionInfo] = {}
+    missing = []
+    for proposal_id in proposal_ids:
+        info = active_session_cache.get(proposal_id)
+        if info is not None:
+            infos[proposal_id] = info
+        else:
+            missing.append(proposal_id)
+    if not missing:
+        return infos
+
+    sessions = _get_active_sessions(db, missing)
+    created_defaults = False
+    for session in sessions.values():
+        if session.method == VotingMethod.SIMPLE and not session.options:
+            for order, (value, title) in enumerate(DEFAULT_SIMPLE_OPTIONS.items()):
+                db.add(
+                    VotingOption(
+                        session_id=session.id,
+                        title=title,
+                        description=f"Voto {title.lower()}",
+                        order=order,
+                        value=value,
+                    )
+                )
+            created_defaults = True
+    if created_defaults:
+        # Commit antes de cachear: os ids das opcoes precisam sobreviver a um rollback.
+        db.commit()
+
+    for proposal_id, session in sessions.items():
+        info = ActiveSessionInfo.from_session(session)
+        active_session_cache.put(info)
+        infos[proposal_id] = info
+    return infos
 
+
+def _session_window_error(session: ActiveSessionInfo) -> Optional[str]:
     now = datetime.utcnow()
     if session.starts_at and session.starts_at > now:
+        return "A votacao ainda nao comecou."
+
+    if session.ends_at and session.ends_at < now:
+        # O agendador normalmente ja encerrou; se nao, so pede o encerramento:
+        # a apuracao nao roda dentro da requisicao de voto.
+        voting_scheduler.request_close(session.session_id, session.ends_at)
+        return "Esta votacao ja foi encerrada."
+    return None
+
+
+def _require_open_session(db: Session, proposal: ProposalModel) -> ActiveSessionInfo:
+    session = _load_active_sessions(db, [proposal.id]).get(proposal.id)
+    if not session:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="A votacao ainda nao comecou.",
+            detail="A votacao para esta proposta nao esta aberta.",
         )
 
-    if session.ends_at and session.ends_at < now:
-        session.status = VotingStatus.COMPLETED
-        db.add(session)
-        db.commit()
+    detail = _session_window_error(session)
+    if detail:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+    return session
+
+
+def _ineligible_voter_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="Voce nao fazia parte do eleitorado quando esta votacao foi aberta.",
+    )
+
+
+def _pick_option(session: ActiveSessionInfo, option_value: str) -> SessionOption:
+    option = session.options.get(option_value.lower())
+    if option is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Esta votacao ja foi encerrada.",
+            detail="Opcao de voto invalida para esta sessao.",
         )
+    return option
 
-    if session.method == VotingMethod.SIMPLE and not session.options:
-        for order, (value, title) in enumerate(DEFAULT_SIMPLE_OPTIONS.items()):
-            db.add(
-                VotingOption(
-                    session_id=session.id,
-                    title=title,
-                    description=f"Voto {title.lower()}",
-                    order=order,
-                    value=value,
-                )
+
+def _generate_vote_hash(user_id: int, session_id: int) -> str:
+    payload = f"{user_id}:{session_id}:{datetime.utcnow().isoformat()}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _invalid_ballot(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+def _pick_distinct_options(session: ActiveSessionInfo, values: List[str]) -> List[SessionOption]:
+    options = [_pick_option(session, value) for value in values or []]
+    if not options:
+        raise _invalid_ballot("Selecione ao menos uma opcao.")
+    if len({option.id for option in options}) != len(options):
+        raise _invalid_ballot("Cada opcao so pode aparecer uma vez na cedula.")
+    return options
+
+
+def _build_pending_vote(
+    session: ActiveSessionInfo,
+    payload: VoteRequest,
+    user_id: int,
+    user_level: Optional[UserLevel] = None,
+) -> PendingVote:
+    """
+    Valida a cedula conforme o metodo da sessao e monta o vote_data lido pela
+    apuracao (app.services.tally_engine). option_weights alimenta os contadores
+    por opcao: primeira preferencia no ranqueado, cada aprovada na aprovacao e
+    os votos alocados no quadratico.
+    """
+    if session.method == VotingMethod.RANKED:
+        options = _pick_distinct_options(
+            session, payload.ranking or ([payload.option] if payload.option else [])
+        )
+        primary = options[0]
+        vote_data = {
+            "ranking": [option.id for option in options],
+            "values": [option.value for option in options],
+        }
+        weights = {primary.id: 1}
+    elif session.method == VotingMethod.APPROVAL:
+        options = _pick_distinct_options(
+            session, payload.approvals or ([payload.option] if payload.option else [])
+        )
+        primary = options[0]
+        vote_data = {
+            "approved": [option.id for option in options],
+            "values": [option.value for option in options],
+        }
+        weights = {option.id: 1 for option in options}
+    elif session.method == VotingMethod.QUADRATIC:
+        allocations = {
+            value: votes for value, votes in (payload.allocations or {}).items() if votes
+        }
+        if any(votes < 0 for votes in allocations.values()):
+            raise _invalid_ballot("A quantidade de votos nao pode ser negativa.")
+        options = _pick_distinct_options(session, list(allocations))
+        votes = list(allocations.values())
+        credits_used = sum(count * count for count in votes)
+        if credits_used > settings.QUADRATIC_VOICE_CREDITS:
+            raise _invalid_ballot(
+                f"A cedula custa {credits_used} creditos; o limite e "
+                f"{settings.QUADRATIC_VOICE_CREDITS}."
             )
-        db.flush()
-        db.refresh(session)
+        weights = {option.id: count for option, count in zip(options, votes)}
+        primary = max(options, key=lambda option: weights[option.id])
+        vote_data = {
+            "allocations": {str(option_id): count for option_id, count in weights.items()},
+            "credits_used": credits_used,
+        }
+    else:
+        if not payload.option:
+            raise _invalid_ballot("Selecione uma opcao de voto.")
+        primary = _pick_option(session, payload.option)
+        vote_data = {
+            "option_id": primary.id,
+            "value": primary.value,
+            "title": primary.title,
+        }
+        weights = {primary.id: 1}
 
-    return session
+    return PendingVote(
+        session_id=session.session_id,
+        proposal_id=session.proposal_id,
+        user_id=user_id,
+        option_id=primary.id,
+        choice=primary.value,
+        vote_data=vote_data,
+        vote_hash=_generate_vote_hash(user_id, session.session_id),
+        option_weights=weights,
+        user_level=user_level,
+    )
 
 
-def _pick_option(session: VotingSession, option_value: str) -> VotingOption:
-    normalized = option_value.lower()
-    for option in session.options:
-        if option.value and option.value.lower() == normalized:
-            return option
-    raise HTTPException(
+def _duplicate_vote_error() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_400_BAD_REQUEST,
-        detail="Opcao de voto invalida para esta sessao.",
+        detail="Voce ja registrou seu voto nesta proposta.",
     )
 
 
-def _generate_vote_hash(user_id: int, session_id: int) -> str:
-    payload = f"{user_id}:{session_id}:{datetime.utcnow().isoformat()}"
-    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+def _vote_response(pending: PendingVote, receipt: dict) -> VoteResponse:
+    return VoteResponse(
+        proposal_id=pending.proposal_id,
+        session_id=pending.session_id,
+        selected_option_id=pending.option_id,
+        selected_option_value=pending.choice,
+        total_votes=receipt["total_votes"],
+        message="Voto registrado com sucesso.",
+        voted_at=receipt["voted_at"],
+        receipt=receipt["receipt"],
+        merkle_leaf_index=receipt["merkle_leaf_index"],
+    )
+
+
+def _commit_vote(db: Session, pending: PendingVote) -> dict:
+    """
+    Grava o voto sem leitura previa em um unico INSERT ... ON CONFLICT DO
+    NOTHING RETURNING e o commit; contadores e folha Merkle seguem depois,
+    agregados pelo DeferredVoteWriter.
+    """
+    receipts = record_votes(db, [pending], apply_counters=False)
+    receipt = receipts.get((pending.session_id, pending.user_id))
+    if receipt is None:
+        db.rollback()
+        raise _duplicate_vote_error()
+    db.commit()
+    defer_vote_writes([pending], receipts)
+    return receipt
+
+
+def _submit_batched_vote(db: Session, pending: PendingVote) -> Optional[dict]:
+    """
+    Envia a cedula validada para a fila de gravacao em lote e aguarda o recibo.
+
+    Retorna None se o prazo acabar antes de o lote assentar: o voto continua
+    na fila e ainda pode ser gravado, entao nao e uma falha.
+    """
+    # Libera a conexao do pool enquanto o lote e gravado.
+    db.commit()
+
+    try:
+        return get_vote_batcher().submit(pending).result(
+            timeout=settings.VOTE_BATCH_RECEIPT_TIMEOUT_SECONDS
+        )
+    except FutureTimeoutError:
+        logger.warning("Batched vote for session %s still pending", pending.session_id)
+        return None
+    except DuplicateVoteError:
+        raise _duplicate_vote_error() from None
+    except Exception as exc:
+        logger.error("Batched vote failed for session %s: %s", pending.session_id, exc)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Nao foi possivel registrar o voto agora. Tente novamente.",
+        ) from None
 
 
-@router.post("/proposals/{proposal_id}/vote", response_model=VoteResponse)
+def _vote_pending_response(pending: PendingVote) -> JSONResponse:
+    """202 com o comprovante: a prova de inclusao confirma o voto quando o lote assentar."""
+    proof_url = (
+        f"/api/v1/voting/sessions/{pending.session_id}/proof?receipt={pending.vote_hash}"
+    )
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={
+            "proposal_id": pending.proposal_id,
+            "session_id": pending.session_id,
+            "receipt": pending.vote_hash,
+            "message": "Voto recebido e ainda em gravacao. Confira pelo comprovante.",
+        },
+        headers={"Location": proof_url},
+    )
+
+
+@router.post(
+    "/proposals/{proposal_id}/vote",
+    response_model=VoteResponse,
+    responses={
+        status.HTTP_202_ACCEPTED: {
+            "description": "Modo em lote: voto ainda em gravacao; confira pelo comprovante."
+        }
+    },
+)
 def cast_vote(
     proposal_id: int,
     payload: VoteRequest,
     db: Session = Depends(get_db),
-    current_user=Depends(deps.get_current_active_user),
+    current_user=Depends(deps.get_current_active_principal),
 ):
     proposal = db.query(ProposalModel).filter(ProposalModel.id == proposal_id).first()
     if not proposal:
@@ -117,63 +348,120 @@ def cast_vote(
         )
 
     session = _require_open_session(db, proposal)
+    if not session.is_eligible(current_user.id):
+        raise _ineligible_voter_error()
+    pending = _build_pending_vote(session, payload, current_user.id, current_user.level)
 
-    existing_vote = (
-        db.query(Vote)
-        .filter(
-            Vote.session_id == session.id,
-            Vote.user_id == current_user.id,
-        )
-        .first()
+    if settings.VOTE_INGESTION_MODE == "batched":
+        receipt = _submit_batched_vote(db, pending)
+        if receipt is None:
+            return _vote_pending_response(pending)
+    else:
+        receipt = _commit_vote(db, pending)
+
+    logger.info(
+        "Vote registered",
+        extra={
+            "proposal_id": pending.proposal_id,
+            "user_id": pending.user_id,
+            "choice": pending.choice,
+            "session_id": pending.session_id,
+        },
     )
-    if existing_vote:
+
+    return _vote_response(pending, receipt)
+
+
+@router.post("/batch", response_model=BatchVoteResponse)
+def cast_votes_batch(
+    payload: BatchVoteRequest,
+    db: Session = Depends(get_db),
+    current_user=Depends(deps.get_current_active_principal),
+):
+    """
+    Registra cedulas de varias propostas (assembleias) em uma unica transacao.
+
+    Propostas e sessoes sao resolvidas em consultas por conjunto; cada item
+    recebe seu proprio resultado, e itens invalidos nao impedem os demais.
+    """
+    if not current_user.can_vote:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Voce ja registrou seu voto nesta proposta.",
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Seu nivel de acesso nao permite votar.",
         )
 
-    option = _pick_option(session, payload.option)
-    vote_payload = {
-        "option_id": option.id,
-        "value": option.value or option.title,
-        "title": option.title,
-    }
-
-    vote = Vote(
-        session_id=session.id,
-        proposal_id=proposal.id,
-        user_id=current_user.id,
-        choice=vote_payload["value"],
-        vote_data=vote_payload,
-        vote_hash=_generate_vote_hash(current_user.id, session.id),
+    proposal_ids = list(dict.fromkeys(item.proposal_id for item in payload.votes))
+    statuses = dict(
+        db.query(ProposalModel.id, ProposalModel.status)
+        .filter(ProposalModel.id.in_(proposal_ids))
+        .all()
     )
-    db.add(vote)
+    voting_ids = [
+        proposal_id
+        for proposal_id in proposal_ids
+        if statuses.get(proposal_id) == ProposalStatus.VOTING
+    ]
+    sessions = _load_active_sessions(db, voting_ids)
 
-    session.total_votes = (session.total_votes or 0) + 1
-    proposal.votes_count = (proposal.votes_count or 0) + 1
+    results: List[Optional[BatchVoteResult]] = []
+    pending_votes: Dict[int, PendingVote] = {}
+    seen = set()
+    for index, item in enumerate(payload.votes):
+        try:
+            if item.proposal_id in seen:
+                raise _invalid_ballot("Proposta repetida neste lote.")
+            seen.add(item.proposal_id)
+            if item.proposal_id not in statuses:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND, detail="Proposta nao encontrada."
+                )
+            if statuses[item.proposal_id] != ProposalStatus.VOTING:
+                raise _invalid_ballot("Esta proposta nao esta em votacao.")
+            session = sessions.get(item.proposal_id)
+            if not session:
+                raise _invalid_ballot("A votacao para esta proposta nao esta aberta.")
+            detail = _session_window_error(session)
+            if detail:
+                raise _invalid_ballot(detail)
+            if not session.is_eligible(current_user.id):
+                raise _ineligible_voter_error()
+            pending_votes[index] = _build_pending_vote(session, item, current_user.id, current_user.level)
+            results.append(None)
+        except HTTPException as exc:
+            results.append(
+                BatchVoteResult(proposal_id=item.proposal_id, accepted=False, detail=exc.detail)
+            )
 
-    db.add(proposal)
-    db.add(session)
+    receipts = (
+        record_votes(db, list(pending_votes.values()), apply_counters=False)
+        if pending_votes
+        else {}
+    )
     db.commit()
-    db.refresh(vote)
-    db.refresh(session)
+    defer_vote_writes(list(pending_votes.values()), receipts)
+
+    for index, pending in pending_votes.items():
+        receipt = receipts.get((pending.session_id, pending.user_id))
+        if receipt is None:
+            results[index] = BatchVoteResult(
+                proposal_id=pending.proposal_id,
+                accepted=False,
+                detail=_duplicate_vote_error().detail,
+            )
+        else:
+            results[index] = BatchVoteResult(
+                proposal_id=pending.proposal_id,
+                accepted=True,
+                vote=_vote_response(pending, receipt),
+            )
 
+    accepted = sum(1 for result in results if result.accepted)
     logger.info(
-        "Vote registered",
-        extra={
-            "proposal_id": proposal.id,
-            "user_id": current_user.id,
-            "choice": vote_payload["value"],
-            "session_id": session.id,
-        },
+        "Vote batch registered",
+        extra={"user_id": current_user.id, "accepted": accepted, "items": len(results)},
     )
-
-    return VoteResponse(
-        proposal_id=proposal.id,
-        session_id=session.id,
-        selected_option_id=option.id,
-        selected_option_value=vote_payload["value"],
-        total_votes=session.total_votes or 0,
-        message="Voto registrado com sucesso.",
-        voted_at=vote.voted_at,
+    return BatchVoteResponse(
+        accepted=accepted,
+        rejected=len(results) - accepted,
+        results=results,
     )
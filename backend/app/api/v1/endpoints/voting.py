@@ -1,29 +1,100 @@
-from datetime import datetime
-from typing import List
+from datetime import datetime, timedelta
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
+from sqlalchemy.orm import Session, contains_eager
 
 from app.api import deps
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import SessionLocal, get_db
 from app.core.logging import get_logger
-from app.models.proposal import Proposal as ProposalModel
-from app.models.vote import Vote, VotingSession, VotingStatus
-from app.schemas.voting import ActiveVotingSession, UserVotingState, VotingStats
+from app.models.proposal import Proposal as ProposalModel, ProposalStatus
+from app.models.repository import Repository as RepositoryModel
+from app.models.vote import Vote, VotingMethod, VotingOption, VotingSession, VotingStatus
+from app.schemas.vote import MerkleInclusionProof
+from app.schemas.voting import (
+    ActiveVotingSession,
+    UserVotingState,
+    VotingSessionCreate,
+    VotingSessionResult,
+    VotingSessionSummary,
+    VotingStats,
+)
+from app.services.electorate import quorum_status, snapshot_electorate
+from app.services.live_tally import LiveTallyBroadcaster
+from app.services.merkle import compute_root, find_leaf, inclusion_proof, leaf_hash
+from app.services.result_cache import result_cache_control, result_snapshot_cache
+from app.services.session_cache import active_session_cache
+from app.services.tally import count_votes_by_choice, get_option_tallies
+from app.services.vote_archive import find_archived_vote
+from app.services.voting_scheduler import voting_scheduler
 
 router = APIRouter()
 logger = get_logger("voting")
 
+RECEIPT_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _load_tallies(db: Session, session_ids: Iterable[int]) -> Dict[int, Dict[str, int]]:
+    if settings.VOTING_STATS_SOURCE == "aggregate":
+        return count_votes_by_choice(db, session_ids)
+    return get_option_tallies(db, session_ids)
+
+
+def _compute_stats(counts: Dict[str, int], session: VotingSession) -> VotingStats:
+    if session.method in (None, VotingMethod.SIMPLE):
+        # As contagens por opcao sao exatas; total_votes pode ter parcelas pendentes.
+        total_votes = sum(counts.values()) or session.total_votes or 0
+    else:
+        # Aprovacao/quadratico somam pesos por opcao, nao cedulas.
+        total_votes = session.total_votes or 0
+    return VotingStats(
+        total_votes=total_votes,
+        yes_votes=counts.get("yes", 0),
+        no_votes=counts.get("no", 0),
+        abstain_votes=counts.get("abstain", 0),
+        option_votes=counts,
+        eligible_voters=session.eligible_voters_count,
+        quorum_threshold=session.quorum_threshold,
+        quorum_reached=quorum_status(session, total_votes),
+    )
+
+
+def _load_live_stats(session_id: int) -> Optional[Dict[str, Any]]:
+    """Parciais de uma sessao ativa para o broadcaster; None quando ela encerra."""
+    db = SessionLocal()
+    try:
+        session = db.query(VotingSession).filter(VotingSession.id == session_id).first()
+        if not session or session.status != VotingStatus.ACTIVE:
+            return None
+        counts = _load_tallies(db, [session_id]).get(session_id, {})
+        return _compute_stats(counts, session).model_dump()
+    finally:
+        db.close()
+
+
+live_tally_broadcaster = LiveTallyBroadcaster(
+    _load_live_stats,
+    interval_ms=settings.VOTING_STREAM_INTERVAL_MS,
+    heartbeat_seconds=settings.VOTING_STREAM_HEARTBEAT_SECONDS,
+)
+
 
 @router.get("/sessions/active", response_model=List[ActiveVotingSession])
 def list_active_voting_sessions(
     db: Session = Depends(get_db),
-    current_user=Depends(deps.get_current_active_user),
+    current_user=Depends(deps.get_current_active_principal),
 ):
     now = datetime.utcnow()
     sessions = (
         db.query(VotingSession)
         .join(ProposalModel)
+        .options(contains_eager(VotingSession.proposal))
         .filter(
             VotingSession.status == VotingStatus.ACTIVE,
             VotingSession.starts_at <= now,
@@ -46,25 +117,7 @@ def list_active_voting_sessions(
         )
         vote_map = {vote.session_id: vote for vote in votes}
 
-    def _compute_stats(session: VotingSession) -> VotingStats:
-        total_yes = 0
-        total_no = 0
-        total_abstain = 0
-        for vote in session.votes:
-            value = (vote.vote_data or {}).get("value")
-            if value == "yes":
-                total_yes += 1
-            elif value == "no":
-                total_no += 1
-            elif value == "abstain":
-                total_abstain += 1
-        total_votes = session.total_votes or len(session.votes or [])
-        return VotingStats(
-            total_votes=total_votes,
-            yes_votes=total_yes,
-            no_votes=total_no,
-            abstain_votes=total_abstain,
-        )
+    tallies = _load_tallies(db, session_ids)
 
     payload: List[ActiveVotingSession] = []
     for session in sessions:
@@ -79,12 +132,281 @@ def list_active_voting_sessions(
                 summary=proposal.summary,
                 starts_at=session.starts_at,
                 ends_at=session.ends_at,
-                stats=_compute_stats(session),
+                stats=_compute_stats(tallies.get(session.id, {}), session),
                 user_state=UserVotingState(
                     has_voted=user_vote is not None,
-                    choice=(user_vote.vote_data or {}).get("value") if user_vote else None,
+                    choice=user_vote.ballot.get("value") if user_vote else None,
                 ),
             )
         )
 
     return payload
+
+
+@router.post(
+    "/sessions",
+    response_model=VotingSessionSummary,
+    status_code=status.HTTP_201_CREATED,
+)
+def create_voting_session(
+    payload: VotingSessionCreate,
+    db: Session = Depends(get_db),
+    current_user=Depends(deps.get_current_superuser),
+):
+    """Abre (ou agenda) uma votacao com metodo e opcoes definidos pela administracao."""
+    proposal = db.query(ProposalModel).filter(ProposalModel.id == payload.proposal_id).first()
+    if not proposal:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Proposta nao encontrada."
+        )
+
+    open_session = (
+        db.query(VotingSession.id)
+        .filter(
+            VotingSession.proposal_id == proposal.id,
+            VotingSession.status.in_([VotingStatus.SCHEDULED, VotingStatus.ACTIVE]),
+        )
+        .first()
+    )
+    if open_session:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ja existe uma votacao aberta ou agendada para esta proposta.",
+        )
+
+    values = [option.value.strip().lower() for option in payload.options]
+    if any(not value for value in values) or len(set(values)) != len(values):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Cada opcao precisa de um valor unico.",
+        )
+
+    now = datetime.utcnow()
+    starts_at = payload.starts_at or now
+    ends_at = payload.ends_at or starts_at + timedelta(days=settings.VOTING_PERIOD_DAYS)
+    if ends_at <= starts_at:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="O encerramento deve ser posterior ao inicio da votacao.",
+        )
+
+    session = VotingSession(
+        proposal_id=proposal.id,
+        repository_id=proposal.repository_id,
+        title=payload.title or f"Votação da proposta {proposal.title}",
+        description=payload.description or proposal.summary,
+        method=payload.method,
+        quorum_required=(
+            payload.quorum_required
+            if payload.quorum_required is not None
+            else proposal.quorum_required or 0
+        ),
+        starts_at=starts_at,
+        ends_at=ends_at,
+        status=VotingStatus.SCHEDULED if starts_at > now else VotingStatus.ACTIVE,
+    )
+    session.options = [
+        VotingOption(
+            title=option.title,
+            description=option.description,
+            order=order,
+            value=option.value.strip(),
+        )
+        for order, option in enumerate(payload.options)
+    ]
+
+    if session.status == VotingStatus.ACTIVE:
+        snapshot_electorate(db, session)
+
+    proposal.status = ProposalStatus.VOTING
+    proposal.voting_started_at = starts_at
+    proposal.voting_ended_at = ends_at
+
+    db.add(session)
+    db.commit()
+    db.refresh(session)
+
+    active_session_cache.invalidate(proposal.id)
+    voting_scheduler.schedule(session.id, session.status, session.starts_at, session.ends_at)
+
+    logger.info(
+        "Voting session %s (%s) created for proposal %s by %s",
+        session.id,
+        session.method.value,
+        proposal.id,
+        current_user.username,
+    )
+    return session
+
+
+@router.get("/sessions/{session_id}/proof", response_model=MerkleInclusionProof)
+def get_vote_inclusion_proof(
+    session_id: int,
+    receipt: Optional[str] = Query(None, description="vote_hash devolvido ao votar"),
+    db: Session = Depends(get_db),
+    current_user=Depends(deps.get_current_active_principal),
+):
+    """
+    Prova de inclusao do voto na arvore Merkle da sessao. Sem `receipt`, usa o
+    voto do proprio usuario. Com a raiz publicada no encerramento, qualquer
+    pessoa verifica a cedula com O(log n) hashes.
+    """
+    session, _ = _visible_session(db, session_id, current_user, VotingSession)
+
+    if receipt is None:
+        user_vote = (
+            db.query(Vote)
+            .filter(Vote.session_id == session_id, Vote.user_id == current_user.id)
+            .first()
+        )
+        if user_vote is not None:
+            receipt = user_vote.receipt
+        else:
+            # Lote ja arquivado (sessao arquivada ou em arquivamento).
+            archived_vote = find_archived_vote(db, session_id, current_user.id)
+            receipt = archived_vote["vote_hash"] if archived_vote else None
+        if receipt is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Voce nao votou nesta sessao.",
+            )
+    receipt = receipt.lower()
+    if not RECEIPT_PATTERN.match(receipt):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Comprovante invalido.",
+        )
+
+    index = find_leaf(db, session_id, receipt)
+    if index is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Comprovante nao encontrado nesta votacao.",
+        )
+
+    tree_size = session.merkle_leaf_count
+    root = session.merkle_root or compute_root(db, session_id, tree_size)
+    return MerkleInclusionProof(
+        session_id=session_id,
+        receipt=receipt,
+        leaf_hash=leaf_hash(receipt),
+        leaf_index=index,
+        tree_size=tree_size,
+        root=root,
+        audit_path=inclusion_proof(db, session_id, index, tree_size),
+        finalized=session.merkle_root is not None,
+    )
+
+
+def _visible_session(db: Session, session_id: int, current_user, column=VotingSession.status):
+    """
+    (column, repositorio) da sessao, conferindo se o usuario enxerga o
+    repositorio; sessao inexistente ou invisivel da o mesmo 404.
+    """
+    row = (
+        db.query(column, RepositoryModel)
+        .select_from(VotingSession)
+        .outerjoin(ProposalModel, ProposalModel.id == VotingSession.proposal_id)
+        .outerjoin(
+            RepositoryModel,
+            RepositoryModel.id
+            == func.coalesce(VotingSession.repository_id, ProposalModel.repository_id),
+        )
+        .filter(VotingSession.id == session_id)
+        .first()
+    )
+    if row is None or row[1] is None or not deps.check_can_view_repository(current_user, row[1]):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Votacao nao encontrada."
+        )
+    return row
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {candidate.strip() for candidate in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+@router.get("/sessions/{session_id}/results", response_model=VotingSessionResult)
+def get_voting_results(
+    session_id: int,
+    db: Session = Depends(get_db),
+    current_user=Depends(deps.get_current_active_principal),
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    Resultado final de uma sessao concluida. O corpo nunca muda depois do
+    encerramento: sai do cache em memoria com ETag forte e Cache-Control
+    immutable (public apenas em repositorios publicos), e If-None-Match
+    correspondente recebe 304 sem corpo. A visibilidade do repositorio e
+    conferida em toda requisicao, antes do cache e do 304.
+    """
+    session_status, repository = _visible_session(db, session_id, current_user)
+    if session_status != VotingStatus.COMPLETED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="O resultado so fica disponivel apos o encerramento da votacao.",
+        )
+
+    visibility = repository.visibility
+    snapshot = result_snapshot_cache.get(session_id, visibility)
+    if snapshot is None:
+        session = db.query(VotingSession).filter(VotingSession.id == session_id).first()
+        snapshot = result_snapshot_cache.load(db, session, visibility)
+
+    headers = {"ETag": snapshot.etag, "Cache-Control": result_cache_control(visibility)}
+    if _etag_matches(if_none_match, snapshot.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+
+def _authorize_stream(token: str, session_id: int):
+    """
+    Autenticacao e visibilidade do stream, no threadpool e com uma sessao
+    curta: o stream nao segura conexao do pool nem bloqueia o event loop.
+    """
+    db = SessionLocal()
+    try:
+        current_user = deps.get_current_active_principal(
+            deps.get_current_principal(db=db, token=token)
+        )
+        session_status, _ = _visible_session(db, session_id, current_user)
+        return current_user, session_status
+    finally:
+        db.close()
+
+
+@router.get("/sessions/{session_id}/stream")
+async def stream_voting_stats(
+    session_id: int,
+    token: str = Depends(deps.oauth2_scheme),
+):
+    """
+    Parciais ao vivo via Server-Sent Events: "snapshot" ao conectar, depois
+    "delta" com os campos alterados (no maximo um quadro por tick) e "closed"
+    quando a votacao encerra.
+    """
+    current_user, session_status = await run_in_threadpool(
+        _authorize_stream, token, session_id
+    )
+    if session_status != VotingStatus.ACTIVE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Esta votacao nao esta aberta.",
+        )
+
+    async def _events():
+        async for event, data in live_tally_broadcaster.subscribe(session_id):
+            if event == "ping":
+                yield ": ping\n\n"
+            else:
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    logger.info("User %s watching live tally of session %s", current_user.id, session_id)
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
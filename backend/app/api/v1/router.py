@@ -20,6 +20,7 @@ optional_endpoints: List[Tuple[str, str, str]] = [
     ("app.api.v1.endpoints.issues", "/issues", "issues"),
     ("app.api.v1.endpoints.voting", "/voting", "voting"),
     ("app.api.v1.endpoints.votes", "/votes", "votes"),
+    ("app.api.v1.endpoints.delegations", "/delegations", "delegations"),
     ("app.api.v1.endpoints.admin", "/admin", "admin"),
 ]
 
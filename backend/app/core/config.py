@@ -27,8 +27,29 @@ class Settings(BaseSettings):
     # Security
     SECRET_KEY: str = Field("dev-secret-key-change-me", env="SECRET_KEY")
     ALGORITHM: str = "HS256"
+    JWT_BACKEND: str = "jose"  # jose | hmac (stdlib, chave HMAC em cache; apenas HS*)
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    PASSWORD_BCRYPT_ROUNDS: int = 12  # custo do bcrypt (cada +1 dobra o tempo)
+    PASSWORD_HASH_EXECUTOR: str = "thread"  # thread | process
+    PASSWORD_HASH_WORKERS: int = 0  # 0 = um por nucleo
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 30.0  # 0 desativa o cache do usuario autenticado
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000
+    ACCESS_TOKEN_CLAIMS_ENABLED: bool = False  # nivel e flags assinados no access token
+    AUTHZ_VERSION_REFRESH_SECONDS: float = 30.0  # leitura incremental do mapa user_id -> authz_version
+    AUTHZ_VERSION_FULL_RELOAD_SECONDS: float = 900.0  # recarga completa (remove usuarios excluidos)
+    TOKEN_REVOCATION_SYNC_SECONDS: float = 5.0  # leitura incremental de revoked_tokens
+    TOKEN_REVOCATION_FILTER_CAPACITY: int = 100000
+    TOKEN_REVOCATION_FILTER_ERROR_RATE: float = 0.001
+    LOGIN_THROTTLE_ENABLED: bool = True
+    LOGIN_THROTTLE_BACKEND: str = "memory"  # memory | redis
+    LOGIN_THROTTLE_REDIS_URL: Optional[str] = None  # padrao: REDIS_URL
+    LOGIN_THROTTLE_IP_BURST: int = 30  # tentativas de login/cadastro por IP
+    LOGIN_THROTTLE_IP_PER_MINUTE: float = 10.0
+    LOGIN_THROTTLE_USER_BURST: int = 5  # falhas de login por username
+    LOGIN_THROTTLE_USER_PER_MINUTE: float = 1.0
+    LOGIN_THROTTLE_FAILURE_COST: float = 1.0
+    LOGIN_THROTTLE_MAX_KEYS: int = 100000  # buckets em memoria por worker
     
     # OAuth2
     GOV_BR_CLIENT_ID: Optional[str] = None
@@ -49,8 +70,32 @@ class Settings(BaseSettings):
     
     # Voting Configuration
     QUORUM_PERCENTAGE: int = 10
+    ELECTORATE_BITMAP_ENABLED: bool = False  # guarda os ids elegiveis na abertura
+    VOTE_DELEGATION_ENABLED: bool = True  # democracia liquida na apuracao
     VOTING_PERIOD_DAYS: int = 7
     MIN_SIGNATURES_FOR_VOTING: int = 500
+    VOTING_STATS_SOURCE: str = "counters"  # counters | aggregate
+    VOTE_STORAGE_MODE: str = "legacy"  # legacy | compact (app.services.vote_storage)
+    RESULT_CACHE_MAX_ENTRIES: int = 256  # resultados de sessoes concluidas em memoria
+    VOTE_ARCHIVE_AFTER_DAYS: int = 90  # sessoes encerradas ha mais tempo vao para o arquivo
+    QUADRATIC_VOICE_CREDITS: int = 100
+    VOTING_STREAM_INTERVAL_MS: int = 250  # no maximo 4 quadros/s por sessao
+    VOTING_STREAM_HEARTBEAT_SECONDS: int = 15
+    VOTE_TURNOUT_BUCKETS_ENABLED: bool = False  # sem buckets a serie le de votes
+
+    # Ingestao de votos
+    VOTE_INGESTION_MODE: str = "sync"  # sync | batched
+    VOTE_BATCH_FLUSH_MS: int = 5
+    VOTE_BATCH_MAX_SIZE: int = 500
+    VOTE_BATCH_RECEIPT_TIMEOUT_SECONDS: float = 5.0
+    VOTE_DEFERRED_FLUSH_MS: int = 50  # contadores e folhas dos votos gravados na requisicao
+    ACTIVE_SESSION_CACHE_TTL_SECONDS: float = 30.0
+    VOTING_SCHEDULER_ENABLED: bool = True
+    VOTING_SCHEDULER_RESYNC_SECONDS: int = 60
+
+    # Contadores fragmentados (1 = desativado)
+    COUNTER_SHARDS: int = 1
+    COUNTER_FOLD_INTERVAL_SECONDS: int = 30
     
     class Config:
         env_file = ".env"
@@ -28,4 +28,39 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def dialect_insert(db, table):
+    """Retorna um INSERT do dialeto ativo, com suporte a ON CONFLICT (PostgreSQL/SQLite)."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+
+def try_advisory_xact_lock(db, namespace: int, key: int) -> bool:
+    """
+    Tenta obter um advisory lock do PostgreSQL valido ate o fim da transacao.
+
+    Em outros dialetos (SQLite, processo unico) sempre retorna True.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return True
+    from sqlalchemy import text
+
+    return bool(
+        db.execute(
+            text("SELECT pg_try_advisory_xact_lock(:namespace, :key)"),
+            {"namespace": namespace, "key": key},
+        ).scalar()
+    )
+
+
+def set_statement_timeout(db, milliseconds: int) -> None:
+    """Limita a duracao das consultas da transacao atual (apenas PostgreSQL)."""
+    if db.get_bind().dialect.name != "postgresql" or not milliseconds:
+        return
+    from sqlalchemy import text
+
+    db.execute(text(f"SET LOCAL statement_timeout = {int(milliseconds)}"))
@@ -0,0 +1,136 @@
+"""
+Backends de assinatura/verificacao de JWT, escolhidos por settings.JWT_BACKEND.
+
+- jose: python-jose, como sempre foi.
+- hmac: HS256/384/512 direto na stdlib. O objeto HMAC com a chave e montado
+  uma vez e copiado por token (sem refazer o preparo da chave), e a
+  verificacao confere assinatura e exp em uma unica passada.
+
+Os dois produzem e aceitam os mesmos tokens, entao a troca nao derruba
+sessoes abertas.
+"""
+
+import base64
+import binascii
+import calendar
+import hashlib
+import hmac
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from jose import JWTError, jwt
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger("jwt_backend")
+
+JWT_BACKENDS = ("jose", "hmac")
+
+_HMAC_DIGESTS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+
+_TIME_CLAIMS = ("exp", "iat", "nbf")
+
+
+class JoseJWTBackend:
+    def __init__(self, secret_key: str, algorithm: str):
+        self._secret_key = secret_key
+        self._algorithm = algorithm
+
+    def encode(self, claims: Dict[str, Any]) -> str:
+        return jwt.encode(claims, self._secret_key, algorithm=self._algorithm)
+
+    def decode(self, token: str) -> Optional[Dict[str, Any]]:
+        """Payload se assinatura e exp forem validos; None caso contrario."""
+        try:
+            return jwt.decode(
+                token,
+                self._secret_key,
+                algorithms=[self._algorithm],
+                options={"require_exp": True},
+            )
+        except JWTError as e:
+            logger.debug("Token verification failed: %s", e)
+            return None
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+class HMACJWTBackend:
+    def __init__(self, secret_key: str, algorithm: str):
+        if algorithm not in _HMAC_DIGESTS:
+            raise ValueError(f"Unsupported algorithm for hmac JWT backend: {algorithm}")
+        self._algorithm = algorithm
+        self._mac = hmac.new(secret_key.encode("utf-8"), digestmod=_HMAC_DIGESTS[algorithm])
+        # Mesmo cabecalho que o python-jose gera (chaves ordenadas, sem espacos).
+        header = json.dumps({"alg": algorithm, "typ": "JWT"}, separators=(",", ":"), sort_keys=True)
+        self._header_segment = _b64encode(header.encode("utf-8"))
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        mac = self._mac.copy()
+        mac.update(signing_input)
+        return mac.digest()
+
+    def encode(self, claims: Dict[str, Any]) -> str:
+        payload = dict(claims)
+        for claim in _TIME_CLAIMS:
+            value = payload.get(claim)
+            if isinstance(value, datetime):
+                payload[claim] = calendar.timegm(value.utctimetuple())
+        payload_segment = _b64encode(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+        signing_input = f"{self._header_segment}.{payload_segment}"
+        return f"{signing_input}.{_b64encode(self._sign(signing_input.encode('ascii')))}"
+
+    def decode(self, token: str) -> Optional[Dict[str, Any]]:
+        """Payload se assinatura e exp forem validos; None caso contrario."""
+        try:
+            signing_input, _, signature_segment = token.rpartition(".")
+            header_segment, _, payload_segment = signing_input.partition(".")
+            if not payload_segment or "." in payload_segment:
+                return None
+            if header_segment != self._header_segment:
+                header = json.loads(_b64decode(header_segment))
+                if not isinstance(header, dict) or header.get("alg") != self._algorithm:
+                    return None
+            expected = self._sign(signing_input.encode("ascii"))
+            if not hmac.compare_digest(expected, _b64decode(signature_segment)):
+                return None
+            payload = json.loads(_b64decode(payload_segment))
+        except (ValueError, TypeError, binascii.Error, UnicodeError) as e:
+            logger.debug("Token verification failed: %s", e)
+            return None
+        if not isinstance(payload, dict):
+            return None
+        exp = payload.get("exp")
+        if not isinstance(exp, (int, float)) or exp < time.time():
+            return None
+        return payload
+
+
+_backend: Optional[Tuple[Tuple[str, str, str], Any]] = None
+_backend_lock = threading.Lock()
+
+
+def get_jwt_backend():
+    """Backend configurado, montado uma vez por (backend, chave, algoritmo)."""
+    global _backend
+    key = (settings.JWT_BACKEND, settings.SECRET_KEY, settings.ALGORITHM)
+    current = _backend
+    if current is not None and current[0] == key:
+        return current[1]
+    with _backend_lock:
+        if _backend is None or _backend[0] != key:
+            if settings.JWT_BACKEND not in JWT_BACKENDS:
+                raise ValueError(f"Unsupported JWT backend: {settings.JWT_BACKEND}")
+            backend_cls = HMACJWTBackend if settings.JWT_BACKEND == "hmac" else JoseJWTBackend
+            _backend = (key, backend_cls(settings.SECRET_KEY, settings.ALGORITHM))
+        return _backend[1]
@@ -1,14 +1,28 @@
+import asyncio
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional, Union
-from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.jwt_backend import get_jwt_backend
 from app.core.logging import get_logger
 
 logger = get_logger("security")
 
-# Contexto para hashing de senhas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Contexto unico para hashing de senhas (todo o app usa este)
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+)
+
+# Pool limitado onde o bcrypt roda, fora do event loop
+_hash_executor: Optional[Executor] = None
+_hash_executor_lock = threading.Lock()
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Cria um token de acesso JWT"""
@@ -18,45 +32,74 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire, "type": "access"})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
+    # iat distingue os tokens de um mesmo usuario no cache de principal;
+    # jti identifica o token para revogacao no logout
+    to_encode.update(
+        {"exp": expire, "iat": int(time.time()), "jti": uuid.uuid4().hex, "type": "access"}
+    )
+    return get_jwt_backend().encode(to_encode)
 
 def create_refresh_token(data: dict) -> str:
     """Cria um token de refresh JWT"""
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire, "type": "refresh"})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex, "type": "refresh"})
+    return get_jwt_backend().encode(to_encode)
 
 def verify_token(token: str, token_type: str = "access") -> Optional[dict]:
-    """Verifica e decodifica um token JWT"""
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        
-        # Verificar tipo do token
-        if payload.get("type") != token_type:
-            return None
-            
-        # Verificar expiração
-        exp = payload.get("exp")
-        if exp is None or datetime.utcnow() > datetime.fromtimestamp(exp):
-            return None
-            
-        return payload
-    except JWTError as e:
-        logger.warning(f"Token verification failed: {e}")
+    """Verifica e decodifica um token JWT (assinatura e exp validados pelo backend)"""
+    payload = get_jwt_backend().decode(token)
+    if payload is None or payload.get("type") != token_type:
         return None
+    return payload
 
 def hash_password(password: str) -> str:
-    """Hash de senha usando bcrypt"""
+    """Hash de senha usando bcrypt (bloqueante; em endpoints async use hash_password_async)"""
     return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verifica senha contra hash"""
+    """Verifica senha contra hash (bloqueante; em endpoints async use verify_password_async)"""
     return pwd_context.verify(plain_password, hashed_password)
 
+def _get_hash_executor() -> Executor:
+    global _hash_executor
+    with _hash_executor_lock:
+        if _hash_executor is None:
+            workers = settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+            if settings.PASSWORD_HASH_EXECUTOR == "process":
+                _hash_executor = ProcessPoolExecutor(max_workers=workers)
+            else:
+                # O bcrypt libera o GIL, entao threads ja usam varios nucleos.
+                _hash_executor = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix="password-hash"
+                )
+            logger.info(
+                "Password hash pool started (%s, %s workers)",
+                settings.PASSWORD_HASH_EXECUTOR,
+                workers,
+            )
+        return _hash_executor
+
+async def hash_password_async(password: str) -> str:
+    """Hash de senha no pool de hashing, sem bloquear o event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_hash_executor(), hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verifica senha no pool de hashing, sem bloquear o event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_hash_executor(), verify_password, plain_password, hashed_password
+    )
+
+def shutdown_password_hasher() -> None:
+    """Encerra o pool de hashing (chamado no shutdown da aplicacao)"""
+    global _hash_executor
+    with _hash_executor_lock:
+        executor, _hash_executor = _hash_executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
 def generate_verification_code() -> str:
     """Gera um código de verificação aleatório"""
     import secrets
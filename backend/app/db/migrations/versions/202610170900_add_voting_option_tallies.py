@@ -0,0 +1,42 @@
+"""add materialized per-option vote tallies
+
+Revision ID: 202610170900
+Revises: 202411251210
+Create Date: 2026-10-17 09:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "202610170900"
+down_revision = "202411251210"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "voting_option_tallies",
+        sa.Column("session_id", sa.Integer(), sa.ForeignKey("voting_sessions.id"), primary_key=True),
+        sa.Column("option_id", sa.Integer(), sa.ForeignKey("voting_options.id"), primary_key=True),
+        sa.Column("votes_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+    # Backfill a partir dos votos existentes
+    op.execute(
+        """
+        INSERT INTO voting_option_tallies (session_id, option_id, votes_count, updated_at)
+        SELECT vo.session_id, vo.id, COUNT(v.id), CURRENT_TIMESTAMP
+        FROM voting_options vo
+        LEFT JOIN votes v
+            ON v.session_id = vo.session_id
+            AND lower(v.choice) = lower(COALESCE(vo.value, vo.title))
+        GROUP BY vo.session_id, vo.id;
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("voting_option_tallies")
@@ -0,0 +1,32 @@
+"""add counter_shards table for sharded hot-row counters
+
+Revision ID: 202610170910
+Revises: 202610170900
+Create Date: 2026-10-17 09:10:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "202610170910"
+down_revision = "202610170900"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "counter_shards",
+        sa.Column("table_name", sa.String(), primary_key=True),
+        sa.Column("row_id", sa.Integer(), primary_key=True),
+        sa.Column("column_name", sa.String(), primary_key=True),
+        sa.Column("shard", sa.Integer(), primary_key=True),
+        sa.Column("value", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("counter_shards")
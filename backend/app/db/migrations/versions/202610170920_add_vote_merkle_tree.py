@@ -0,0 +1,46 @@
+"""add vote_merkle_nodes table and merkle columns on voting_sessions
+
+Revision ID: 202610170920
+Revises: 202610170910
+Create Date: 2026-10-17 09:20:00.000000
+
+Sessoes com votos anteriores a esta revisao devem ser reconstruidas com
+app/scripts/rebuild_merkle_tree.py.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "202610170920"
+down_revision = "202610170910"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "voting_sessions",
+        sa.Column("merkle_leaf_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.add_column("voting_sessions", sa.Column("merkle_root", sa.String(length=64), nullable=True))
+    op.create_table(
+        "vote_merkle_nodes",
+        sa.Column("session_id", sa.Integer(), sa.ForeignKey("voting_sessions.id"), primary_key=True),
+        sa.Column("level", sa.Integer(), primary_key=True),
+        sa.Column("position", sa.Integer(), primary_key=True),
+        sa.Column("hash", sa.String(length=64), nullable=False),
+    )
+    op.create_index(
+        "ix_vote_merkle_nodes_session_hash",
+        "vote_merkle_nodes",
+        ["session_id", "hash"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_vote_merkle_nodes_session_hash", table_name="vote_merkle_nodes")
+    op.drop_table("vote_merkle_nodes")
+    op.drop_column("voting_sessions", "merkle_root")
+    op.drop_column("voting_sessions", "merkle_leaf_count")
@@ -0,0 +1,30 @@
+"""add electorate snapshot and quorum threshold to voting_sessions
+
+Revision ID: 202610170930
+Revises: 202610170920
+Create Date: 2026-10-17 09:30:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "202610170930"
+down_revision = "202610170920"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("voting_sessions", sa.Column("eligible_voters_count", sa.Integer(), nullable=True))
+    op.add_column("voting_sessions", sa.Column("quorum_threshold", sa.Integer(), nullable=True))
+    op.add_column("voting_sessions", sa.Column("eligible_voters_bitmap", sa.LargeBinary(), nullable=True))
+    op.add_column("voting_sessions", sa.Column("electorate_snapshot_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("voting_sessions", "electorate_snapshot_at")
+    op.drop_column("voting_sessions", "eligible_voters_bitmap")
+    op.drop_column("voting_sessions", "quorum_threshold")
+    op.drop_column("voting_sessions", "eligible_voters_count")
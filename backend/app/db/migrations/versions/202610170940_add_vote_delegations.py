@@ -0,0 +1,39 @@
+"""add vote_delegations table for liquid democracy
+
+Revision ID: 202610170940
+Revises: 202610170930
+Create Date: 2026-10-17 09:40:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "202610170940"
+down_revision = "202610170930"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "vote_delegations",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("repository_id", sa.Integer(), sa.ForeignKey("repositories.id"), nullable=False),
+        sa.Column("delegator_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("delegate_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint(
+            "delegator_id", "repository_id", name="uq_delegation_delegator_repository"
+        ),
+    )
+    op.create_index("ix_vote_delegations_id", "vote_delegations", ["id"])
+    op.create_index("ix_vote_delegations_repository", "vote_delegations", ["repository_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_vote_delegations_repository", table_name="vote_delegations")
+    op.drop_index("ix_vote_delegations_id", table_name="vote_delegations")
+    op.drop_table("vote_delegations")
@@ -0,0 +1,35 @@
+"""add vote_turnout_buckets table for turnout time series
+
+Revision ID: 202610170950
+Revises: 202610170940
+Create Date: 2026-10-17 09:50:00.000000
+
+Os buckets de votos existentes sao preenchidos por app/scripts/rollup_turnout.py.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "202610170950"
+down_revision = "202610170940"
+branch_labels = None
+depends_on = None
+
+user_level = sa.Enum("ANONYMOUS", "REGISTERED", "FILIADO", "SPECIAL", name="userlevel", create_type=False)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "vote_turnout_buckets",
+        sa.Column("session_id", sa.Integer(), sa.ForeignKey("voting_sessions.id"), primary_key=True),
+        sa.Column("bucket_start", sa.DateTime(), primary_key=True),
+        sa.Column("user_level", user_level, primary_key=True),
+        sa.Column("votes_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("vote_turnout_buckets")
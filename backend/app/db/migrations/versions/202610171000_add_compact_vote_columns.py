@@ -0,0 +1,37 @@
+"""add compact vote columns (option_id, vote_digest) and relax vote_data
+
+Revision ID: 202610171000
+Revises: 202610170950
+Create Date: 2026-10-17 10:00:00.000000
+
+As linhas existentes sao convertidas em lotes, sem bloquear a tabela, por
+app/scripts/compact_votes.py.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "202610171000"
+down_revision = "202610170950"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "votes",
+        sa.Column("option_id", sa.Integer(), sa.ForeignKey("voting_options.id"), nullable=True),
+    )
+    op.add_column("votes", sa.Column("vote_digest", sa.LargeBinary(32), nullable=True))
+    op.create_index("ix_votes_vote_digest", "votes", ["vote_digest"], unique=True)
+    op.alter_column("votes", "vote_data", existing_type=sa.JSON(), nullable=True)
+
+
+def downgrade() -> None:
+    # Linhas compactas precisam voltar ao formato legado antes do downgrade.
+    op.alter_column("votes", "vote_data", existing_type=sa.JSON(), nullable=False)
+    op.drop_index("ix_votes_vote_digest", table_name="votes")
+    op.drop_column("votes", "vote_digest")
+    op.drop_column("votes", "option_id")
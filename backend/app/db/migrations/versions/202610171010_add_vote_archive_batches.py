@@ -0,0 +1,48 @@
+"""add vote_archive_batches and voting_sessions.archived_at
+
+Revision ID: 202610171010
+Revises: 202610171000
+Create Date: 2026-10-17 10:10:00.000000
+
+Os votos de sessoes encerradas sao movidos por app/scripts/archive_votes.py.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "202610171010"
+down_revision = "202610171000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("voting_sessions", sa.Column("archived_at", sa.DateTime(), nullable=True))
+    op.create_table(
+        "vote_archive_batches",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("session_id", sa.Integer(), sa.ForeignKey("voting_sessions.id"), nullable=False),
+        sa.Column("proposal_id", sa.Integer(), sa.ForeignKey("proposals.id"), nullable=True),
+        sa.Column("first_vote_id", sa.Integer(), nullable=False),
+        sa.Column("last_vote_id", sa.Integer(), nullable=False),
+        sa.Column("votes_count", sa.Integer(), nullable=False),
+        sa.Column("first_voted_at", sa.DateTime(), nullable=True),
+        sa.Column("last_voted_at", sa.DateTime(), nullable=True),
+        sa.Column("payload", sa.LargeBinary(), nullable=False),
+        sa.Column("checksum", sa.String(length=64), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_vote_archive_batches_id", "vote_archive_batches", ["id"])
+    op.create_index("ix_vote_archive_batches_session_id", "vote_archive_batches", ["session_id"])
+    op.create_index("ix_vote_archive_batches_proposal_id", "vote_archive_batches", ["proposal_id"])
+
+
+def downgrade() -> None:
+    # Restaurar os votos arquivados em votes antes do downgrade.
+    op.drop_index("ix_vote_archive_batches_proposal_id", table_name="vote_archive_batches")
+    op.drop_index("ix_vote_archive_batches_session_id", table_name="vote_archive_batches")
+    op.drop_index("ix_vote_archive_batches_id", table_name="vote_archive_batches")
+    op.drop_table("vote_archive_batches")
+    op.drop_column("voting_sessions", "archived_at")
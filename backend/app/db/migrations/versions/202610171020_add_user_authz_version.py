@@ -0,0 +1,27 @@
+"""add users.authz_version
+
+Revision ID: 202610171020
+Revises: 202610171010
+Create Date: 2026-10-17 10:20:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "202610171020"
+down_revision = "202610171010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column("authz_version", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("users", "authz_version")
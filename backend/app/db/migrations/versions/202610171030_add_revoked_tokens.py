@@ -0,0 +1,42 @@
+"""add revoked_tokens table for server-side logout
+
+Revision ID: 202610171030
+Revises: 202610171020
+Create Date: 2026-10-17 10:30:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "202610171030"
+down_revision = "202610171020"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "revoked_tokens",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("jti", sa.String(length=64), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("token_type", sa.String(length=16), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("revoked_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_revoked_tokens_id", "revoked_tokens", ["id"])
+    op.create_index("ix_revoked_tokens_jti", "revoked_tokens", ["jti"], unique=True)
+    op.create_index("ix_revoked_tokens_user_id", "revoked_tokens", ["user_id"])
+    op.create_index("ix_revoked_tokens_expires_at", "revoked_tokens", ["expires_at"])
+    op.create_index("ix_revoked_tokens_revoked_at", "revoked_tokens", ["revoked_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_revoked_tokens_revoked_at", table_name="revoked_tokens")
+    op.drop_index("ix_revoked_tokens_expires_at", table_name="revoked_tokens")
+    op.drop_index("ix_revoked_tokens_user_id", table_name="revoked_tokens")
+    op.drop_index("ix_revoked_tokens_jti", table_name="revoked_tokens")
+    op.drop_index("ix_revoked_tokens_id", table_name="revoked_tokens")
+    op.drop_table("revoked_tokens")
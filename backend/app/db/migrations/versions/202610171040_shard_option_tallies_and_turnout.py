@@ -0,0 +1,59 @@
+"""add shard column to voting_option_tallies and vote_turnout_buckets
+
+Revision ID: 202610171040
+Revises: 202610171030
+Create Date: 2026-10-17 10:40:00.000000
+
+As linhas existentes ficam na parcela 0; com COUNTER_SHARDS > 1 os votos
+seguintes se espalham pelas demais.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "202610171040"
+down_revision = "202610171030"
+branch_labels = None
+depends_on = None
+
+SHARDED_TABLES = {
+    "voting_option_tallies": ["session_id", "option_id"],
+    "vote_turnout_buckets": ["session_id", "bucket_start", "user_level"],
+}
+
+
+def _set_primary_key(table: str, columns) -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        # SQLite nao altera a chave primaria no lugar: o batch recria a tabela.
+        with op.batch_alter_table(table, recreate="always") as batch:
+            batch.create_primary_key(f"{table}_pkey", columns)
+    else:
+        op.drop_constraint(f"{table}_pkey", table, type_="primary")
+        op.create_primary_key(f"{table}_pkey", table, columns)
+
+
+def upgrade() -> None:
+    for table, key in SHARDED_TABLES.items():
+        op.add_column(
+            table, sa.Column("shard", sa.Integer(), nullable=False, server_default="0")
+        )
+        _set_primary_key(table, key + ["shard"])
+
+
+def downgrade() -> None:
+    for table, key in SHARDED_TABLES.items():
+        # Junta as parcelas em uma linha antes de voltar a chave sem shard.
+        columns = ", ".join(key)
+        op.execute(
+            f"""
+            INSERT INTO {table} ({columns}, shard, votes_count, updated_at)
+            SELECT {columns}, -1, SUM(votes_count), MAX(updated_at)
+            FROM {table} GROUP BY {columns}
+            """
+        )
+        op.execute(f"DELETE FROM {table} WHERE shard <> -1")
+        _set_primary_key(table, key)
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column("shard")
@@ -0,0 +1,27 @@
+"""add users.authz_changed_at for incremental authz version reads
+
+Revision ID: 202610171050
+Revises: 202610171040
+Create Date: 2026-10-17 10:50:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "202610171050"
+down_revision = "202610171040"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Linhas antigas ficam nulas: a recarga completa do mapa ja as cobre.
+    op.add_column("users", sa.Column("authz_changed_at", sa.DateTime(), nullable=True))
+    op.create_index("ix_users_authz_changed_at", "users", ["authz_changed_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_authz_changed_at", table_name="users")
+    op.drop_column("users", "authz_changed_at")
@@ -0,0 +1,48 @@
+"""add vote_archive_voters to locate an archived vote by voter
+
+Revision ID: 202610171100
+Revises: 202610171050
+Create Date: 2026-10-17 11:00:00.000000
+"""
+
+import json
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "202610171100"
+down_revision = "202610171050"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    voters = op.create_table(
+        "vote_archive_voters",
+        sa.Column("session_id", sa.Integer(), sa.ForeignKey("voting_sessions.id"), primary_key=True),
+        sa.Column("user_id", sa.Integer(), primary_key=True),
+        sa.Column("batch_id", sa.Integer(), sa.ForeignKey("vote_archive_batches.id"), nullable=False),
+    )
+
+    # Indexa os lotes ja arquivados, um por vez.
+    bind = op.get_bind()
+    batch_ids = [row[0] for row in bind.execute(sa.text("SELECT id FROM vote_archive_batches"))]
+    for batch_id in batch_ids:
+        session_id, payload = bind.execute(
+            sa.text("SELECT session_id, payload FROM vote_archive_batches WHERE id = :id"),
+            {"id": batch_id},
+        ).one()
+        lines = zlib.decompress(payload).decode("utf-8").splitlines()
+        rows = [
+            {"session_id": session_id, "user_id": json.loads(line)["user_id"], "batch_id": batch_id}
+            for line in lines
+        ]
+        if rows:
+            op.bulk_insert(voters, rows)
+
+
+def downgrade() -> None:
+    op.drop_table("vote_archive_voters")
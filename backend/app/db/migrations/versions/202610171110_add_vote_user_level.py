@@ -0,0 +1,31 @@
+"""add votes.user_level (voter level at vote time)
+
+Revision ID: 202610171110
+Revises: 202610171100
+Create Date: 2026-10-17 11:10:00.000000
+
+Votos anteriores recebem o nivel atual do usuario, o melhor dado disponivel.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "202610171110"
+down_revision = "202610171100"
+branch_labels = None
+depends_on = None
+
+user_level = sa.Enum("ANONYMOUS", "REGISTERED", "FILIADO", "SPECIAL", name="userlevel", create_type=False)
+
+
+def upgrade() -> None:
+    op.add_column("votes", sa.Column("user_level", user_level, nullable=True))
+    op.execute(
+        "UPDATE votes SET user_level = (SELECT users.level FROM users WHERE users.id = votes.user_id)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("votes", "user_level")
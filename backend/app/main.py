@@ -6,8 +6,12 @@ import uvicorn
 
 from app.core.config import settings
 from app.core.database import engine, Base
+from app.core.security import shutdown_password_hasher
 from app.api.v1.router import api_router
 from app.core.logging import setup_logging
+from app.services.counters import start_counter_folder, stop_counter_folder
+from app.services.vote_ingestion import shutdown_deferred_vote_writer, shutdown_vote_batcher
+from app.services.voting_scheduler import start_voting_scheduler, stop_voting_scheduler
 
 # Setup logging
 logger = setup_logging()
@@ -24,11 +28,19 @@ async def lifespan(app: FastAPI):
         logger.info("Tabelas do banco de dados criadas com sucesso!")
     except Exception as e:
         logger.error(f"Erro ao criar tabelas: {e}")
+
+    start_counter_folder()
+    start_voting_scheduler()
     
     yield
     
     # Shutdown
     logger.info("Encerrando CivicGit Backend...")
+    stop_voting_scheduler()
+    shutdown_vote_batcher()
+    shutdown_deferred_vote_writer()
+    stop_counter_folder()
+    shutdown_password_hasher()
 
 # Criar a aplicação FastAPI
 app = FastAPI(
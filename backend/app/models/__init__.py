@@ -2,9 +2,13 @@ from app.models.user import User
 from app.models.repository import Repository
 from app.models.proposal import Proposal, ProposalSignature
 from app.models.issue import Issue, IssueComment
-from app.models.vote import Vote, VotingSession, VotingOption
+from app.models.vote import Vote, VoteArchiveBatch, VoteArchiveVoter, VoteMerkleNode, VotingSession, VotingOption, VotingOptionTally
+from app.models.turnout import VoteTurnoutBucket
 from app.models.commit import Commit
 from app.models.file import File
+from app.models.counter import CounterShard
+from app.models.delegation import VoteDelegation
+from app.models.token import RevokedToken
 
 __all__ = [
     "User",
@@ -16,6 +20,14 @@ __all__ = [
     "Vote",
     "VotingSession",
     "VotingOption",
+    "VotingOptionTally",
+    "VoteMerkleNode",
+    "VoteArchiveBatch",
+    "VoteArchiveVoter",
     "Commit",
-    "File"
+    "File",
+    "CounterShard",
+    "VoteDelegation",
+    "VoteTurnoutBucket",
+    "RevokedToken",
 ]
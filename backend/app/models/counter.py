@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String
+
+from app.core.database import Base
+
+
+class CounterShard(Base):
+    """
+    Parcela de um contador quente (ex.: voting_sessions.total_votes).
+
+    Cada escrita incrementa uma parcela aleatoria; o valor real e a coluna
+    canonica somada as parcelas ainda nao consolidadas.
+    """
+
+    __tablename__ = "counter_shards"
+
+    table_name = Column(String, primary_key=True)
+    row_id = Column(Integer, primary_key=True)
+    column_name = Column(String, primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return (
+            f"<CounterShard({self.table_name}.{self.column_name}[{self.row_id}] "
+            f"shard={self.shard}, value={self.value})>"
+        )
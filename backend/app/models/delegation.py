@@ -0,0 +1,38 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, UniqueConstraint
+from sqlalchemy.orm import relationship
+
+from app.core.database import Base
+
+
+class VoteDelegation(Base):
+    """
+    Delegacao de voto (democracia liquida) de um filiado para outro, por repositorio.
+
+    Se o delegante nao votar diretamente numa sessao do repositorio, seu voto
+    segue a cadeia de delegacoes ate o primeiro eleitor que votou.
+    """
+
+    __tablename__ = "vote_delegations"
+    __table_args__ = (
+        UniqueConstraint("delegator_id", "repository_id", name="uq_delegation_delegator_repository"),
+        Index("ix_vote_delegations_repository", "repository_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    repository_id = Column(Integer, ForeignKey("repositories.id"), nullable=False)
+    delegator_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    delegate_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    repository = relationship("Repository")
+    delegator = relationship("User", foreign_keys=[delegator_id])
+    delegate = relationship("User", foreign_keys=[delegate_id])
+
+    def __repr__(self):
+        return (
+            f"<VoteDelegation(repository={self.repository_id}, "
+            f"{self.delegator_id} -> {self.delegate_id})>"
+        )
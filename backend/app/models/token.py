@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String
+
+from app.core.database import Base
+
+
+class RevokedToken(Base):
+    """
+    Token JWT revogado (logout), identificado pelo jti.
+
+    Cada worker espelha a tabela em um filtro de Bloom
+    (app.services.token_revocation), lendo as linhas novas por revoked_at.
+    Linhas de tokens ja expirados sao removidas por
+    app/scripts/prune_revoked_tokens.py.
+    """
+
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String(64), unique=True, index=True, nullable=False)
+    user_id = Column(Integer, index=True, nullable=True)
+    token_type = Column(String(16), nullable=False)
+    expires_at = Column(DateTime, index=True, nullable=False)
+    revoked_at = Column(DateTime, index=True, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<RevokedToken(jti='{self.jti}', type={self.token_type}, user={self.user_id})>"
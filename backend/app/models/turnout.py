@@ -0,0 +1,31 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Enum, ForeignKey, Integer
+
+from app.core.database import Base
+from app.models.user import UserLevel
+
+
+class VoteTurnoutBucket(Base):
+    """
+    Votos por minuto e nivel de usuario de uma sessao (serie de comparecimento).
+
+    Incrementado junto com o voto (em parcelas, com COUNTER_SHARDS > 1);
+    app/scripts/rollup_turnout.py reconstroi a partir de votes. Parcelas e
+    buckets por hora sao somados na leitura.
+    """
+
+    __tablename__ = "vote_turnout_buckets"
+
+    session_id = Column(Integer, ForeignKey("voting_sessions.id"), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    user_level = Column(Enum(UserLevel), primary_key=True)
+    shard = Column(Integer, primary_key=True, default=0)
+    votes_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return (
+            f"<VoteTurnoutBucket(session={self.session_id}, start={self.bucket_start}, "
+            f"level={self.user_level}, shard={self.shard}, votes={self.votes_count})>"
+        )
@@ -12,7 +12,50 @@ class UserLevel(enum.Enum):
     SPECIAL = 3     # Coordenação/diretório local (admin)
 
 
-class User(Base):
+class UserPermissionsMixin:
+    """Regras de autorização derivadas de level, is_superuser e is_verified.
+
+    Compartilhadas por User e pelo Principal em cache (app.services.principal_cache).
+    """
+
+    __slots__ = ()
+
+    @property
+    def is_affiliate(self):
+        """Indica se o usuário é filiado (PDT Itaguara)."""
+        return (
+            self.level in [UserLevel.FILIADO, UserLevel.SPECIAL]
+            or self.is_superuser
+            or self.is_verified  # compatibilidade com flag legado
+        )
+
+    @property
+    def is_filiado(self):
+        # Alias explícito para linguagem de negócio
+        return self.is_affiliate
+    
+    @property
+    def is_registered(self):
+        return (
+            self.level in [UserLevel.REGISTERED, UserLevel.FILIADO, UserLevel.SPECIAL]
+            or self.is_superuser
+        )
+    
+    @property
+    def can_create_proposals(self):
+        # Registrados podem propor em repositórios públicos; filiados em todos os níveis autorizados.
+        return self.is_registered
+    
+    @property
+    def can_vote(self):
+        return self.level in [UserLevel.FILIADO, UserLevel.SPECIAL] or self.is_superuser
+    
+    @property
+    def can_moderate(self):
+        return self.level == UserLevel.SPECIAL or self.is_superuser
+
+
+class User(UserPermissionsMixin, Base):
     __tablename__ = "users"
     
     id = Column(Integer, primary_key=True, index=True)
@@ -36,6 +79,10 @@ class User(Base):
     # Status
     is_active = Column(Boolean, default=True)
     is_superuser = Column(Boolean, default=False)
+    # Incrementado a cada mudança de nível/flags; invalida as claims de tokens já emitidos
+    authz_version = Column(Integer, default=0, server_default="0", nullable=False)
+    # Momento do ultimo incremento de authz_version; leitura incremental do mapa de versoes
+    authz_changed_at = Column(DateTime, default=datetime.utcnow, index=True)
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -77,37 +124,4 @@ class User(Base):
     
     def __repr__(self):
         return f"<User(id={self.id}, username='{self.username}', level={self.level})>"
-    
-    @property
-    def is_affiliate(self):
-        """Indica se o usuário é filiado (PDT Itaguara)."""
-        return (
-            self.level in [UserLevel.FILIADO, UserLevel.SPECIAL]
-            or self.is_superuser
-            or self.is_verified  # compatibilidade com flag legado
-        )
 
-    @property
-    def is_filiado(self):
-        # Alias explícito para linguagem de negócio
-        return self.is_affiliate
-    
-    @property
-    def is_registered(self):
-        return (
-            self.level in [UserLevel.REGISTERED, UserLevel.FILIADO, UserLevel.SPECIAL]
-            or self.is_superuser
-        )
-    
-    @property
-    def can_create_proposals(self):
-        # Registrados podem propor em repositórios públicos; filiados em todos os níveis autorizados.
-        return self.is_registered
-    
-    @property
-    def can_vote(self):
-        return self.level in [UserLevel.FILIADO, UserLevel.SPECIAL] or self.is_superuser
-    
-    @property
-    def can_moderate(self):
-        return self.level == UserLevel.SPECIAL or self.is_superuser
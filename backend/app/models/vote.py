@@ -8,6 +8,8 @@ from sqlalchemy import (
     DateTime,
     ForeignKey,
     Enum,
+    Index,
+    LargeBinary,
     Text,
     UniqueConstraint,
     JSON,
@@ -15,6 +17,7 @@ from sqlalchemy import (
 from sqlalchemy.orm import relationship
 
 from app.core.database import Base
+from app.models.user import UserLevel
 
 
 class VotingMethod(enum.Enum):
@@ -53,6 +56,16 @@ class VotingSession(Base):
     result_metadata = Column(JSON, nullable=True)
     winner_option_id = Column(Integer, ForeignKey("voting_options.id"), nullable=True)
     total_votes = Column(Integer, default=0)
+    merkle_leaf_count = Column(Integer, nullable=False, default=0)
+    merkle_root = Column(String(64), nullable=True)
+
+    # Retrato do eleitorado tirado na abertura (app.services.electorate).
+    eligible_voters_count = Column(Integer, nullable=True)
+    quorum_threshold = Column(Integer, nullable=True)
+    eligible_voters_bitmap = Column(LargeBinary, nullable=True)
+    electorate_snapshot_at = Column(DateTime, nullable=True)
+    # Votos movidos para vote_archive_batches (app.services.vote_archive).
+    archived_at = Column(DateTime, nullable=True)
 
     proposal = relationship("Proposal", back_populates="voting_sessions")
     repository = relationship("Repository", back_populates="voting_sessions")
@@ -69,6 +82,9 @@ class VotingSession(Base):
     winner_option = relationship(
         "VotingOption", foreign_keys=[winner_option_id], post_update=True
     )
+    tallies = relationship(
+        "VotingOptionTally", back_populates="session", cascade="all, delete-orphan"
+    )
 
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -101,6 +117,97 @@ class VotingOption(Base):
         return f"<VotingOption(id={self.id}, title='{self.title}')>"
 
 
+class VotingOptionTally(Base):
+    """
+    Contador materializado de votos por opcao (atualizado junto com o voto).
+
+    Com COUNTER_SHARDS > 1 cada voto incrementa uma parcela aleatoria da
+    opcao; o valor da opcao e a soma das parcelas.
+    """
+
+    __tablename__ = "voting_option_tallies"
+
+    session_id = Column(Integer, ForeignKey("voting_sessions.id"), primary_key=True)
+    option_id = Column(Integer, ForeignKey("voting_options.id"), primary_key=True)
+    shard = Column(Integer, primary_key=True, default=0)
+    votes_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    session = relationship("VotingSession", back_populates="tallies")
+    option = relationship("VotingOption")
+
+    def __repr__(self):
+        return (
+            f"<VotingOptionTally(session={self.session_id}, option={self.option_id}, "
+            f"shard={self.shard}, votes={self.votes_count})>"
+        )
+
+
+class VoteMerkleNode(Base):
+    """
+    No da arvore Merkle de auditoria (append-only) de uma sessao.
+
+    Nivel 0 guarda as folhas (vote_hash na ordem de chegada); niveis acima so
+    existem para subarvores completas, que nunca mudam depois de gravadas.
+    """
+
+    __tablename__ = "vote_merkle_nodes"
+    __table_args__ = (Index("ix_vote_merkle_nodes_session_hash", "session_id", "hash"),)
+
+    session_id = Column(Integer, ForeignKey("voting_sessions.id"), primary_key=True)
+    level = Column(Integer, primary_key=True)
+    position = Column(Integer, primary_key=True)
+    hash = Column(String(64), nullable=False)
+
+    def __repr__(self):
+        return (
+            f"<VoteMerkleNode(session={self.session_id}, level={self.level}, "
+            f"position={self.position})>"
+        )
+
+
+class VoteArchiveBatch(Base):
+    """
+    Lote comprimido (zlib, NDJSON) de votos de uma sessao encerrada.
+
+    Os votos saem de votes quando a sessao e arquivada; o resultado e a raiz
+    Merkle continuam em VotingSession.result_metadata e os nos da arvore ficam.
+    """
+
+    __tablename__ = "vote_archive_batches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(Integer, ForeignKey("voting_sessions.id"), nullable=False, index=True)
+    proposal_id = Column(Integer, ForeignKey("proposals.id"), nullable=True, index=True)
+    first_vote_id = Column(Integer, nullable=False)
+    last_vote_id = Column(Integer, nullable=False)
+    votes_count = Column(Integer, nullable=False)
+    first_voted_at = Column(DateTime, nullable=True)
+    last_voted_at = Column(DateTime, nullable=True)
+    payload = Column(LargeBinary, nullable=False)
+    checksum = Column(String(64), nullable=False)  # sha256 do NDJSON descomprimido
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return (
+            f"<VoteArchiveBatch(session={self.session_id}, votes={self.first_vote_id}"
+            f"..{self.last_vote_id})>"
+        )
+
+
+class VoteArchiveVoter(Base):
+    """
+    Indice (sessao, eleitor) -> lote arquivado com o voto, para achar o voto
+    de um usuario descomprimindo um unico lote.
+    """
+
+    __tablename__ = "vote_archive_voters"
+
+    session_id = Column(Integer, ForeignKey("voting_sessions.id"), primary_key=True)
+    user_id = Column(Integer, primary_key=True)
+    batch_id = Column(Integer, ForeignKey("vote_archive_batches.id"), nullable=False)
+
+
 class Vote(Base):
     __tablename__ = "votes"
 
@@ -109,19 +216,51 @@ class Vote(Base):
     proposal_id = Column(Integer, ForeignKey("proposals.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
 
+    # Formato legado: choice + vote_data completo + vote_hash em hex.
+    # Formato compacto (VOTE_STORAGE_MODE=compact): option_id + vote_digest de
+    # 32 bytes; vote_data so guarda o que a opcao nao diz (ranking, aprovadas,
+    # alocacoes) e fica nulo no voto simples.
     choice = Column(String, nullable=True)
-    vote_data = Column(JSON, nullable=False)
+    vote_data = Column(JSON(none_as_null=True), nullable=True)
     vote_hash = Column(String, index=True, unique=True, nullable=True)
+    option_id = Column(Integer, ForeignKey("voting_options.id"), nullable=True)
+    vote_digest = Column(LargeBinary(32), index=True, unique=True, nullable=True)
     ip_address = Column(String, nullable=True)
     user_agent = Column(String, nullable=True)
     voted_at = Column(DateTime, default=datetime.utcnow)
+    # Nivel do eleitor quando votou; a serie de comparecimento agrupa por ele.
+    user_level = Column(Enum(UserLevel), nullable=True)
 
     session = relationship("VotingSession", back_populates="votes")
     user = relationship("User", back_populates="votes")
+    option = relationship("VotingOption")
 
     __table_args__ = (
         UniqueConstraint("session_id", "user_id", name="uq_session_user_vote"),
     )
 
+    @property
+    def receipt(self):
+        """Comprovante em hex, qualquer que seja o formato da linha."""
+        if self.vote_digest is not None:
+            return self.vote_digest.hex()
+        return self.vote_hash
+
+    @property
+    def selected_value(self):
+        """Valor da opcao principal (a antiga coluna choice)."""
+        if self.choice is not None:
+            return self.choice
+        return self.option.value if self.option is not None else None
+
+    @property
+    def ballot(self):
+        """vote_data no formato legado; no voto simples compacto e remontado da opcao."""
+        if self.vote_data is not None:
+            return self.vote_data
+        if self.option is None:
+            return {}
+        return {"option_id": self.option.id, "value": self.option.value, "title": self.option.title}
+
     def __repr__(self):
         return f"<Vote(id={self.id}, user={self.user_id}, session={self.session_id})>"
@@ -5,8 +5,28 @@ from app.schemas.repository import Repository, RepositoryCreate, RepositoryUpdat
 from app.schemas.proposal import Proposal, ProposalCreate, ProposalUpdate
 from app.schemas.issue import Issue, IssueCreate, IssueUpdate
 from app.schemas.user import User, UserCreate, UserInDB, UserUpdate, UserAdminUpdate
-from app.schemas.vote import VoteRequest, VoteResponse
-from app.schemas.voting import ActiveVotingSession, UserVotingState, VotingStats
+from app.schemas.delegation import Delegation, DelegationCreate
+from app.schemas.vote import (
+    BatchVoteItem,
+    BatchVoteRequest,
+    BatchVoteResponse,
+    BatchVoteResult,
+    MerkleInclusionProof,
+    VoteRequest,
+    VoteResponse,
+)
+from app.schemas.voting import (
+    ActiveVotingSession,
+    TurnoutBucket,
+    TurnoutSeries,
+    UserVotingState,
+    VotingLevelBreakdown,
+    VotingOptionCreate,
+    VotingSessionCreate,
+    VotingSessionResult,
+    VotingSessionSummary,
+    VotingStats,
+)
 
 __all__: List[str] = [
     "User",
@@ -28,8 +48,22 @@ __all__: List[str] = [
     "IssueUpdate",
     "ProposalUpdate",
     "VoteRequest",
+    "MerkleInclusionProof",
+    "BatchVoteItem",
+    "BatchVoteRequest",
+    "BatchVoteResult",
+    "BatchVoteResponse",
+    "Delegation",
+    "DelegationCreate",
     "VoteResponse",
     "ActiveVotingSession",
     "UserVotingState",
     "VotingStats",
+    "VotingOptionCreate",
+    "VotingSessionCreate",
+    "VotingSessionSummary",
+    "TurnoutBucket",
+    "TurnoutSeries",
+    "VotingLevelBreakdown",
+    "VotingSessionResult",
 ]
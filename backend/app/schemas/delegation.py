@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class DelegationCreate(BaseModel):
+    delegate_id: int
+
+
+class Delegation(BaseModel):
+    id: int
+    repository_id: int
+    delegator_id: int
+    delegate_id: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
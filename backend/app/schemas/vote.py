@@ -1,10 +1,14 @@
 from datetime import datetime
+from typing import Dict, List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class VoteRequest(BaseModel):
-    option: str
+    option: Optional[str] = None  # votacao simples
+    ranking: Optional[List[str]] = None  # ranqueada: valores em ordem de preferencia
+    approvals: Optional[List[str]] = None  # aprovacao: valores aprovados
+    allocations: Optional[Dict[str, int]] = None  # quadratica: valor -> votos
 
 
 class VoteResponse(BaseModel):
@@ -15,6 +19,40 @@ class VoteResponse(BaseModel):
     total_votes: int
     message: str
     voted_at: datetime
+    receipt: Optional[str] = None
+    merkle_leaf_index: Optional[int] = None
 
     class Config:
         from_attributes = True
+
+
+class BatchVoteItem(VoteRequest):
+    proposal_id: int
+
+
+class BatchVoteRequest(BaseModel):
+    votes: List[BatchVoteItem] = Field(..., min_length=1, max_length=100)
+
+
+class BatchVoteResult(BaseModel):
+    proposal_id: int
+    accepted: bool
+    detail: Optional[str] = None
+    vote: Optional[VoteResponse] = None
+
+
+class BatchVoteResponse(BaseModel):
+    accepted: int
+    rejected: int
+    results: List[BatchVoteResult]
+
+
+class MerkleInclusionProof(BaseModel):
+    session_id: int
+    receipt: str
+    leaf_hash: str
+    leaf_index: int
+    tree_size: int
+    root: str
+    audit_path: List[str]
+    finalized: bool
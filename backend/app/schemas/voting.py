@@ -1,7 +1,9 @@
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from app.models.vote import VotingMethod, VotingStatus
 
 
 class VotingStats(BaseModel):
@@ -9,6 +11,10 @@ class VotingStats(BaseModel):
     yes_votes: int
     no_votes: int
     abstain_votes: int
+    option_votes: Dict[str, int] = Field(default_factory=dict)
+    eligible_voters: Optional[int] = None
+    quorum_threshold: Optional[int] = None
+    quorum_reached: Optional[bool] = None
 
 
 class UserVotingState(BaseModel):
@@ -29,3 +35,87 @@ class ActiveVotingSession(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class VotingOptionCreate(BaseModel):
+    value: str
+    title: str
+    description: Optional[str] = None
+
+
+class VotingSessionCreate(BaseModel):
+    proposal_id: int
+    title: Optional[str] = None
+    description: Optional[str] = None
+    method: VotingMethod = VotingMethod.SIMPLE
+    options: List[VotingOptionCreate] = Field(..., min_length=2)
+    starts_at: Optional[datetime] = None
+    ends_at: Optional[datetime] = None
+    quorum_required: Optional[int] = None
+
+
+class VotingOptionSummary(BaseModel):
+    id: int
+    value: Optional[str] = None
+    title: str
+    description: Optional[str] = None
+    order: int
+
+    class Config:
+        from_attributes = True
+
+
+class VotingSessionSummary(BaseModel):
+    id: int
+    proposal_id: Optional[int] = None
+    repository_id: Optional[int] = None
+    title: str
+    method: VotingMethod
+    status: VotingStatus
+    starts_at: datetime
+    ends_at: datetime
+    quorum_required: Optional[int] = None
+    options: List[VotingOptionSummary]
+
+    class Config:
+        from_attributes = True
+
+
+class TurnoutBucket(BaseModel):
+    bucket_start: datetime
+    votes: int
+    cumulative_votes: int
+    by_level: Dict[str, int] = Field(default_factory=dict)
+    turnout_percentage: Optional[float] = None
+
+
+class TurnoutSeries(BaseModel):
+    session_id: int
+    granularity: str
+    total_votes: int
+    eligible_voters: Optional[int] = None
+    turnout_percentage: Optional[float] = None
+    by_level: Dict[str, int] = Field(default_factory=dict)
+    buckets: List[TurnoutBucket]
+
+
+class VotingLevelBreakdown(BaseModel):
+    votes: int
+    option_votes: Dict[str, int] = Field(default_factory=dict)
+
+
+class VotingSessionResult(BaseModel):
+    session_id: int
+    proposal_id: Optional[int] = None
+    repository_id: Optional[int] = None
+    title: str
+    method: Optional[VotingMethod] = None
+    status: VotingStatus
+    calculated_at: Optional[datetime] = None
+    winner_option_id: Optional[int] = None
+    total_votes: int
+    stats: Optional[VotingStats] = None
+    by_level: Dict[str, VotingLevelBreakdown] = Field(default_factory=dict)
+    quorum: Optional[Dict[str, Any]] = None
+    merkle_root: Optional[str] = None
+    result: Dict[str, Any] = Field(default_factory=dict)
@@ -0,0 +1,48 @@
+import argparse
+import sys
+
+# Garantir que /app está no PYTHONPATH quando rodar via docker exec
+if "/app" not in sys.path:
+    sys.path.append("/app")
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.vote_archive import ARCHIVE_CHUNK_SIZE, archivable_session_ids, archive_next_chunk
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Move os votos de sessoes encerradas para o arquivo comprimido."
+    )
+    parser.add_argument("--older-than-days", type=int, default=settings.VOTE_ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--session", type=int, action="append", help="arquiva apenas estas sessoes")
+    parser.add_argument("--chunk-size", type=int, default=ARCHIVE_CHUNK_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="apenas lista as sessoes")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        session_ids = args.session or archivable_session_ids(db, args.older_than_days)
+        db.rollback()
+        for session_id in session_ids:
+            if args.dry_run:
+                print(f"session {session_id}: would archive")
+                continue
+            archived = 0
+            while True:
+                moved = archive_next_chunk(db, session_id, args.chunk_size)
+                db.commit()
+                if not moved:
+                    break
+                archived += moved
+            print(f"session {session_id}: archived {archived} votes")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Garantir que /app está no PYTHONPATH quando rodar via docker exec
+if "/app" not in sys.path:
+    sys.path.append("/app")
+
+from jose import JWTError, jwt
+
+from app.core.config import settings
+from app.core.jwt_backend import HMACJWTBackend, JoseJWTBackend
+
+
+def _legacy_verify(token, token_type="access"):
+    # Copia do security.verify_token anterior aos backends, como referencia.
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        if payload.get("type") != token_type:
+            return None
+        exp = payload.get("exp")
+        if exp is None or datetime.utcnow() > datetime.fromtimestamp(exp):
+            return None
+        return payload
+    except JWTError:
+        return None
+
+
+def _backend_verify(backend):
+    def verify(token, token_type="access"):
+        payload = backend.decode(token)
+        if payload is None or payload.get("type") != token_type:
+            return None
+        return payload
+
+    return verify
+
+
+def _rate(func, tokens, seconds):
+    """Chamadas por segundo em uma thread (um nucleo), repetindo a lista de tokens."""
+    calls = 0
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for token in tokens:
+            func(token)
+        calls += len(tokens)
+    return calls / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compara tokens JWT verificados por segundo por nucleo entre os backends."
+    )
+    parser.add_argument("--tokens", type=int, default=1000, help="tokens distintos por rodada")
+    parser.add_argument("--seconds", type=float, default=2.0, help="duracao de cada medicao")
+    parser.add_argument("--invalid", action="store_true", help="mede tokens com assinatura errada")
+    args = parser.parse_args()
+
+    jose_backend = JoseJWTBackend(settings.SECRET_KEY, settings.ALGORITHM)
+    hmac_backend = HMACJWTBackend(settings.SECRET_KEY, settings.ALGORITHM)
+    expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    claims = [
+        {"sub": str(user_id), "exp": expire, "iat": int(time.time()), "jti": f"{user_id:032x}", "type": "access"}
+        for user_id in range(1, args.tokens + 1)
+    ]
+    tokens = [jose_backend.encode(claim) for claim in claims]
+    if args.invalid:
+        tokens = [token[:-4] + ("AAAA" if not token.endswith("AAAA") else "BBBB") for token in tokens]
+
+    # Os dois backends aceitam os tokens um do outro.
+    assert all(hmac_backend.decode(token) == jose_backend.decode(token) for token in tokens[:50])
+    assert jose_backend.decode(hmac_backend.encode(claims[0])) is not None
+
+    results = [
+        ("legacy verify_token (jose)", _rate(_legacy_verify, tokens, args.seconds)),
+        ("backend jose", _rate(_backend_verify(jose_backend), tokens, args.seconds)),
+        ("backend hmac", _rate(_backend_verify(hmac_backend), tokens, args.seconds)),
+    ]
+    baseline = results[0][1]
+    print(f"{settings.ALGORITHM}, {len(tokens)} tokens{' (invalid)' if args.invalid else ''}")
+    for name, rate in results:
+        print(f"{name:28s} {rate:12,.0f} verify/s/core  x{rate / baseline:.2f}")
+
+    sign_jose = _rate(jose_backend.encode, claims, args.seconds)
+    sign_hmac = _rate(hmac_backend.encode, claims, args.seconds)
+    print(f"{'sign jose':28s} {sign_jose:12,.0f} sign/s/core")
+    print(f"{'sign hmac':28s} {sign_hmac:12,.0f} sign/s/core  x{sign_hmac / sign_jose:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+# Garantir que /app está no PYTHONPATH quando rodar via docker exec
+if "/app" not in sys.path:
+    sys.path.append("/app")
+
+import httpx
+
+from app.core import security
+
+
+def _percentile(samples, percent):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _probe(client, path, stop, latencies, interval):
+    # A latencia conta a partir do horario agendado, entao inclui o tempo em que
+    # o event loop ficou travado antes de conseguir enviar a requisicao.
+    scheduled = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        await client.get(path)
+        finished = time.perf_counter()
+        latencies.append((finished - scheduled) * 1000)
+        scheduled = max(scheduled + interval, finished)
+
+
+async def _login(client, username, password, limiter, statuses):
+    async with limiter:
+        response = await client.post(
+            "/api/v1/auth/login", data={"username": username, "password": password}
+        )
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+
+async def run(args):
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=120)
+    else:
+        # Em processo: cliente e app dividem o mesmo event loop, como em um worker uvicorn.
+        from app.main import app
+
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120
+        )
+
+    async with client:
+        baseline = []
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe(client, args.probe_path, stop, baseline, args.probe_interval))
+        await asyncio.sleep(args.warmup)
+        stop.set()
+        await probe
+
+        storm = []
+        statuses = {}
+        stop = asyncio.Event()
+        limiter = asyncio.Semaphore(args.concurrency)
+        started = time.perf_counter()
+        probe = asyncio.create_task(_probe(client, args.probe_path, stop, storm, args.probe_interval))
+        await asyncio.gather(
+            *(
+                _login(client, args.username, args.password, limiter, statuses)
+                for _ in range(args.logins)
+            )
+        )
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await probe
+
+    print(f"logins: {args.logins} in {elapsed:.2f}s ({args.logins / elapsed:.1f}/s) status={statuses}")
+    for label, samples in (("idle", baseline), ("login storm", storm)):
+        if not samples:
+            print(f"{label}: no probe samples")
+            continue
+        print(
+            f"{label}: {args.probe_path} n={len(samples)} "
+            f"p50={statistics.median(samples):.1f}ms "
+            f"p99={_percentile(samples, 99):.1f}ms max={max(samples):.1f}ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Mede a latencia de um endpoint leve durante uma rajada de logins."
+    )
+    parser.add_argument("--base-url", help="servidor em execucao; sem ele roda o app em processo")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=50,
+        help="logins simultaneos; em processo com SQLite (pool de 1 conexao) use 1 com --blocking",
+    )
+    parser.add_argument("--probe-path", default="/health")
+    parser.add_argument("--probe-interval", type=float, default=0.01)
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument(
+        "--blocking",
+        action="store_true",
+        help="em processo, verifica a senha no event loop (comportamento antigo) para comparar",
+    )
+    args = parser.parse_args()
+
+    if args.blocking and not args.base_url:
+
+        async def _inline_verify(plain_password, hashed_password):
+            return security.verify_password(plain_password, hashed_password)
+
+        security.verify_password_async = _inline_verify
+
+    asyncio.run(run(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
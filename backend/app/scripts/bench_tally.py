@@ -0,0 +1,157 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Garantir que /app está no PYTHONPATH quando rodar via docker exec
+if "/app" not in sys.path:
+    sys.path.append("/app")
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models.proposal import Proposal, ProposalType
+from app.models.repository import Repository, RepositoryType
+from app.models.user import User, UserLevel
+from app.models.vote import Vote, VotingMethod, VotingOption, VotingSession, VotingStatus
+from app.services import tally_engine
+
+INSERT_BATCH = 10000
+
+
+def _populate(db, ballots, options, ranks, seed):
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    author = User(email="bench-author@example.org", username="bench-author", level=UserLevel.SPECIAL)
+    repository = Repository(name="Bench", slug="bench", type=list(RepositoryType)[0])
+    proposal = Proposal(
+        number="BENCH-1",
+        title="Bench",
+        slug="bench",
+        summary="-",
+        justification="-",
+        full_text="-",
+        type=ProposalType.AMENDMENT,
+        author=author,
+        repository=repository,
+        branch_name="bench",
+    )
+    session = VotingSession(
+        proposal=proposal,
+        repository=repository,
+        title="bench",
+        method=VotingMethod.RANKED,
+        status=VotingStatus.TALLYING,
+        starts_at=now - timedelta(hours=1),
+        ends_at=now,
+    )
+    session.options = [
+        VotingOption(title=f"Opcao {i}", value=f"o{i}", order=i) for i in range(options)
+    ]
+    db.add(session)
+    db.commit()
+    option_ids = [option.id for option in session.options]
+    # Preferencias enviesadas para que o IRV rode varias rodadas.
+    popularity = [1.0 / (i + 1) for i in range(options)]
+
+    for start in range(0, ballots, INSERT_BATCH):
+        stop = min(ballots, start + INSERT_BATCH)
+        db.execute(
+            insert(User),
+            [
+                {
+                    "email": f"bench{n}@example.org",
+                    "username": f"bench{n}",
+                    "level": UserLevel.FILIADO,
+                    "is_active": True,
+                }
+                for n in range(start, stop)
+            ],
+        )
+        first_user = db.query(User.id).filter(User.username == f"bench{start}").scalar()
+        rows = []
+        for offset in range(stop - start):
+            length = rng.randint(1, ranks)
+            ranking = []
+            while len(ranking) < length:
+                (choice,) = rng.choices(option_ids, weights=popularity)
+                if choice not in ranking:
+                    ranking.append(choice)
+            rows.append(
+                {
+                    "session_id": session.id,
+                    "proposal_id": proposal.id,
+                    "user_id": first_user + offset,
+                    "option_id": ranking[0],
+                    "vote_data": {"ranking": ranking},
+                    "vote_hash": f"{start + offset:064x}",
+                    "voted_at": now,
+                }
+            )
+        db.execute(insert(Vote), rows)
+        db.commit()
+    return session.id
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Mede a apuracao ranqueada (carga das cedulas + IRV) de uma sessao sintetica."
+    )
+    parser.add_argument("--ballots", type=int, default=100000)
+    parser.add_argument("--options", type=int, default=30)
+    parser.add_argument("--ranks", type=int, default=10, help="posicoes maximas por cedula")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--target-seconds", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument(
+        "--database-url",
+        help="banco descartavel (padrao: SQLite temporario); as tabelas sao criadas nele",
+    )
+    args = parser.parse_args()
+
+    path = None
+    url = args.database_url
+    if url is None:
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        url = f"sqlite:///{path}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        started = time.perf_counter()
+        session_id = _populate(db, args.ballots, args.options, args.ranks, args.seed)
+        print(f"populated {args.ballots} ballots x {args.options} options in {time.perf_counter() - started:.1f}s")
+
+        session = db.get(VotingSession, session_id)
+        option_ids = [option.id for option in session.options]
+        best_load = best_total = float("inf")
+        for _ in range(args.repeat):
+            db.expire_all()
+            started = time.perf_counter()
+            ranks = tally_engine.load_ranked_ballots(db, session_id, option_ids, [])
+            best_load = min(best_load, time.perf_counter() - started)
+
+            session = db.get(VotingSession, session_id)
+            started = time.perf_counter()
+            result = tally_engine.tally_session(db, session)
+            best_total = min(best_total, time.perf_counter() - started)
+
+        print(f"load_ranked_ballots   {best_load:.3f}s  ({ranks.shape[0]} x {ranks.shape[1]})")
+        print(f"tally_session         {best_total:.3f}s  ({len(result['rounds'])} rounds, winner {result['winner_option_id']})")
+        verdict = "ok" if best_total < args.target_seconds else "ABOVE TARGET"
+        print(f"target {args.target_seconds:.2f}s: {verdict}")
+        return 0 if best_total < args.target_seconds else 1
+    finally:
+        db.close()
+        engine.dispose()
+        if path:
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+import argparse
+import sys
+import time
+
+# Garantir que /app está no PYTHONPATH quando rodar via docker exec
+if "/app" not in sys.path:
+    sys.path.append("/app")
+
+from app.core.database import SessionLocal, set_statement_timeout
+from app.services.vote_storage import COMPACT_BATCH_SIZE, compact_vote_batch
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Converte os votos legados para o formato compacto, em lotes curtos."
+    )
+    parser.add_argument("--batch-size", type=int, default=COMPACT_BATCH_SIZE)
+    parser.add_argument("--pause-ms", type=int, default=50, help="pausa entre lotes")
+    parser.add_argument("--statement-timeout-ms", type=int, default=30000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    last_id = 0
+    converted = 0
+    try:
+        while True:
+            set_statement_timeout(db, args.statement_timeout_ms)
+            next_id = compact_vote_batch(db, last_id, args.batch_size)
+            db.commit()
+            if not next_id:
+                break
+            converted += 1
+            last_id = next_id
+            time.sleep(args.pause_ms / 1000)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    print(f"compacted {converted} batches (last vote id {last_id})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
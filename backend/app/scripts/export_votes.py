@@ -0,0 +1,47 @@
+import argparse
+import sys
+from datetime import datetime
+
+if "/app" not in sys.path:
+    sys.path.append("/app")
+
+from app.core.database import SessionLocal
+from app.services.vote_export import EXPORT_FORMATS, export_votes
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Exporta as cedulas de sessoes encerradas em NDJSON ou CSV."
+    )
+    parser.add_argument("--session", type=int, help="id da sessao de votacao")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="inicio (ISO 8601)")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="fim exclusivo (ISO 8601)")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+    parser.add_argument("--gzip", action="store_true", help="comprime a saida")
+    parser.add_argument("--include-voters", action="store_true", help="inclui user_id")
+    parser.add_argument("-o", "--output", help="arquivo de saida (padrao: stdout)")
+    args = parser.parse_args()
+
+    if args.session is None and args.since is None and args.until is None:
+        parser.error("informe --session ou um intervalo com --since/--until")
+
+    chunks = export_votes(
+        SessionLocal,
+        fmt=args.format,
+        session_id=args.session,
+        since=args.since,
+        until=args.until,
+        include_voters=args.include_voters,
+        compress=args.gzip,
+    )
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
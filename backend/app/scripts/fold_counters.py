@@ -0,0 +1,25 @@
+import sys
+
+# Garantir que /app está no PYTHONPATH quando rodar via docker exec
+if "/app" not in sys.path:
+    sys.path.append("/app")
+
+from app.core.database import SessionLocal
+from app.services.counters import fold_counters
+
+
+def main():
+    db = SessionLocal()
+    try:
+        folded = fold_counters(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    print(f"folded {folded} sharded counters into their canonical columns")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 import sys
+from datetime import datetime
+
 from sqlalchemy import create_engine, text
 
 if "/app" not in sys.path:
@@ -10,11 +12,17 @@ from app.core.config import settings
 def main(username: str):
     engine = create_engine(settings.DATABASE_URL)
     stmt = text(
-        "UPDATE users SET level='FILIADO', is_verified=true WHERE username=:u"
+        "UPDATE users SET level='FILIADO', is_verified=true, "
+        "authz_version = authz_version + 1, authz_changed_at=:now WHERE username=:u"
     )
     with engine.begin() as conn:
-        result = conn.execute(stmt, {"u": username})
+        result = conn.execute(stmt, {"u": username, "now": datetime.utcnow()})
     print(f"updated {result.rowcount} rows for user {username}")
+    # Este processo nao alcanca os caches dos workers da API: o novo nivel vale
+    # la em ate PRINCIPAL_CACHE_TTL_SECONDS (ou AUTHZ_VERSION_REFRESH_SECONDS,
+    # para tokens com claims).
+    delay = max(settings.PRINCIPAL_CACHE_TTL_SECONDS, settings.AUTHZ_VERSION_REFRESH_SECONDS)
+    print(f"API workers pick up the change within {delay:g}s")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,31 @@
+import sys
+from datetime import datetime
+
+# Garantir que /app está no PYTHONPATH quando rodar via docker exec
+if "/app" not in sys.path:
+    sys.path.append("/app")
+
+from app.core.database import SessionLocal
+from app.models.token import RevokedToken
+
+
+def main():
+    """Remove revogacoes de tokens ja expirados (o JWT sozinho ja os rejeita)."""
+    db = SessionLocal()
+    try:
+        deleted = (
+            db.query(RevokedToken)
+            .filter(RevokedToken.expires_at <= datetime.utcnow())
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        print(f"pruned {deleted} expired revoked tokens")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+import sys
+
+# Garantir que /app está no PYTHONPATH quando rodar via docker exec
+if "/app" not in sys.path:
+    sys.path.append("/app")
+
+from app.core.database import SessionLocal
+from app.services.tally import rebuild_option_tallies
+
+
+def main(session_ids):
+    db = SessionLocal()
+    try:
+        rebuilt = rebuild_option_tallies(db, session_ids or None)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    print(f"rebuilt option tallies for {rebuilt} voting sessions")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]])
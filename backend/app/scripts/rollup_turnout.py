@@ -0,0 +1,32 @@
+import sys
+
+# Garantir que /app está no PYTHONPATH quando rodar via docker exec
+if "/app" not in sys.path:
+    sys.path.append("/app")
+
+from app.core.database import SessionLocal
+from app.models.vote import VotingSession
+from app.services.turnout import rebuild_turnout_buckets
+
+
+def main(session_ids):
+    db = SessionLocal()
+    try:
+        if not session_ids:
+            session_ids = [
+                session_id
+                for (session_id,) in db.query(VotingSession.id).order_by(VotingSession.id)
+            ]
+        for session_id in session_ids:
+            buckets = rebuild_turnout_buckets(db, [session_id])
+            db.commit()
+            print(f"session {session_id}: {buckets} turnout buckets")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]])
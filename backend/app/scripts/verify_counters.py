@@ -0,0 +1,43 @@
+import argparse
+import sys
+
+# Garantir que /app está no PYTHONPATH quando rodar via docker exec
+if "/app" not in sys.path:
+    sys.path.append("/app")
+
+from app.services.counter_verification import COUNTER_CHECKS, repair_counters, verify_counters
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Reconta os contadores desnormalizados e reporta (ou corrige) divergencias."
+    )
+    parser.add_argument("--counter", action="append", choices=sorted(COUNTER_CHECKS))
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--statement-timeout-ms", type=int, default=30000)
+    parser.add_argument("--repair", action="store_true", help="corrige as divergencias")
+    args = parser.parse_args()
+
+    mismatches = verify_counters(
+        counters=args.counter,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        statement_timeout_ms=args.statement_timeout_ms,
+    )
+    for mismatch in mismatches:
+        print(
+            f"{mismatch.counter} #{mismatch.row_id}: "
+            f"stored={mismatch.stored} actual={mismatch.actual}"
+        )
+    print(f"{len(mismatches)} mismatched counters")
+
+    if args.repair and mismatches:
+        repaired = repair_counters(mismatches, args.statement_timeout_ms)
+        print(f"repaired {len(repaired)} counters")
+        return 0
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""
+Conferencia dos contadores desnormalizados contra as tabelas base.
+
+Os ids de cada tabela dona de contador sao divididos em lotes limitados e
+cada lote e recontado em um processo do pool (consulta agregada com
+statement_timeout). A correcao e feita linha a linha: a linha e bloqueada
+(FOR UPDATE), recontada e gravada na mesma transacao curta, de modo que
+votos e propostas concorrentes nunca se percam.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal, engine, set_statement_timeout
+from app.core.logging import get_logger
+from app.models.issue import Issue
+from app.models.proposal import Proposal
+from app.models.repository import Repository
+from app.models.vote import Vote, VoteArchiveBatch, VotingSession
+from app.services.counters import read_counters, reset_counter
+
+logger = get_logger("services.counter_verification")
+
+
+class CounterCheck(NamedTuple):
+    model: type
+    column: str
+    source_fk: object  # coluna que referencia model.id na tabela base
+    archive_fk: object = None  # mesma referencia em vote_archive_batches, se houver
+
+
+COUNTER_CHECKS: Dict[str, CounterCheck] = {
+    "voting_sessions.total_votes": CounterCheck(
+        VotingSession, "total_votes", Vote.session_id, VoteArchiveBatch.session_id
+    ),
+    "proposals.votes_count": CounterCheck(
+        Proposal, "votes_count", Vote.proposal_id, VoteArchiveBatch.proposal_id
+    ),
+    "repositories.proposals_count": CounterCheck(
+        Repository, "proposals_count", Proposal.repository_id
+    ),
+    "repositories.issues_count": CounterCheck(Repository, "issues_count", Issue.repository_id),
+}
+
+
+class CounterMismatch(NamedTuple):
+    counter: str
+    row_id: int
+    stored: int
+    actual: int
+
+
+def _recount(db: Session, check: CounterCheck, row_ids: List[int]) -> Dict[int, int]:
+    counts = dict(
+        db.query(check.source_fk, func.count())
+        .filter(check.source_fk.in_(row_ids))
+        .group_by(check.source_fk)
+        .all()
+    )
+    if check.archive_fk is not None:
+        # Votos arquivados saem de votes, mas continuam contando.
+        archived = (
+            db.query(check.archive_fk, func.sum(VoteArchiveBatch.votes_count))
+            .filter(check.archive_fk.in_(row_ids))
+            .group_by(check.archive_fk)
+        )
+        for row_id, votes_count in archived:
+            counts[row_id] = counts.get(row_id, 0) + votes_count
+    return counts
+
+
+def verify_chunk(
+    counter: str,
+    row_ids: List[int],
+    statement_timeout_ms: int = 0,
+) -> List[CounterMismatch]:
+    """Reconta um lote de linhas de um contador; executado nos processos do pool."""
+    check = COUNTER_CHECKS[counter]
+    db = SessionLocal()
+    try:
+        set_statement_timeout(db, statement_timeout_ms)
+        actual = _recount(db, check, row_ids)
+        stored = read_counters(db, check.model, row_ids, check.column)
+        db.rollback()
+    finally:
+        db.close()
+    return [
+        CounterMismatch(counter, row_id, stored.get(row_id, 0), actual.get(row_id, 0))
+        for row_id in row_ids
+        if stored.get(row_id, 0) != actual.get(row_id, 0)
+    ]
+
+
+def repair_counter(
+    db: Session,
+    counter: str,
+    row_id: int,
+    statement_timeout_ms: int = 0,
+) -> Optional[CounterMismatch]:
+    """Reconta e corrige uma linha sob FOR UPDATE, sem commit. None se ja estava certa."""
+    check = COUNTER_CHECKS[counter]
+    set_statement_timeout(db, statement_timeout_ms)
+    locked = (
+        db.query(check.model.id)
+        .filter(check.model.id == row_id)
+        .with_for_update()
+        .scalar()
+    )
+    if locked is None:
+        return None
+    actual = _recount(db, check, [row_id]).get(row_id, 0)
+    stored = read_counters(db, check.model, [row_id], check.column).get(row_id, 0)
+    if stored == actual:
+        return None
+    reset_counter(db, check.model, row_id, check.column, actual)
+    return CounterMismatch(counter, row_id, stored, actual)
+
+
+def iter_chunks(
+    db: Session,
+    counters: List[str],
+    batch_size: int,
+) -> Iterator[Tuple[str, List[int]]]:
+    """Lotes (contador, ids) por paginacao de chave, sem carregar a tabela inteira."""
+    for counter in counters:
+        model = COUNTER_CHECKS[counter].model
+        last_id = 0
+        while True:
+            ids = [
+                row_id
+                for (row_id,) in db.query(model.id)
+                .filter(model.id > last_id)
+                .order_by(model.id)
+                .limit(batch_size)
+            ]
+            if not ids:
+                break
+            yield counter, ids
+            last_id = ids[-1]
+
+
+def _init_worker() -> None:
+    # Conexoes herdadas do processo pai nao podem ser reutilizadas apos o fork.
+    engine.dispose(close=False)
+
+
+def verify_counters(
+    counters: Optional[List[str]] = None,
+    workers: int = 4,
+    batch_size: int = 500,
+    statement_timeout_ms: int = 30000,
+) -> List[CounterMismatch]:
+    counters = counters or list(COUNTER_CHECKS)
+    db = SessionLocal()
+    try:
+        chunks = list(iter_chunks(db, counters, batch_size))
+    finally:
+        db.close()
+
+    mismatches: List[CounterMismatch] = []
+    if workers <= 1:
+        for counter, ids in chunks:
+            mismatches.extend(verify_chunk(counter, ids, statement_timeout_ms))
+    else:
+        engine.dispose()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [
+                pool.submit(verify_chunk, counter, ids, statement_timeout_ms)
+                for counter, ids in chunks
+            ]
+            for future in futures:
+                mismatches.extend(future.result())
+    logger.info(
+        "Verified %s counter chunks with %s workers: %s mismatches",
+        len(chunks),
+        workers,
+        len(mismatches),
+    )
+    return mismatches
+
+
+def repair_counters(
+    mismatches: List[CounterMismatch],
+    statement_timeout_ms: int = 30000,
+) -> List[CounterMismatch]:
+    """Corrige cada divergencia em sua propria transacao; retorna as efetivamente corrigidas."""
+    repaired: List[CounterMismatch] = []
+    db = SessionLocal()
+    try:
+        for mismatch in mismatches:
+            try:
+                fixed = repair_counter(db, mismatch.counter, mismatch.row_id, statement_timeout_ms)
+                db.commit()
+            except Exception as exc:
+                db.rollback()
+                logger.error(
+                    "Counter repair failed for %s #%s: %s", mismatch.counter, mismatch.row_id, exc
+                )
+                continue
+            if fixed:
+                repaired.append(fixed)
+    finally:
+        db.close()
+    return repaired
@@ -0,0 +1,252 @@
+import random
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal, dialect_insert
+from app.core.logging import get_logger
+from app.models.counter import CounterShard
+from app.models.proposal import Proposal
+from app.models.repository import Repository
+from app.models.vote import VotingSession
+
+logger = get_logger("services.counters")
+
+# Contadores que podem ser fragmentados em parcelas.
+SHARDED_COUNTERS = {
+    (VotingSession.__tablename__, "total_votes"): VotingSession,
+    (Proposal.__tablename__, "votes_count"): Proposal,
+    (Repository.__tablename__, "proposals_count"): Repository,
+    (Repository.__tablename__, "issues_count"): Repository,
+}
+
+
+def _sharding_enabled() -> bool:
+    return settings.COUNTER_SHARDS > 1
+
+
+def pick_shard() -> int:
+    """Parcela aleatoria para uma escrita em linha quente (sempre 0 sem fragmentacao)."""
+    return random.randrange(settings.COUNTER_SHARDS) if _sharding_enabled() else 0
+
+
+def increment_counter(
+    db: Session,
+    model,
+    row_id: int,
+    column: str,
+    delta: int = 1,
+    floor: Optional[int] = None,
+) -> Optional[int]:
+    """
+    Soma `delta` ao contador `model.column` da linha `row_id`, sem commit.
+
+    Com COUNTER_SHARDS > 1 a escrita vai para uma parcela aleatoria, evitando
+    disputa de lock na linha canonica, e retorna None; caso contrario e um
+    UPDATE atomico que retorna o novo valor.
+
+    Com `floor`, o UPDATE canonico so aplica o delta se o resultado nao ficar
+    abaixo dele (a condicao vai no WHERE, sem ler antes) e retorna None quando
+    nada mudou. Parcelas nao podem ser limitadas uma a uma: fold_counters
+    nunca deixa a coluna canonica negativa.
+    """
+    if (model.__tablename__, column) not in SHARDED_COUNTERS or not _sharding_enabled():
+        counter = func.coalesce(getattr(model, column), 0)
+        stmt = update(model).where(model.id == row_id)
+        if floor is not None:
+            stmt = stmt.where(counter + delta >= floor)
+        return db.execute(
+            stmt.values({column: counter + delta})
+            .returning(getattr(model, column))
+            .execution_options(synchronize_session=False)
+        ).scalar_one_or_none()
+
+    table = CounterShard.__table__
+    stmt = dialect_insert(db, table).values(
+        table_name=model.__tablename__,
+        row_id=row_id,
+        column_name=column,
+        shard=pick_shard(),
+        value=delta,
+        updated_at=datetime.utcnow(),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["table_name", "row_id", "column_name", "shard"],
+        set_={
+            "value": table.c.value + stmt.excluded.value,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    db.execute(stmt)
+    return None
+
+
+def read_counters(db: Session, model, row_ids: Iterable[int], column: str) -> Dict[int, int]:
+    """Valor atual dos contadores: coluna canonica + parcelas pendentes."""
+    row_ids = list(row_ids)
+    if not row_ids:
+        return {}
+
+    values = {
+        row_id: value or 0
+        for row_id, value in db.query(model.id, getattr(model, column))
+        .filter(model.id.in_(row_ids))
+        .all()
+    }
+    if _sharding_enabled():
+        pending = (
+            db.query(CounterShard.row_id, func.sum(CounterShard.value))
+            .filter(
+                CounterShard.table_name == model.__tablename__,
+                CounterShard.column_name == column,
+                CounterShard.row_id.in_(row_ids),
+            )
+            .group_by(CounterShard.row_id)
+            .all()
+        )
+        for row_id, value in pending:
+            values[row_id] = values.get(row_id, 0) + (value or 0)
+    return values
+
+
+def counter_expression(model, row_id, column: str):
+    """
+    Valor atual do contador como subconsulta escalar (coluna canonica mais as
+    parcelas pendentes), para entrar no RETURNING de outra escrita sem uma
+    leitura a parte. `row_id` pode ser uma coluna da instrucao externa.
+    """
+    value = (
+        select(func.coalesce(getattr(model, column), 0))
+        .where(model.id == row_id)
+        .correlate_except(model)
+        .scalar_subquery()
+    )
+    if _sharding_enabled():
+        value = value + (
+            select(func.coalesce(func.sum(CounterShard.value), 0))
+            .where(
+                CounterShard.table_name == model.__tablename__,
+                CounterShard.column_name == column,
+                CounterShard.row_id == row_id,
+            )
+            .correlate_except(CounterShard)
+            .scalar_subquery()
+        )
+    return value
+
+
+def reset_counter(db: Session, model, row_id: int, column: str, value: int) -> None:
+    """Define o valor exato do contador, descartando parcelas pendentes."""
+    db.execute(
+        delete(CounterShard)
+        .where(
+            CounterShard.table_name == model.__tablename__,
+            CounterShard.row_id == row_id,
+            CounterShard.column_name == column,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        update(model)
+        .where(model.id == row_id)
+        .values({column: value})
+        .execution_options(synchronize_session=False)
+    )
+
+
+def fold_counters(db: Session) -> int:
+    """
+    Consolida as parcelas nas colunas canonicas, sem commit.
+
+    O DELETE ... RETURNING garante que cada parcela seja somada uma unica vez,
+    mesmo com varios workers consolidando ao mesmo tempo. Os contadores sao
+    contagens: o resultado da soma nunca fica abaixo de zero.
+    """
+    table = CounterShard.__table__
+    folded = db.execute(
+        delete(table).returning(
+            table.c.table_name, table.c.row_id, table.c.column_name, table.c.value
+        )
+    ).all()
+
+    deltas: Dict[tuple, int] = defaultdict(int)
+    for table_name, row_id, column_name, value in folded:
+        deltas[(table_name, column_name, row_id)] += value
+
+    for (table_name, column_name, row_id), delta in deltas.items():
+        model = SHARDED_COUNTERS.get((table_name, column_name))
+        if model is None or not delta:
+            continue
+        total = func.coalesce(getattr(model, column_name), 0) + delta
+        db.execute(
+            update(model)
+            .where(model.id == row_id)
+            .values({column_name: case((total < 0, 0), else_=total)})
+            .execution_options(synchronize_session=False)
+        )
+    return len(deltas)
+
+
+class CounterFolder:
+    """Thread que consolida periodicamente as parcelas dos contadores."""
+
+    def __init__(self, interval_seconds: int):
+        self._interval = interval_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="counter-folder", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(self._interval)
+        self._thread = None
+        self.fold_once()
+
+    def fold_once(self) -> int:
+        db = SessionLocal()
+        try:
+            folded = fold_counters(db)
+            db.commit()
+            return folded
+        except Exception as exc:
+            db.rollback()
+            logger.error("Counter fold failed: %s", exc)
+            return 0
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            folded = self.fold_once()
+            if folded:
+                logger.info("Folded %s sharded counters", folded)
+
+
+_folder: Optional[CounterFolder] = None
+
+
+def start_counter_folder() -> None:
+    global _folder
+    if not _sharding_enabled() or _folder is not None:
+        return
+    _folder = CounterFolder(settings.COUNTER_FOLD_INTERVAL_SECONDS)
+    _folder.start()
+
+
+def stop_counter_folder() -> None:
+    global _folder
+    if _folder is not None:
+        _folder.stop()
+        _folder = None
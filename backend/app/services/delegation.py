@@ -0,0 +1,160 @@
+"""
+Resolucao de delegacoes de voto (democracia liquida) na apuracao.
+
+O grafo de delegacoes de um repositorio e carregado em uma consulta. Cada
+eleitor delega para no maximo uma pessoa, entao o grafo e funcional: a partir
+de um votante direto, os delegantes que o alcancam sem passar por outro
+votante formam uma subarvore disjunta das demais. Um novo voto direto apenas
+destaca a propria subarvore do representante anterior; ciclos sem votante
+nunca sao alcancados e ficam sem representacao.
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.delegation import VoteDelegation
+from app.models.user import User, UserLevel
+from app.models.vote import Vote, VotingSession
+from app.services.electorate import bitmap_contains, decode_bitmap
+
+
+class DelegationGraph:
+    def __init__(self, edges: Dict[int, int]):
+        self.delegate_of: Dict[int, int] = dict(edges)
+        self.delegators_of: Dict[int, List[int]] = defaultdict(list)
+        for delegator, delegate in self.delegate_of.items():
+            self.delegators_of[delegate].append(delegator)
+        self.direct: Set[int] = set()
+        self.owner: Dict[int, int] = {}  # eleitor -> votante direto que o representa
+        self.weight: Dict[int, int] = {}  # votante direto -> votos representados (incl. o proprio)
+
+    def _subtree(self, root: int) -> List[int]:
+        nodes = []
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            nodes.append(node)
+            for delegator in self.delegators_of.get(node, ()):
+                if delegator not in self.direct:
+                    stack.append(delegator)
+        return nodes
+
+    def add_direct_vote(self, user_id: int) -> int:
+        """Registra um voto direto e reatribui so a subarvore afetada; retorna o peso do votante."""
+        if user_id in self.direct:
+            return self.weight[user_id]
+        previous = self.owner.get(user_id)
+        self.direct.add(user_id)
+        nodes = self._subtree(user_id)
+        for node in nodes:
+            self.owner[node] = user_id
+        self.weight[user_id] = len(nodes)
+        if previous is not None:
+            self.weight[previous] -= len(nodes)
+        return len(nodes)
+
+    def weight_of(self, user_id: int) -> int:
+        return self.weight.get(user_id, 1)
+
+    def find_cycles(self) -> List[List[int]]:
+        """Ciclos de delegacao (grafo funcional), em O(n)."""
+        state: Dict[int, int] = {}  # 1 = na pilha atual, 2 = resolvido
+        cycles = []
+        for start in self.delegate_of:
+            path = []
+            node: Optional[int] = start
+            while node is not None and state.get(node) is None:
+                state[node] = 1
+                path.append(node)
+                node = self.delegate_of.get(node)
+            if node is not None and state.get(node) == 1:
+                cycles.append(path[path.index(node):])
+            for visited in path:
+                state[visited] = 2
+        return cycles
+
+    def would_create_cycle(self, delegator_id: int, delegate_id: int) -> bool:
+        node: Optional[int] = delegate_id
+        seen = set()
+        while node is not None and node not in seen:
+            if node == delegator_id:
+                return True
+            seen.add(node)
+            node = self.delegate_of.get(node)
+        return False
+
+
+def load_delegation_graph(
+    db: Session,
+    repository_id: int,
+    eligible_bitmap: Optional[bytes] = None,
+) -> DelegationGraph:
+    """Arestas do repositorio em uma consulta, apenas de delegantes aptos a votar."""
+    rows = (
+        db.query(VoteDelegation.delegator_id, VoteDelegation.delegate_id)
+        .join(User, User.id == VoteDelegation.delegator_id)
+        .filter(
+            VoteDelegation.repository_id == repository_id,
+            User.is_active.is_(True),
+            or_(
+                User.level.in_([UserLevel.FILIADO, UserLevel.SPECIAL]),
+                User.is_superuser.is_(True),
+            ),
+        )
+        .all()
+    )
+    edges = {
+        delegator: delegate
+        for delegator, delegate in rows
+        if eligible_bitmap is None or bitmap_contains(eligible_bitmap, delegator)
+    }
+    return DelegationGraph(edges)
+
+
+def resolve_session_weights(
+    db: Session,
+    session: VotingSession,
+    voter_ids: Optional[Iterable[int]] = None,
+) -> Optional[Dict[int, int]]:
+    """
+    Peso de cada votante direto da sessao (1 + delegantes representados).
+
+    Retorna None quando nao ha delegacoes aplicaveis, para que a apuracao
+    siga pelo caminho agregado sem pesos.
+    """
+    repository_id = session.repository_id or (
+        session.proposal.repository_id if session.proposal else None
+    )
+    if not settings.VOTE_DELEGATION_ENABLED or repository_id is None:
+        return None
+
+    graph = load_delegation_graph(
+        db, repository_id, decode_bitmap(session.eligible_voters_bitmap)
+    )
+    if not graph.delegate_of:
+        return None
+
+    if voter_ids is None:
+        voter_ids = [
+            user_id
+            for (user_id,) in db.query(Vote.user_id)
+            .filter(Vote.session_id == session.id)
+            .order_by(Vote.id)
+        ]
+    for user_id in voter_ids:
+        graph.add_direct_vote(user_id)
+    return {user_id: graph.weight_of(user_id) for user_id in graph.direct}
+
+
+def delegation_summary(weights: Dict[int, int]) -> Dict[str, int]:
+    direct = len(weights)
+    represented = sum(weights.values())
+    return {
+        "direct_votes": direct,
+        "delegated_votes": represented - direct,
+        "weighted_total": represented,
+    }
@@ -0,0 +1,84 @@
+"""
+Retrato do eleitorado no momento em que uma sessao abre.
+
+Guarda o tamanho do eleitorado e o limiar de quorum na propria sessao, entao
+"quorum atingido?" e so total_votes >= quorum_threshold, sem contar usuarios
+a cada leitura. Com ELECTORATE_BITMAP_ENABLED o conjunto de ids elegiveis
+tambem e guardado como bitmap comprimido (1 bit por id de usuario).
+"""
+
+import math
+import zlib
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.user import User, UserLevel
+from app.models.vote import VotingSession
+
+ELECTORATE_FETCH_SIZE = 10000
+
+
+def _eligible_filter():
+    # Mesmo criterio de User.can_vote, restrito a contas ativas.
+    return (
+        User.is_active.is_(True),
+        or_(User.level.in_([UserLevel.FILIADO, UserLevel.SPECIAL]), User.is_superuser.is_(True)),
+    )
+
+
+def encode_bitmap(user_ids: Iterable[int]) -> bytes:
+    bitmap = bytearray()
+    for user_id in user_ids:
+        byte = user_id >> 3
+        if byte >= len(bitmap):
+            bitmap.extend(b"\x00" * (byte + 1 - len(bitmap)))
+        bitmap[byte] |= 1 << (user_id & 7)
+    return zlib.compress(bytes(bitmap))
+
+
+def decode_bitmap(data: Optional[bytes]) -> Optional[bytes]:
+    return zlib.decompress(data) if data else None
+
+
+def bitmap_contains(bitmap: bytes, user_id: int) -> bool:
+    byte = user_id >> 3
+    return byte < len(bitmap) and bool(bitmap[byte] & (1 << (user_id & 7)))
+
+
+def quorum_threshold(session: VotingSession, eligible_voters: int) -> int:
+    """quorum_required absoluto quando definido; senao QUORUM_PERCENTAGE do eleitorado."""
+    if session.quorum_required:
+        return session.quorum_required
+    return math.ceil(eligible_voters * settings.QUORUM_PERCENTAGE / 100)
+
+
+def snapshot_electorate(db: Session, session: VotingSession) -> int:
+    """Grava eleitorado, limiar de quorum e (opcional) bitmap na sessao, sem commit."""
+    if settings.ELECTORATE_BITMAP_ENABLED:
+        user_ids = [
+            user_id
+            for (user_id,) in db.query(User.id)
+            .filter(*_eligible_filter())
+            .yield_per(ELECTORATE_FETCH_SIZE)
+        ]
+        eligible = len(user_ids)
+        session.eligible_voters_bitmap = encode_bitmap(user_ids)
+    else:
+        eligible = db.query(User.id).filter(*_eligible_filter()).count()
+        session.eligible_voters_bitmap = None
+
+    session.eligible_voters_count = eligible
+    session.quorum_threshold = quorum_threshold(session, eligible)
+    session.electorate_snapshot_at = datetime.utcnow()
+    db.add(session)
+    return eligible
+
+
+def quorum_status(session: VotingSession, total_votes: int) -> Optional[bool]:
+    if session.quorum_threshold is None:
+        return None
+    return total_votes >= session.quorum_threshold
@@ -0,0 +1,133 @@
+"""
+Difusao em processo das parciais de votacao para streams SSE.
+
+Cada sessao observada tem um unico canal: uma tarefa asyncio recalcula as
+parciais a cada VOTING_STREAM_INTERVAL_MS (uma consulta por tick, nao por
+espectador) e acorda os assinantes quando algo muda. Cada assinante envia a
+diferenca entre o ultimo quadro que mandou e o estado atual, entao clientes
+lentos recebem um unico delta consolidado em vez de uma fila de quadros.
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.logging import get_logger
+
+logger = get_logger("services.live_tally")
+
+StatsLoader = Callable[[int], Optional[Dict[str, Any]]]
+
+
+def diff_stats(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """Campos alterados; em dicionarios aninhados (option_votes) so as chaves alteradas."""
+    delta: Dict[str, Any] = {}
+    for key, value in current.items():
+        if isinstance(value, dict):
+            before = previous.get(key) or {}
+            changed = {name: count for name, count in value.items() if before.get(name) != count}
+            if changed:
+                delta[key] = changed
+        elif previous.get(key) != value:
+            delta[key] = value
+    return delta
+
+
+class _SessionChannel:
+    def __init__(self, session_id: int):
+        self.session_id = session_id
+        self.stats: Optional[Dict[str, Any]] = None
+        self.version = 0
+        self.closed = False
+        self.subscribers = 0
+        self.changed = asyncio.Condition()
+        self.task: Optional[asyncio.Task] = None
+
+
+class LiveTallyBroadcaster:
+    def __init__(self, loader: StatsLoader, interval_ms: int, heartbeat_seconds: int):
+        self._loader = loader
+        self._interval = interval_ms / 1000
+        self._heartbeat = heartbeat_seconds
+        self._channels: Dict[int, _SessionChannel] = {}
+
+    async def _publish(self, channel: _SessionChannel, stats: Optional[Dict[str, Any]]) -> None:
+        async with channel.changed:
+            if stats is None:
+                channel.closed = True
+            elif stats != channel.stats:
+                channel.stats = stats
+                channel.version += 1
+            channel.changed.notify_all()
+
+    async def _run(self, channel: _SessionChannel) -> None:
+        while not channel.closed:
+            try:
+                stats = await run_in_threadpool(self._loader, channel.session_id)
+            except Exception as exc:
+                logger.error("Live tally refresh failed for session %s: %s", channel.session_id, exc)
+            else:
+                await self._publish(channel, stats)
+            await asyncio.sleep(self._interval)
+
+    def _attach(self, session_id: int) -> _SessionChannel:
+        channel = self._channels.get(session_id)
+        if channel is None or channel.closed:
+            channel = _SessionChannel(session_id)
+            self._channels[session_id] = channel
+        channel.subscribers += 1
+        if channel.task is None:
+            channel.task = asyncio.create_task(self._run(channel))
+        return channel
+
+    def _detach(self, channel: _SessionChannel) -> None:
+        channel.subscribers -= 1
+        if channel.subscribers > 0:
+            return
+        if channel.task is not None:
+            channel.task.cancel()
+        if self._channels.get(channel.session_id) is channel:
+            del self._channels[channel.session_id]
+
+    def watchers(self, session_id: int) -> int:
+        channel = self._channels.get(session_id)
+        return channel.subscribers if channel else 0
+
+    async def subscribe(self, session_id: int) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Gera (evento, dados): "snapshot" no primeiro quadro, "delta" nas mudancas,
+        "ping" sem mudancas por VOTING_STREAM_HEARTBEAT_SECONDS e "closed" no fim.
+        """
+        channel = self._attach(session_id)
+        sent: Optional[Dict[str, Any]] = None
+        seen = 0
+        try:
+            while True:
+                async with channel.changed:
+                    try:
+                        await asyncio.wait_for(
+                            channel.changed.wait_for(
+                                lambda: channel.version != seen or channel.closed
+                            ),
+                            timeout=self._heartbeat,
+                        )
+                    except asyncio.TimeoutError:
+                        pass
+                    stats, version, closed = channel.stats, channel.version, channel.closed
+
+                if version != seen and stats is not None:
+                    seen = version
+                    if sent is None:
+                        yield "snapshot", stats
+                    else:
+                        yield "delta", diff_stats(sent, stats)
+                    sent = stats
+                elif not closed:
+                    yield "ping", {}
+
+                if closed:
+                    yield "closed", {"session_id": session_id}
+                    return
+        finally:
+            self._detach(channel)
@@ -0,0 +1,182 @@
+"""
+Limite de tentativas de login e cadastro (token bucket por IP e por username).
+
+Cada tentativa consome um token do bucket do IP antes de qualquer consulta ou
+bcrypt, e o bucket do username precisa ter ao menos um token. Falhas de login
+(usuario inexistente ou senha errada) consomem LOGIN_THROTTLE_FAILURE_COST dos
+dois buckets, entao o contador de falhas e o proprio limitador. Uma tentativa
+rejeitada custa uma conta em memoria (ou uma ida ao Redis) e nunca um hash.
+
+O backend em memoria vale por worker; com LOGIN_THROTTLE_BACKEND=redis os
+buckets sao compartilhados e atualizados atomicamente por um script Lua.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger("login_throttle")
+
+THROTTLE_BACKENDS = ("memory", "redis")
+
+
+class ThrottleRule(NamedTuple):
+    capacity: float
+    refill_per_second: float
+
+
+def _refill(tokens: float, elapsed: float, rule: ThrottleRule) -> float:
+    return min(rule.capacity, tokens + max(0.0, elapsed) * rule.refill_per_second)
+
+
+class MemoryBucketStore:
+    """Buckets em um OrderedDict limitado (LRU); um bucket descartado volta cheio."""
+
+    def __init__(self, max_keys: int = 100000):
+        self._max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, rule: ThrottleRule, cost: float, force: bool = False) -> float:
+        """
+        Consome cost tokens se houver ao menos max(cost, 1); retorna 0 ou os
+        segundos ate haver. Com force o consumo e incondicional (minimo zero).
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (rule.capacity, now))
+            tokens = _refill(tokens, now - updated_at, rule)
+            needed = max(cost, 1.0)
+            retry_after = 0.0
+            if force:
+                tokens = max(0.0, tokens - cost)
+            elif tokens >= needed:
+                tokens -= cost
+            else:
+                retry_after = (needed - tokens) / rule.refill_per_second
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self._max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+# Mesma conta do MemoryBucketStore.take, atomica no Redis (relogio do servidor).
+_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local force = tonumber(ARGV[4])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+local needed = math.max(cost, 1)
+local retry_after = 0
+if force == 1 then
+    tokens = math.max(0, tokens - cost)
+elseif tokens >= needed then
+    tokens = tokens - cost
+else
+    retry_after = (needed - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(retry_after)
+"""
+
+
+class RedisBucketStore:
+    """
+    Buckets compartilhados entre workers. Recebe um cliente redis.asyncio
+    (ou um substituto compativel, como o fakeredis nos testes). Se o Redis
+    falhar a tentativa e liberada: o limitador nao derruba o login.
+    """
+
+    def __init__(self, client, prefix: str = "throttle:"):
+        self._client = client
+        self._prefix = prefix
+        self._script = client.register_script(_TAKE_SCRIPT)
+
+    async def take(self, key: str, rule: ThrottleRule, cost: float, force: bool = False) -> float:
+        try:
+            result = await self._script(
+                keys=[self._prefix + key],
+                args=[rule.capacity, rule.refill_per_second, cost, 1 if force else 0],
+            )
+        except Exception as exc:  # noqa: BLE001 - falha aberta, registrada
+            logger.warning("Login throttle unavailable (redis): %s", exc)
+            return 0.0
+        return float(result)
+
+
+def _build_store():
+    if settings.LOGIN_THROTTLE_BACKEND not in THROTTLE_BACKENDS:
+        raise ValueError(f"Unsupported login throttle backend: {settings.LOGIN_THROTTLE_BACKEND}")
+    if settings.LOGIN_THROTTLE_BACKEND == "redis":
+        import redis.asyncio as redis_asyncio
+
+        client = redis_asyncio.Redis.from_url(settings.LOGIN_THROTTLE_REDIS_URL or settings.REDIS_URL)
+        return RedisBucketStore(client)
+    return MemoryBucketStore(settings.LOGIN_THROTTLE_MAX_KEYS)
+
+
+class LoginThrottle:
+    def __init__(self, store=None):
+        self._store = store
+        self._store_lock = threading.Lock()
+        self.ip_rule = ThrottleRule(
+            settings.LOGIN_THROTTLE_IP_BURST, settings.LOGIN_THROTTLE_IP_PER_MINUTE / 60.0
+        )
+        self.user_rule = ThrottleRule(
+            settings.LOGIN_THROTTLE_USER_BURST, settings.LOGIN_THROTTLE_USER_PER_MINUTE / 60.0
+        )
+
+    @property
+    def store(self):
+        if self._store is None:
+            with self._store_lock:
+                if self._store is None:
+                    self._store = _build_store()
+        return self._store
+
+    @staticmethod
+    def _user_key(username: str) -> str:
+        return "user:" + username.strip().lower()
+
+    async def check_login(self, ip: Optional[str], username: str) -> float:
+        """Segundos ate a proxima tentativa permitida (0 = pode seguir)."""
+        if not settings.LOGIN_THROTTLE_ENABLED:
+            return 0.0
+        user_wait = await self.store.take(self._user_key(username), self.user_rule, 0.0)
+        if user_wait:
+            return user_wait
+        return await self.check_register(ip)
+
+    async def check_register(self, ip: Optional[str]) -> float:
+        if not settings.LOGIN_THROTTLE_ENABLED or not ip:
+            return 0.0
+        return await self.store.take("ip:" + ip, self.ip_rule, 1.0)
+
+    async def record_login_failure(self, ip: Optional[str], username: str) -> None:
+        if not settings.LOGIN_THROTTLE_ENABLED:
+            return
+        cost = settings.LOGIN_THROTTLE_FAILURE_COST
+        takes = [self.store.take(self._user_key(username), self.user_rule, cost, force=True)]
+        if ip:
+            takes.append(self.store.take("ip:" + ip, self.ip_rule, cost, force=True))
+        await asyncio.gather(*takes)
+
+
+login_throttle = LoginThrottle()
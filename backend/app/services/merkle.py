@@ -0,0 +1,252 @@
+"""
+Arvore Merkle append-only dos votos de cada sessao (formato RFC 6962).
+
+Folha = sha256(0x00 || vote_hash) e no interno = sha256(0x01 || esq || dir).
+So subarvores completas sao gravadas em vote_merkle_nodes, entao acrescentar
+um voto grava no maximo log2(n) + 1 nos e a raiz de qualquer tamanho de
+arvore sai da combinacao dos picos. Provas de inclusao tem O(log n) hashes.
+
+As folhas entram depois do commit do voto, em uma transacao curta propria:
+no fim de cada lote do VoteBatcher (append_committed_leaves) ou, para votos
+gravados na requisicao, em lotes por intervalo do DeferredVoteWriter. A linha
+da sessao fica bloqueada so durante o acrescimo, nunca durante a gravacao do
+voto, e uma vez por lote, nao por voto. Ordem garantida: as folhas de uma
+sessao seguem a ordem de commit dessas transacoes de acrescimo (dentro de um
+lote, a ordem do lote), e toda folha corresponde a um voto ja commitado.
+Votos cujo acrescimo falhou entram no encerramento, em ordem de id, antes de
+a raiz ser selada (append_missing_leaves).
+"""
+
+import hashlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session
+
+from app.core.logging import get_logger
+from app.models.vote import Vote, VoteMerkleNode, VotingSession
+from app.services.counters import increment_counter
+
+logger = get_logger("services.merkle")
+
+NodeKey = Tuple[int, int]  # (nivel, posicao)
+
+
+def leaf_hash(vote_hash: str) -> str:
+    return hashlib.sha256(b"\x00" + bytes.fromhex(vote_hash)).hexdigest()
+
+
+def node_hash(left: str, right: str) -> str:
+    return hashlib.sha256(b"\x01" + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+def _peaks(start: int, size: int) -> List[NodeKey]:
+    """Subarvores completas que cobrem [start, start + size), da maior para a menor."""
+    peaks = []
+    while size:
+        level = size.bit_length() - 1
+        peaks.append((level, start >> level))
+        start += 1 << level
+        size -= 1 << level
+    return peaks
+
+
+def _fold(hashes: List[str]) -> str:
+    root = hashes[-1]
+    for value in reversed(hashes[:-1]):
+        root = node_hash(value, root)
+    return root
+
+
+def _load_nodes(db: Session, session_id: int, keys: Iterable[NodeKey]) -> Dict[NodeKey, str]:
+    keys = list(set(keys))
+    if not keys:
+        return {}
+    rows = (
+        db.query(VoteMerkleNode.level, VoteMerkleNode.position, VoteMerkleNode.hash)
+        .filter(
+            VoteMerkleNode.session_id == session_id,
+            tuple_(VoteMerkleNode.level, VoteMerkleNode.position).in_(keys),
+        )
+        .all()
+    )
+    return {(level, position): value for level, position, value in rows}
+
+
+def append_leaves(db: Session, session_id: int, vote_hashes: List[str]) -> int:
+    """
+    Acrescenta as folhas a arvore da sessao, sem commit; retorna a posicao da primeira.
+
+    O incremento de merkle_leaf_count bloqueia a linha da sessao ate o commit,
+    entao transacoes concorrentes acrescentam em sequencia e sempre enxergam
+    os irmaos a esquerda ja gravados. Chame em uma transacao curta, separada
+    da que grava os votos.
+    """
+    if not vote_hashes:
+        return 0
+    new_size = increment_counter(
+        db, VotingSession, session_id, "merkle_leaf_count", len(vote_hashes)
+    )
+    first = new_size - len(vote_hashes)
+
+    nodes: Dict[NodeKey, str] = {}
+    for offset, vote_hash in enumerate(vote_hashes):
+        nodes[(0, first + offset)] = leaf_hash(vote_hash)
+
+    # Irmaos a esquerda que ja estavam na arvore antes deste lote.
+    known = _load_nodes(db, session_id, _peaks(0, first))
+
+    created: Dict[NodeKey, str] = dict(nodes)
+    for position in range(first, new_size):
+        level, index = 0, position
+        while index & 1:
+            left = created.get((level, index - 1)) or known[(level, index - 1)]
+            parent = node_hash(left, created[(level, index)])
+            level, index = level + 1, index >> 1
+            created[(level, index)] = parent
+
+    db.bulk_insert_mappings(
+        VoteMerkleNode,
+        [
+            {"session_id": session_id, "level": level, "position": position, "hash": value}
+            for (level, position), value in created.items()
+        ],
+    )
+    return first
+
+
+def compute_root(db: Session, session_id: int, tree_size: int) -> Optional[str]:
+    if tree_size <= 0:
+        return None
+    peaks = _peaks(0, tree_size)
+    nodes = _load_nodes(db, session_id, peaks)
+    return _fold([nodes[key] for key in peaks])
+
+
+def inclusion_proof(db: Session, session_id: int, index: int, tree_size: int) -> List[str]:
+    """Caminho de auditoria (RFC 6962, PATH) da folha `index` numa arvore de `tree_size` folhas."""
+    segments: List[Tuple[int, int]] = []
+    start, size = 0, tree_size
+    while size > 1:
+        split = 1 << ((size - 1).bit_length() - 1)
+        if index - start < split:
+            segments.append((start + split, size - split))
+            size = split
+        else:
+            segments.append((start, split))
+            start, size = start + split, size - split
+
+    segment_peaks = [_peaks(seg_start, seg_size) for seg_start, seg_size in segments]
+    nodes = _load_nodes(db, session_id, (key for peaks in segment_peaks for key in peaks))
+    return [_fold([nodes[key] for key in peaks]) for peaks in reversed(segment_peaks)]
+
+
+def verify_inclusion(
+    vote_hash: str,
+    index: int,
+    tree_size: int,
+    path: List[str],
+    root: str,
+) -> bool:
+    """Verifica uma prova de inclusao (RFC 9162, secao 2.1.3.2)."""
+    if index >= tree_size:
+        return False
+    fn, sn = index, tree_size - 1
+    current = leaf_hash(vote_hash)
+    for sibling in path:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            current = node_hash(sibling, current)
+            while not fn & 1 and fn:
+                fn >>= 1
+                sn >>= 1
+        else:
+            current = node_hash(current, sibling)
+        fn >>= 1
+        sn >>= 1
+    return sn == 0 and current == root
+
+
+def find_leaf(db: Session, session_id: int, vote_hash: str) -> Optional[int]:
+    position = (
+        db.query(VoteMerkleNode.position)
+        .filter(
+            VoteMerkleNode.session_id == session_id,
+            VoteMerkleNode.hash == leaf_hash(vote_hash),
+            VoteMerkleNode.level == 0,
+        )
+        .scalar()
+    )
+    return position
+
+
+def _session_vote_hashes(db: Session, session_id: int) -> List[str]:
+    """vote_hash dos votos da sessao em ordem de id (linhas legadas ou compactas)."""
+    return [
+        vote_digest.hex() if vote_digest is not None else vote_hash
+        for vote_hash, vote_digest in db.query(Vote.vote_hash, Vote.vote_digest)
+        .filter(
+            Vote.session_id == session_id,
+            (Vote.vote_hash.isnot(None)) | (Vote.vote_digest.isnot(None)),
+        )
+        .order_by(Vote.id)
+    ]
+
+
+def append_missing_leaves(db: Session, session_id: int, tree_size: int) -> int:
+    """
+    Acrescenta, em ordem de id, os votos que ficaram sem folha (acrescimo que
+    falhou depois do commit do voto), sem commit; retorna o novo tamanho.
+    Com a contagem batendo nao le as folhas.
+    """
+    votes_count = db.query(func.count(Vote.id)).filter(Vote.session_id == session_id).scalar()
+    if votes_count <= tree_size:
+        return tree_size
+    present = {
+        value
+        for (value,) in db.query(VoteMerkleNode.hash).filter(
+            VoteMerkleNode.session_id == session_id, VoteMerkleNode.level == 0
+        )
+    }
+    missing = [
+        vote_hash
+        for vote_hash in _session_vote_hashes(db, session_id)
+        if leaf_hash(vote_hash) not in present
+    ]
+    if not missing:
+        return tree_size
+    first = append_leaves(db, session_id, missing)
+    logger.warning(
+        "Appended %s missing Merkle leaves to voting session %s", len(missing), session_id
+    )
+    return first + len(missing)
+
+
+def rebuild_merkle_tree(db: Session, session_id: int) -> Optional[str]:
+    """
+    Reconstroi a arvore da sessao a partir de votes (ordem de id), sem commit.
+
+    Usado para sessoes com votos anteriores ao log de auditoria.
+    """
+    session = (
+        db.query(VotingSession).filter(VotingSession.id == session_id).with_for_update().one()
+    )
+    if session.archived_at is not None:
+        # Os votos ja sairam de votes; a arvore gravada e a unica copia das folhas.
+        logger.info("Skipping Merkle rebuild for archived session %s", session_id)
+        return session.merkle_root
+    db.query(VoteMerkleNode).filter(VoteMerkleNode.session_id == session_id).delete(
+        synchronize_session=False
+    )
+    session.merkle_leaf_count = 0
+    db.flush()
+
+    hashes = _session_vote_hashes(db, session_id)
+    append_leaves(db, session_id, hashes)
+    db.refresh(session)
+    root = compute_root(db, session_id, session.merkle_leaf_count)
+    if session.merkle_root is not None:
+        session.merkle_root = root
+    logger.info("Rebuilt Merkle tree for session %s (%s leaves)", session_id, len(hashes))
+    return root
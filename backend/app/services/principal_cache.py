@@ -0,0 +1,247 @@
+"""
+Cache por processo do usuario autenticado (principal).
+
+A autorizacao so le id, username, level e as flags is_active, is_superuser e
+is_verified. Esses campos ficam em memoria por (user_id, iat do token) com TTL
+curto, e as requisicoes seguintes com o mesmo token nao consultam users.
+Alteracoes administrativas invalidam todas as entradas do usuario neste
+processo; nos demais workers o TTL limita a defasagem.
+
+Com ACCESS_TOKEN_CLAIMS_ENABLED os mesmos campos vao assinados no access token
+(claim "authz", com a authz_version do usuario na emissao) e o principal sai
+do proprio token. A versao assinada e conferida com AuthzVersionMap, um mapa
+user_id -> authz_version em memoria atualizado a cada
+AUTHZ_VERSION_REFRESH_SECONDS com as linhas alteradas desde a leitura anterior;
+claims de versao antiga ou de usuario ausente caem no caminho com cache/banco
+acima.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.user import User, UserLevel, UserPermissionsMixin
+
+# Versao do formato da claim "authz"; tokens com outro formato usam o banco.
+AUTHZ_CLAIMS_SCHEMA = 1
+
+# Mudancas commitadas fora de ordem (transacoes longas) ainda entram na proxima leitura.
+_AUTHZ_FEED_OVERLAP = timedelta(minutes=5)
+
+
+class Principal(UserPermissionsMixin):
+    """Retrato imutavel dos campos de autorizacao de um usuario."""
+
+    __slots__ = ("id", "username", "level", "is_active", "is_superuser", "is_verified")
+
+    def __init__(
+        self,
+        id: int,
+        username: str,
+        level: UserLevel,
+        is_active: bool,
+        is_superuser: bool,
+        is_verified: bool,
+    ):
+        self.id = id
+        self.username = username
+        self.level = level
+        self.is_active = bool(is_active)
+        self.is_superuser = bool(is_superuser)
+        self.is_verified = bool(is_verified)
+
+    @classmethod
+    def load(cls, db: Session, user_id: int) -> Optional["Principal"]:
+        row = (
+            db.query(
+                User.id,
+                User.username,
+                User.level,
+                User.is_active,
+                User.is_superuser,
+                User.is_verified,
+            )
+            .filter(User.id == user_id)
+            .first()
+        )
+        return cls(*row) if row else None
+
+    @classmethod
+    def from_claims(cls, user_id: int, claims: Any) -> Optional["Principal"]:
+        """Principal da claim "authz" de um token; None se o formato nao for reconhecido."""
+        if not isinstance(claims, dict) or claims.get("v") != AUTHZ_CLAIMS_SCHEMA:
+            return None
+        try:
+            level = UserLevel(claims["lvl"])
+            return cls(
+                user_id,
+                claims["usr"],
+                level,
+                claims["act"],
+                claims["su"],
+                claims["vf"],
+            )
+        except (KeyError, ValueError):
+            return None
+
+    def __repr__(self):
+        return f"<Principal(id={self.id}, username='{self.username}', level={self.level})>"
+
+
+class PrincipalCache:
+    """LRU com TTL de (user_id, iat) -> Principal."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 10000):
+        self._ttl = ttl_seconds
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, Optional[int]], tuple]" = OrderedDict()
+        self._keys_by_user: Dict[int, Set[Tuple[int, Optional[int]]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, issued_at: Optional[int]) -> Optional[Principal]:
+        key = (user_id, issued_at)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if expires_at < time.monotonic():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return principal
+
+    def put(self, issued_at: Optional[int], principal: Principal) -> None:
+        if self._ttl <= 0:
+            return
+        key = (principal.id, issued_at)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self._ttl, principal)
+            self._entries.move_to_end(key)
+            self._keys_by_user.setdefault(principal.id, set()).add(key)
+            while len(self._entries) > self._max_entries:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            for key in self._keys_by_user.pop(user_id, set()):
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _discard(self, key: Tuple[int, Optional[int]]) -> None:
+        self._entries.pop(key, None)
+        keys = self._keys_by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[key[0]]
+
+
+class AuthzVersionMap:
+    """
+    user_id -> authz_version de todos os usuarios. A primeira leitura carrega
+    o mapa inteiro; as seguintes, a cada refresh_seconds, so as linhas com
+    authz_changed_at recente (com a mesma janela de sobreposicao da revogacao
+    de tokens, para commits fora de ordem). Usuarios criados entram pela mesma
+    leitura. Exclusoes feitas em outro processo so somem na recarga completa,
+    a cada full_reload_seconds; neste processo, record(user_id, None) as
+    aplica na hora.
+    """
+
+    def __init__(self, refresh_seconds: float, full_reload_seconds: float):
+        self._refresh_seconds = refresh_seconds
+        self._full_reload_seconds = full_reload_seconds
+        self._versions: Dict[int, int] = {}
+        self._synced_at: Optional[datetime] = None
+        self._next_refresh = 0.0
+        self._next_full_reload = 0.0
+        self._lock = threading.Lock()
+
+    def current(self, db: Session, user_id: int) -> Optional[int]:
+        if time.monotonic() >= self._next_refresh:
+            self.refresh(db)
+        return self._versions.get(user_id)
+
+    def refresh(self, db: Session) -> None:
+        with self._lock:
+            now_monotonic = time.monotonic()
+            if now_monotonic < self._next_refresh:
+                return
+            now = datetime.utcnow()
+            if self._synced_at is None or now_monotonic >= self._next_full_reload:
+                self._versions = dict(db.query(User.id, User.authz_version).all())
+                self._next_full_reload = now_monotonic + self._full_reload_seconds
+            else:
+                versions = dict(self._versions)
+                versions.update(
+                    db.query(User.id, User.authz_version).filter(
+                        User.authz_changed_at >= self._synced_at - _AUTHZ_FEED_OVERLAP
+                    )
+                )
+                self._versions = versions
+            self._synced_at = now
+            self._next_refresh = now_monotonic + self._refresh_seconds
+
+    def record(self, user_id: int, version: Optional[int]) -> None:
+        """Aplica neste processo uma mudanca ja gravada (None = usuario removido)."""
+        with self._lock:
+            if version is None:
+                self._versions.pop(user_id, None)
+            else:
+                self._versions[user_id] = version
+
+    def clear(self) -> None:
+        with self._lock:
+            self._versions = {}
+            self._synced_at = None
+            self._next_refresh = 0.0
+            self._next_full_reload = 0.0
+
+
+def access_token_data(user: User) -> Dict[str, Any]:
+    """Conteudo do access token: sub e, no modo de claims, nivel e flags assinados."""
+    data: Dict[str, Any] = {"sub": str(user.id)}
+    if settings.ACCESS_TOKEN_CLAIMS_ENABLED:
+        data["authz"] = {
+            "v": AUTHZ_CLAIMS_SCHEMA,
+            "av": user.authz_version or 0,
+            "usr": user.username,
+            "lvl": user.level.value,
+            "act": bool(user.is_active),
+            "su": bool(user.is_superuser),
+            "vf": bool(user.is_verified),
+        }
+    return data
+
+
+def principal_from_token(db: Session, user_id: int, payload: Dict[str, Any]) -> Optional[Principal]:
+    """Principal assinado no token, se o modo de claims estiver ativo e a versao for a atual."""
+    if not settings.ACCESS_TOKEN_CLAIMS_ENABLED:
+        return None
+    claims = payload.get("authz")
+    principal = Principal.from_claims(user_id, claims)
+    if principal is None:
+        return None
+    if authz_versions.current(db, user_id) != claims.get("av"):
+        return None
+    return principal
+
+
+principal_cache = PrincipalCache(
+    settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+)
+authz_versions = AuthzVersionMap(
+    settings.AUTHZ_VERSION_REFRESH_SECONDS,
+    full_reload_seconds=settings.AUTHZ_VERSION_FULL_RELOAD_SECONDS,
+)
@@ -0,0 +1,150 @@
+"""
+Cache em memoria dos resultados de sessoes concluidas.
+
+Depois de COMPLETED o resultado nao muda mais, entao o corpo JSON e montado
+uma unica vez a partir de result_metadata, serializado de forma canonica
+(chaves ordenadas) e guardado em um LRU por processo junto com um ETag forte
+(sha256 do corpo). Workers diferentes geram os mesmos bytes e o mesmo ETag,
+o que permite respostas 304.
+
+A chave do cache inclui a visibilidade atual do repositorio, conferida pelo
+endpoint antes de qualquer leitura: mudar a visibilidade nunca reaproveita um
+retrato montado sob a anterior. So resultados de repositorios publicos saem
+com Cache-Control public (cacheaveis por proxies); os demais ficam private.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.models.repository import RepositoryVisibility
+from app.models.vote import VotingSession, VotingStatus
+from app.services.tally import final_stats, level_breakdown
+
+logger = get_logger("services.result_cache")
+
+IMMUTABLE_MAX_AGE = 31536000
+
+
+def result_cache_control(visibility: RepositoryVisibility) -> str:
+    scope = "public" if visibility == RepositoryVisibility.PUBLIC else "private"
+    return f"{scope}, max-age={IMMUTABLE_MAX_AGE}, immutable"
+
+
+class ResultSnapshot(NamedTuple):
+    body: bytes
+    etag: str
+
+
+_SNAPSHOT_KEYS = ("stats", "by_level", "quorum")
+
+
+def build_result_payload(session: VotingSession) -> Dict[str, Any]:
+    result = dict(session.result_metadata or {})
+    return {
+        "session_id": session.id,
+        "proposal_id": session.proposal_id,
+        "repository_id": session.repository_id,
+        "title": session.title,
+        "method": session.method.value if session.method else None,
+        "status": session.status.value,
+        "calculated_at": result.get("calculated_at"),
+        "winner_option_id": session.winner_option_id,
+        "total_votes": result.get("total_votes", session.total_votes or 0),
+        "stats": result.get("stats"),
+        "by_level": result.get("by_level", {}),
+        "quorum": result.get("quorum"),
+        "merkle_root": session.merkle_root,
+        "result": {key: value for key, value in result.items() if key not in _SNAPSHOT_KEYS},
+    }
+
+
+def encode_snapshot(payload: Dict[str, Any]) -> ResultSnapshot:
+    body = json.dumps(
+        payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str
+    ).encode("utf-8")
+    return ResultSnapshot(body, f'"{hashlib.sha256(body).hexdigest()}"')
+
+
+def ensure_result_snapshot(db: Session, session: VotingSession) -> bool:
+    """
+    Completa result_metadata de sessoes apuradas antes do retrato (stats e
+    by_level). Retorna True quando gravou algo; o commit fica com o chamador.
+    """
+    result = session.result_metadata
+    if result is None or ("stats" in result and "by_level" in result):
+        return False
+    result = dict(result)
+    result["stats"] = final_stats(session, result)
+    # Votos arquivados nao guardam o nivel do eleitor.
+    result["by_level"] = (
+        level_breakdown(db, session) if session.archived_at is None else {}
+    )
+    session.result_metadata = result
+    db.add(session)
+    db.flush()
+    logger.info("Stored result snapshot for voting session %s", session.id)
+    return True
+
+
+_CacheKey = Tuple[int, RepositoryVisibility]
+
+
+class ResultSnapshotCache:
+    """LRU por processo de (session_id, visibilidade) -> corpo e ETag do resultado final."""
+
+    def __init__(self, max_entries: int = 256):
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[_CacheKey, ResultSnapshot]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: int, visibility: RepositoryVisibility) -> Optional[ResultSnapshot]:
+        key = (session_id, visibility)
+        with self._lock:
+            snapshot = self._entries.get(key)
+            if snapshot is not None:
+                self._entries.move_to_end(key)
+            return snapshot
+
+    def put(
+        self, session_id: int, visibility: RepositoryVisibility, snapshot: ResultSnapshot
+    ) -> None:
+        if self._max_entries <= 0:
+            return
+        key = (session_id, visibility)
+        with self._lock:
+            self._entries[key] = snapshot
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def load(
+        self, db: Session, session: VotingSession, visibility: RepositoryVisibility
+    ) -> ResultSnapshot:
+        """
+        Snapshot de uma sessao concluida, montado na primeira leitura do
+        processo. A visibilidade ja deve ter sido conferida pelo chamador.
+        """
+        if session.status != VotingStatus.COMPLETED:
+            raise ValueError(f"Voting session {session.id} is not completed")
+        snapshot = self.get(session.id, visibility)
+        if snapshot is not None:
+            return snapshot
+        if ensure_result_snapshot(db, session):
+            db.commit()
+        snapshot = encode_snapshot(build_result_payload(session))
+        self.put(session.id, visibility, snapshot)
+        return snapshot
+
+
+result_snapshot_cache = ResultSnapshotCache(settings.RESULT_CACHE_MAX_ENTRIES)
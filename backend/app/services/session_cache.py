@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional
+
+from app.core.config import settings
+from app.models.vote import VotingMethod, VotingSession
+from app.services.electorate import bitmap_contains, decode_bitmap
+
+
+class SessionOption(NamedTuple):
+    id: int
+    value: str
+    title: str
+
+
+class ActiveSessionInfo:
+    """Metadados imutaveis de uma sessao ativa usados no caminho do voto."""
+
+    __slots__ = (
+        "session_id",
+        "proposal_id",
+        "method",
+        "starts_at",
+        "ends_at",
+        "options",
+        "eligible_bitmap",
+    )
+
+    def __init__(
+        self,
+        session_id: int,
+        proposal_id: int,
+        method: VotingMethod,
+        starts_at: Optional[datetime],
+        ends_at: Optional[datetime],
+        options: Dict[str, SessionOption],
+        eligible_bitmap: Optional[bytes] = None,
+    ):
+        self.session_id = session_id
+        self.proposal_id = proposal_id
+        self.method = method
+        self.starts_at = starts_at
+        self.ends_at = ends_at
+        self.options = options
+        self.eligible_bitmap = eligible_bitmap
+
+    def is_eligible(self, user_id: int) -> bool:
+        """Sem bitmap (desativado ou sessao antiga) vale apenas User.can_vote."""
+        if self.eligible_bitmap is None:
+            return True
+        return bitmap_contains(self.eligible_bitmap, user_id)
+
+    @classmethod
+    def from_session(cls, session: VotingSession) -> "ActiveSessionInfo":
+        options = {}
+        for option in session.options:
+            if option.value:
+                options[option.value.lower()] = SessionOption(
+                    option.id, option.value, option.title
+                )
+        return cls(
+            session_id=session.id,
+            proposal_id=session.proposal_id,
+            method=session.method,
+            starts_at=session.starts_at,
+            ends_at=session.ends_at,
+            options=options,
+            eligible_bitmap=decode_bitmap(session.eligible_voters_bitmap),
+        )
+
+
+class ActiveSessionCache:
+    """
+    Cache por processo de proposal_id -> sessao ativa.
+
+    Invalidado explicitamente quando uma sessao abre ou encerra; o TTL limita
+    a defasagem em relacao a outros workers.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 1024):
+        self._ttl = ttl_seconds
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, proposal_id: int) -> Optional[ActiveSessionInfo]:
+        with self._lock:
+            entry = self._entries.get(proposal_id)
+            if entry is None:
+                return None
+            expires_at, info = entry
+            if expires_at < time.monotonic():
+                del self._entries[proposal_id]
+                return None
+            self._entries.move_to_end(proposal_id)
+            return info
+
+    def put(self, info: ActiveSessionInfo) -> None:
+        if self._ttl <= 0:
+            return
+        with self._lock:
+            self._entries[info.proposal_id] = (time.monotonic() + self._ttl, info)
+            self._entries.move_to_end(info.proposal_id)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, proposal_id: Optional[int]) -> None:
+        with self._lock:
+            self._entries.pop(proposal_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+active_session_cache = ActiveSessionCache(settings.ACTIVE_SESSION_CACHE_TTL_SECONDS)
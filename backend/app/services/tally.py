@@ -0,0 +1,416 @@
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.database import dialect_insert
+from app.core.logging import get_logger
+from app.models.user import User
+from app.models.vote import Vote, VotingMethod, VotingOption, VotingOptionTally, VotingSession
+from app.services.counters import pick_shard, reset_counter
+from app.services.delegation import delegation_summary, resolve_session_weights
+from app.services.electorate import quorum_status
+from app.services.merkle import append_missing_leaves, compute_root
+from app.services.vote_storage import ballot_data
+
+logger = get_logger("services.tally")
+
+
+def increment_option_tally(
+    db: Session,
+    session_id: int,
+    option_id: int,
+    delta: int = 1,
+) -> None:
+    """
+    Incrementa o contador da opcao na mesma transacao do voto (upsert atomico),
+    em uma parcela aleatoria quando COUNTER_SHARDS > 1.
+    """
+    stmt = dialect_insert(db, VotingOptionTally.__table__).values(
+        session_id=session_id,
+        option_id=option_id,
+        shard=pick_shard(),
+        votes_count=delta,
+        updated_at=datetime.utcnow(),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["session_id", "option_id", "shard"],
+        set_={
+            "votes_count": VotingOptionTally.__table__.c.votes_count
+            + stmt.excluded.votes_count,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    db.execute(stmt)
+
+
+def get_option_tallies(
+    db: Session,
+    session_ids: Iterable[int],
+) -> Dict[int, Dict[str, int]]:
+    """Retorna {session_id: {valor_da_opcao: votos}} lendo apenas os contadores."""
+    session_ids = list(session_ids)
+    if not session_ids:
+        return {}
+
+    rows = (
+        db.query(
+            VotingOption.session_id,
+            VotingOption.value,
+            VotingOption.title,
+            func.sum(VotingOptionTally.votes_count),
+        )
+        .outerjoin(
+            VotingOptionTally,
+            VotingOptionTally.option_id == VotingOption.id,
+        )
+        .filter(VotingOption.session_id.in_(session_ids))
+        .group_by(VotingOption.id, VotingOption.session_id, VotingOption.value, VotingOption.title)
+        .all()
+    )
+
+    tallies: Dict[int, Dict[str, int]] = {session_id: {} for session_id in session_ids}
+    for session_id, value, title, votes_count in rows:
+        key = (value or title).lower()
+        tallies[session_id][key] = int(votes_count or 0)
+    return tallies
+
+
+def count_votes_by_choice(
+    db: Session,
+    session_ids: Iterable[int],
+) -> Dict[int, Dict[str, int]]:
+    """
+    Conta os votos por sessao e escolha em uma unica consulta agregada.
+
+    Nao depende dos contadores materializados; util quando eles ainda nao
+    foram reconstruidos ou para conferencia.
+    """
+    session_ids = list(session_ids)
+    if not session_ids:
+        return {}
+
+    # Linhas compactas nao tem choice; o valor vem da opcao referenciada.
+    choice_key = func.lower(func.coalesce(Vote.choice, VotingOption.value, VotingOption.title))
+    rows = (
+        db.query(Vote.session_id, choice_key, func.count(Vote.id))
+        .outerjoin(VotingOption, VotingOption.id == Vote.option_id)
+        .filter(Vote.session_id.in_(session_ids))
+        .group_by(Vote.session_id, choice_key)
+        .all()
+    )
+
+    tallies: Dict[int, Dict[str, int]] = {session_id: {} for session_id in session_ids}
+    for session_id, choice, votes_count in rows:
+        if choice is not None:
+            tallies[session_id][choice] = votes_count
+    return tallies
+
+
+def count_votes_by_level(
+    db: Session,
+    session: VotingSession,
+    weights: Optional[Dict[int, int]] = None,
+) -> Dict[str, Dict]:
+    """
+    Cedulas de uma sessao simples por nivel do eleitor, com os votos de cada
+    opcao. Usa os mesmos pesos de delegacao da apuracao e ignora escolhas fora
+    das opcoes, entao a soma dos niveis bate com result["options"].
+    """
+    option_keys = {(option.value or option.title).lower() for option in session.options}
+    choice_key = func.lower(func.coalesce(Vote.choice, VotingOption.value, VotingOption.title))
+    query = (
+        db.query(User.level)
+        .select_from(Vote)
+        .join(User, User.id == Vote.user_id)
+        .outerjoin(VotingOption, VotingOption.id == Vote.option_id)
+        .filter(Vote.session_id == session.id)
+    )
+    if weights is None:
+        rows = (
+            query.add_columns(choice_key, func.count(Vote.id))
+            .group_by(User.level, choice_key)
+            .all()
+        )
+    else:
+        voters = query.add_columns(choice_key, Vote.user_id).yield_per(5000)
+        rows = ((level, choice, weights.get(user_id, 1)) for level, choice, user_id in voters)
+
+    breakdown: Dict[str, Dict] = {}
+    for level, choice, votes in rows:
+        entry = breakdown.setdefault(level.name, {"votes": 0, "option_votes": {}})
+        entry["votes"] += votes if weights is None else 1
+        if choice in option_keys:
+            entry["option_votes"][choice] = entry["option_votes"].get(choice, 0) + votes
+    return breakdown
+
+
+def level_breakdown(db: Session, session: VotingSession) -> Dict[str, Dict]:
+    """by_level de uma sessao ja apurada, pelo mesmo caminho da apuracao final."""
+    if session.method not in (None, VotingMethod.SIMPLE):
+        from app.services.tally_engine import tally_session
+
+        return tally_session(db, session)["by_level"]
+    return count_votes_by_level(db, session, resolve_session_weights(db, session))
+
+
+def final_stats(session: VotingSession, result: Dict) -> Dict:
+    """Estatisticas no formato de VotingStats a partir do resultado apurado."""
+    option_votes = {
+        (option["value"] or option["title"]).lower(): option["votes"]
+        for option in result.get("options", [])
+    }
+    total_votes = result["total_votes"]
+    return {
+        "total_votes": total_votes,
+        "yes_votes": option_votes.get("yes", 0),
+        "no_votes": option_votes.get("no", 0),
+        "abstain_votes": option_votes.get("abstain", 0),
+        "option_votes": option_votes,
+        "eligible_voters": session.eligible_voters_count,
+        "quorum_threshold": session.quorum_threshold,
+        "quorum_reached": quorum_status(session, total_votes),
+    }
+
+
+def count_votes_by_option(
+    db: Session,
+    session_ids: Iterable[int],
+) -> Dict[tuple, int]:
+    """Conta votos por (session_id, option_id) em uma unica consulta agregada."""
+    session_ids = list(session_ids)
+    if not session_ids:
+        return {}
+
+    option_key = func.lower(func.coalesce(VotingOption.value, VotingOption.title))
+    legacy_rows = (
+        db.query(
+            VotingOption.session_id,
+            VotingOption.id,
+            func.count(Vote.id),
+        )
+        .join(
+            Vote,
+            (Vote.session_id == VotingOption.session_id)
+            & Vote.option_id.is_(None)
+            & (func.lower(Vote.choice) == option_key),
+        )
+        .filter(VotingOption.session_id.in_(session_ids))
+        .group_by(VotingOption.session_id, VotingOption.id)
+        .all()
+    )
+    compact_rows = (
+        db.query(Vote.session_id, Vote.option_id, func.count(Vote.id))
+        .filter(Vote.session_id.in_(session_ids), Vote.option_id.isnot(None))
+        .group_by(Vote.session_id, Vote.option_id)
+        .all()
+    )
+    counts: Dict[tuple, int] = {}
+    for session_id, option_id, votes_count in legacy_rows + compact_rows:
+        key = (session_id, option_id)
+        counts[key] = counts.get(key, 0) + votes_count
+    return counts
+
+
+def ballot_option_weights(vote_data: Optional[Dict]) -> Dict[int, int]:
+    """Peso de cada opcao de uma cedula nos contadores, espelhando o caminho do voto."""
+    vote_data = vote_data or {}
+    if vote_data.get("ranking"):
+        return {vote_data["ranking"][0]: 1}
+    if vote_data.get("approved"):
+        return {option_id: 1 for option_id in vote_data["approved"]}
+    if vote_data.get("allocations"):
+        return {int(option_id): votes for option_id, votes in vote_data["allocations"].items()}
+    if vote_data.get("option_id") is not None:
+        return {vote_data["option_id"]: 1}
+    return {}
+
+
+def count_weighted_ballots(
+    db: Session,
+    session_ids: Iterable[int],
+) -> Dict[tuple, int]:
+    """Conta (session_id, option_id) lendo vote_data; usado nos metodos nao simples."""
+    session_ids = list(session_ids)
+    counts: Dict[tuple, int] = {}
+    if not session_ids:
+        return counts
+
+    rows = (
+        db.query(Vote.session_id, Vote.vote_data, Vote.option_id)
+        .filter(Vote.session_id.in_(session_ids))
+        .yield_per(5000)
+    )
+    for session_id, vote_data, primary_option_id in rows:
+        ballot = ballot_data(vote_data, primary_option_id)
+        for option_id, weight in ballot_option_weights(ballot).items():
+            key = (session_id, option_id)
+            counts[key] = counts.get(key, 0) + weight
+    return counts
+
+
+def finalize_session_result(db: Session, session: VotingSession) -> Dict:
+    """
+    Apura o resultado final da sessao em uma passada agregada sobre votes e
+    grava result_metadata, winner_option_id, result_calculated_at e total_votes.
+    Nao altera o status nem faz commit.
+    """
+    if session.method not in (None, VotingMethod.SIMPLE):
+        # Importado sob demanda: NumPy so e necessario para metodos nao simples.
+        from app.services.tally_engine import tally_session
+
+        result = tally_session(db, session)
+        return _store_session_result(db, session, result)
+
+    weights = resolve_session_weights(db, session)
+    if weights is None:
+        counts = count_votes_by_option(db, [session.id])
+    else:
+        counts = _count_weighted_choices(db, session, weights)
+    options = [
+        {
+            "option_id": option.id,
+            "value": option.value,
+            "title": option.title,
+            "votes": counts.get((session.id, option.id), 0),
+        }
+        for option in session.options
+    ]
+    total_votes = (
+        db.query(func.count(Vote.id)).filter(Vote.session_id == session.id).scalar() or 0
+    )
+
+    ranked = sorted(options, key=lambda item: item["votes"], reverse=True)
+    tie = len(ranked) > 1 and ranked[0]["votes"] == ranked[1]["votes"]
+    winner = ranked[0] if ranked and ranked[0]["votes"] > 0 and not tie else None
+
+    result = {
+        "method": session.method.value if session.method else None,
+        "total_votes": total_votes,
+        "options": options,
+        "winner_option_id": winner["option_id"] if winner else None,
+        "tie": tie,
+        "by_level": count_votes_by_level(db, session, weights),
+    }
+    if weights is not None:
+        result["delegation"] = delegation_summary(weights)
+    return _store_session_result(db, session, result)
+
+
+def _count_weighted_choices(
+    db: Session,
+    session: VotingSession,
+    weights: Dict[int, int],
+) -> Dict[tuple, int]:
+    """Como count_votes_by_option, mas cada voto vale o peso das delegacoes recebidas."""
+    option_by_value = {
+        (option.value or option.title).lower(): option.id for option in session.options
+    }
+    counts: Dict[tuple, int] = {}
+    rows = (
+        db.query(Vote.user_id, Vote.choice, Vote.option_id)
+        .filter(Vote.session_id == session.id)
+        .yield_per(5000)
+    )
+    for user_id, choice, option_id in rows:
+        if option_id is None:
+            option_id = option_by_value.get((choice or "").lower())
+        if option_id is not None:
+            key = (session.id, option_id)
+            counts[key] = counts.get(key, 0) + weights.get(user_id, 1)
+    return counts
+
+
+def _store_session_result(db: Session, session: VotingSession, result: Dict) -> Dict:
+    now = datetime.utcnow()
+    result["calculated_at"] = now.isoformat()
+    session.result_calculated_at = now
+    # A arvore nao cresce depois do encerramento; a raiz sela o conjunto de votos.
+    # O bloqueio espera acrescimos em andamento, e votos sem folha entram agora.
+    db.refresh(session, ["merkle_leaf_count"], with_for_update=True)
+    if session.archived_at is None:
+        append_missing_leaves(db, session.id, session.merkle_leaf_count)
+        db.refresh(session, ["merkle_leaf_count"])
+    session.merkle_root = compute_root(db, session.id, session.merkle_leaf_count)
+    result["merkle"] = {"tree_size": session.merkle_leaf_count, "root": session.merkle_root}
+    reached = quorum_status(session, result["total_votes"])
+    result["quorum"] = {
+        "eligible_voters": session.eligible_voters_count,
+        "threshold": session.quorum_threshold,
+        "reached": reached,
+    }
+    if reached is False:
+        # Sem quorum a votacao nao produz decisao; as contagens ficam registradas.
+        result["winner_option_id"] = None
+    # Retrato final servido pelo cache de resultados (app.services.result_cache).
+    result["stats"] = final_stats(session, result)
+    session.result_metadata = result
+    session.winner_option_id = result.get("winner_option_id")
+    db.add(session)
+    db.flush()
+    reset_counter(db, VotingSession, session.id, "total_votes", result["total_votes"])
+    return result
+
+
+def rebuild_option_tallies(
+    db: Session,
+    session_ids: Optional[Iterable[int]] = None,
+) -> int:
+    """
+    Reconstroi os contadores por opcao (e o total da sessao) a partir da tabela votes.
+
+    As sessoes sao bloqueadas (FOR UPDATE) para que votos concorrentes aguardem
+    a reconstrucao. Nao faz commit; cabe ao chamador.
+    """
+    # Sessoes arquivadas nao tem mais votos em votes; os contadores ficam como estao.
+    sessions_query = (
+        db.query(VotingSession)
+        .filter(VotingSession.archived_at.is_(None))
+        .order_by(VotingSession.id)
+    )
+    if session_ids is not None:
+        sessions_query = sessions_query.filter(VotingSession.id.in_(list(session_ids)))
+    sessions = sessions_query.with_for_update().all()
+    if not sessions:
+        return 0
+
+    ids = [session.id for session in sessions]
+    weighted_ids = [
+        session.id
+        for session in sessions
+        if session.method not in (None, VotingMethod.SIMPLE)
+    ]
+    counts = count_votes_by_option(db, [sid for sid in ids if sid not in weighted_ids])
+    counts.update(count_weighted_ballots(db, weighted_ids))
+    totals = dict(
+        db.query(Vote.session_id, func.count(Vote.id))
+        .filter(Vote.session_id.in_(ids))
+        .group_by(Vote.session_id)
+        .all()
+    )
+
+    db.query(VotingOptionTally).filter(
+        VotingOptionTally.session_id.in_(ids)
+    ).delete(synchronize_session=False)
+
+    now = datetime.utcnow()
+    options = db.query(VotingOption.session_id, VotingOption.id).filter(
+        VotingOption.session_id.in_(ids)
+    )
+    db.add_all(
+        VotingOptionTally(
+            session_id=session_id,
+            option_id=option_id,
+            votes_count=counts.get((session_id, option_id), 0),
+            updated_at=now,
+        )
+        for session_id, option_id in options
+    )
+
+    db.flush()
+    for session in sessions:
+        reset_counter(db, VotingSession, session.id, "total_votes", totals.get(session.id, 0))
+
+    logger.info("Rebuilt option tallies for %s voting sessions", len(sessions))
+    return len(sessions)
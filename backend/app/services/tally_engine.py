@@ -0,0 +1,401 @@
+"""
+Apuracao vetorizada (NumPy) para os metodos ranqueado, aprovacao e quadratico.
+
+As cedulas de uma sessao sao carregadas uma unica vez em matrizes indexadas
+pela posicao da opcao em `session.options`:
+
+- ranqueado: int32 (cedulas x posicoes), -1 nas posicoes vazias;
+- aprovacao: bool (cedulas x opcoes);
+- quadratico: int64 (cedulas x opcoes) com os votos alocados.
+
+A carga le so as colunas (select do Core, sem entidades ORM), com vote_data
+como texto: cada lote vira um unico json.loads de um array, e os ids das
+opcoes sao convertidos em posicoes com NumPy, sem laco por posicao. Cada lote
+vira arrays logo depois de decodificado, entao no maximo um lote de dicts fica
+vivo (e o coletor de ciclos nao varre as cedulas da sessao inteira).
+"""
+
+import itertools
+import json
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import String, Text, cast, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.user import User
+from app.models.vote import Vote, VotingMethod, VotingOption, VotingSession
+from app.services.delegation import delegation_summary, resolve_session_weights
+from app.services.vote_storage import ballot_data
+
+BALLOT_FETCH_SIZE = 5000
+
+
+# (user_ids, vote_data decodificados, option_ids, niveis) de um lote.
+_BallotChunk = Tuple[
+    Sequence[int], List[Optional[Dict[str, Any]]], Sequence[Optional[int]], Sequence[Optional[str]]
+]
+
+
+def _iter_ballot_chunks(
+    db: Session, session_id: int, with_levels: bool = False
+) -> Iterator[_BallotChunk]:
+    """
+    Lotes de cedulas em ordem de id. Com with_levels vem o nivel atual do
+    eleitor (nome do enum, que e o valor gravado: o cast evita a conversao
+    linha a linha); sem, os niveis ficam vazios.
+    """
+    columns = [Vote.user_id, cast(Vote.vote_data, Text), Vote.option_id]
+    if with_levels:
+        columns.append(cast(User.level, String))
+    stmt = select(*columns).where(Vote.session_id == session_id)
+    if with_levels:
+        stmt = stmt.outerjoin(User, User.id == Vote.user_id)
+    stmt = stmt.order_by(Vote.id).execution_options(yield_per=BALLOT_FETCH_SIZE)
+    # Pela conexao: sem a camada de resultado do ORM, que dobrava o custo.
+    for chunk in db.connection().execute(stmt).partitions():
+        users, texts, options, *levels = zip(*chunk)
+        ballots = json.loads("[" + ",".join(text or "null" for text in texts) + "]")
+        yield users, ballots, options, levels[0] if levels else ()
+
+
+def _ballot_list(vote_data: Optional[Dict[str, Any]], option_id: Optional[int], key: str) -> List[int]:
+    ballot = ballot_data(vote_data, option_id)
+    items = ballot.get(key)
+    if items is None and ballot.get("option_id") is not None:
+        items = [ballot["option_id"]]
+    return items or []
+
+
+def _load_option_lists(
+    db: Session,
+    session_id: int,
+    key: str,
+    voters: Optional[List[int]],
+    levels: Optional[List[Optional[str]]],
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ids de opcao (ranking ou approved) de todas as cedulas, achatados:
+    (quantidade de ids por cedula, ids). Linhas compactas usam option_id.
+    """
+    lengths: List[np.ndarray] = []
+    flats: List[np.ndarray] = []
+    for users, ballots, options, chunk_levels in _iter_ballot_chunks(
+        db, session_id, levels is not None
+    ):
+        if voters is not None:
+            voters.extend(users)
+        if levels is not None:
+            levels.extend(chunk_levels)
+        lists = [_ballot_list(ballot, option_id, key) for ballot, option_id in zip(ballots, options)]
+        lengths.append(np.fromiter(map(len, lists), dtype=np.int64, count=len(lists)))
+        flats.append(np.fromiter(itertools.chain.from_iterable(lists), dtype=np.int64))
+    if not lengths:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(lengths), np.concatenate(flats)
+
+
+def _option_positions(
+    lengths: np.ndarray, flat: np.ndarray, option_ids: List[int]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (cedula, coluna, posicao da opcao) de cada id conhecido em `flat`; a
+    coluna conta so os ids validos de cada cedula.
+    """
+    rows = np.repeat(np.arange(lengths.size, dtype=np.int64), lengths)
+    if not option_ids:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+
+    order = np.argsort(option_ids)
+    sorted_ids = np.asarray(option_ids, dtype=np.int64)[order]
+    found = np.minimum(np.searchsorted(sorted_ids, flat), len(option_ids) - 1)
+    valid = sorted_ids[found] == flat
+
+    # Coluna = quantos ids validos vieram antes na mesma cedula. row_starts e
+    # indexado pelas linhas das entradas, entao cedulas vazias nunca sao lidas.
+    valid_before = np.cumsum(valid) - valid
+    row_starts = np.cumsum(lengths) - lengths
+    columns = valid_before - valid_before[row_starts[rows]]
+    return rows[valid], columns[valid], order[found[valid]]
+
+
+def load_ranked_ballots(
+    db: Session,
+    session_id: int,
+    option_ids: List[int],
+    voters: Optional[List[int]] = None,
+    levels: Optional[List[Optional[str]]] = None,
+) -> np.ndarray:
+    lengths, flat = _load_option_lists(db, session_id, "ranking", voters, levels)
+    width = max(len(option_ids), 1)
+    ranks = np.full((lengths.size, width), -1, dtype=np.int32)
+    rows, columns, positions = _option_positions(lengths, flat, option_ids)
+    inside = columns < width
+    ranks[rows[inside], columns[inside]] = positions[inside]
+    return ranks
+
+
+def load_approval_ballots(
+    db: Session,
+    session_id: int,
+    option_ids: List[int],
+    voters: Optional[List[int]] = None,
+    levels: Optional[List[Optional[str]]] = None,
+) -> np.ndarray:
+    lengths, flat = _load_option_lists(db, session_id, "approved", voters, levels)
+    approvals = np.zeros((lengths.size, len(option_ids)), dtype=bool)
+    rows, _, positions = _option_positions(lengths, flat, option_ids)
+    approvals[rows, positions] = True
+    return approvals
+
+
+def load_quadratic_ballots(
+    db: Session,
+    session_id: int,
+    option_ids: List[int],
+    voters: Optional[List[int]] = None,
+    levels: Optional[List[Optional[str]]] = None,
+) -> np.ndarray:
+    index = {option_id: position for position, option_id in enumerate(option_ids)}
+    ballot_rows: List[int] = []
+    ballot_cols: List[int] = []
+    ballot_votes: List[int] = []
+    total = 0
+    for users, ballots, _, chunk_levels in _iter_ballot_chunks(db, session_id, levels is not None):
+        if voters is not None:
+            voters.extend(users)
+        if levels is not None:
+            levels.extend(chunk_levels)
+        for row, ballot in enumerate(ballots, start=total):
+            for option_id, votes in ((ballot or {}).get("allocations") or {}).items():
+                option_id = int(option_id)
+                if option_id in index:
+                    ballot_rows.append(row)
+                    ballot_cols.append(index[option_id])
+                    ballot_votes.append(int(votes))
+        total += len(ballots)
+
+    allocations = np.zeros((total, len(option_ids)), dtype=np.int64)
+    allocations[ballot_rows, ballot_cols] = ballot_votes
+    return allocations
+
+
+def instant_runoff(
+    ranks: np.ndarray,
+    n_options: int,
+    weights: Optional[np.ndarray] = None,
+) -> Dict[str, Any]:
+    """
+    Segundo turno instantaneo (IRV). A cada rodada cada cedula conta para a
+    opcao mais bem ranqueada ainda ativa; a menos votada e eliminada ate que
+    alguem tenha maioria dos votos continuos.
+
+    Cada cedula guarda um ponteiro para a preferencia atual e so as cedulas da
+    opcao eliminada avancam, entao o custo total e O(cedulas x posicoes).
+    `choices` traz a opcao de cada cedula na ultima rodada (-1 se esgotada).
+    """
+    n_ballots, n_ranks = ranks.shape
+    if weights is None:
+        weights = np.ones(n_ballots, dtype=np.float64)
+    active = np.ones(n_options, dtype=bool)
+    position = np.zeros(n_ballots, dtype=np.int64)
+    top = ranks[:, 0].copy() if n_ranks else np.full(n_ballots, -1, dtype=np.int32)
+    history = np.zeros(n_options, dtype=np.float64)
+    rounds: List[Dict[str, Any]] = []
+
+    while True:
+        has_choice = top >= 0
+        counts = np.bincount(
+            top[has_choice], weights=weights[has_choice], minlength=n_options
+        )
+        active_idx = np.flatnonzero(active)
+        continuing = counts[active_idx].sum()
+        round_info: Dict[str, Any] = {
+            "round": len(rounds) + 1,
+            "counts": {int(i): float(counts[i]) for i in active_idx},
+            "exhausted": float(weights[~has_choice].sum()),
+            "eliminated": None,
+        }
+        rounds.append(round_info)
+
+        if not active_idx.size or continuing == 0:
+            return {"winner_index": None, "rounds": rounds, "choices": top}
+        leader = active_idx[np.argmax(counts[active_idx])]
+        if counts[leader] * 2 > continuing or active_idx.size == 1:
+            return {"winner_index": int(leader), "rounds": rounds, "choices": top}
+
+        # Empate na lanterna: sai quem somou menos nas rodadas anteriores,
+        # depois a opcao de maior ordem.
+        history += counts
+        tied = active_idx[counts[active_idx] == counts[active_idx].min()]
+        eliminated = tied[np.lexsort((-tied, history[tied]))[0]]
+        active[eliminated] = False
+        round_info["eliminated"] = int(eliminated)
+
+        moving = np.flatnonzero(top == eliminated)
+        while moving.size:
+            position[moving] += 1
+            exhausted = position[moving] >= n_ranks
+            candidate = np.where(
+                exhausted,
+                -1,
+                ranks[moving, np.minimum(position[moving], n_ranks - 1)],
+            )
+            top[moving] = candidate
+            moving = moving[(candidate >= 0) & ~active[np.maximum(candidate, 0)]]
+
+
+def approval_totals(approvals: np.ndarray, weights: Optional[np.ndarray] = None) -> np.ndarray:
+    if weights is None:
+        return approvals.sum(axis=0).astype(np.float64)
+    return weights @ approvals
+
+
+def quadratic_totals(
+    allocations: np.ndarray,
+    budget: int,
+    weights: Optional[np.ndarray] = None,
+) -> Dict[str, Any]:
+    """Valida o custo quadratico (soma de votos^2 <= orcamento) e soma os votos validos."""
+    costs = np.square(allocations).sum(axis=1)
+    valid = (costs <= budget) & (allocations >= 0).all(axis=1)
+    if weights is None:
+        weights = np.ones(allocations.shape[0], dtype=np.float64)
+    totals = weights[valid] @ allocations[valid] if valid.any() else np.zeros(allocations.shape[1])
+    return {
+        "totals": totals,
+        "valid_ballots": int(valid.sum()),
+        "invalid_ballots": int((~valid).sum()),
+    }
+
+
+def _winner_from_totals(totals: np.ndarray) -> Optional[int]:
+    if totals.size == 0 or totals.max() <= 0:
+        return None
+    best = np.flatnonzero(totals == totals.max())
+    return int(best[0]) if best.size == 1 else None
+
+
+def _ballot_weights(
+    db: Session,
+    session: VotingSession,
+    voters: List[int],
+    result: Dict[str, Any],
+) -> Optional[np.ndarray]:
+    """Pesos por cedula vindos das delegacoes (None quando nao ha delegacoes)."""
+    voter_weights = resolve_session_weights(db, session, voters)
+    if voter_weights is None:
+        return None
+    result["delegation"] = delegation_summary(voter_weights)
+    return np.array([voter_weights.get(user_id, 1) for user_id in voters], dtype=np.float64)
+
+
+def _level_breakdown(
+    levels: List[Optional[str]],
+    options: List[VotingOption],
+    totals_for: Callable[[np.ndarray], np.ndarray],
+) -> Dict[str, Dict[str, Any]]:
+    """
+    by_level do resultado: cedulas por nivel e os totais das opcoes com os
+    mesmos pesos da apuracao. totals_for recebe a mascara das cedulas do nivel,
+    entao a soma dos niveis e exatamente o total de cada opcao.
+    """
+    keys = [(option.value or option.title).lower() for option in options]
+    level_array = np.array(levels, dtype=object)
+    breakdown: Dict[str, Dict[str, Any]] = {}
+    for level in sorted({level for level in levels if level is not None}):
+        mask = level_array == level
+        level_totals = totals_for(mask)
+        breakdown[level] = {
+            "votes": int(mask.sum()),
+            "option_votes": {
+                key: float(level_totals[position])
+                for position, key in enumerate(keys)
+                if position < len(level_totals) and level_totals[position]
+            },
+        }
+    return breakdown
+
+
+def tally_session(db: Session, session: VotingSession) -> Dict[str, Any]:
+    """Apura uma sessao nao simples e retorna o resultado no formato de result_metadata."""
+    options = list(session.options)
+    option_ids = [option.id for option in options]
+    result: Dict[str, Any] = {"method": session.method.value}
+    voters: List[int] = []
+    levels: List[Optional[str]] = []
+
+    if session.method == VotingMethod.RANKED:
+        ranks = load_ranked_ballots(db, session.id, option_ids, voters, levels)
+        weights = _ballot_weights(db, session, voters, result)
+        outcome = instant_runoff(ranks, len(option_ids), weights)
+        winner_index = outcome["winner_index"]
+        result["rounds"] = [
+            {
+                "round": item["round"],
+                "counts": {option_ids[i]: votes for i, votes in item["counts"].items()},
+                "exhausted": item["exhausted"],
+                "eliminated_option_id": (
+                    option_ids[item["eliminated"]] if item["eliminated"] is not None else None
+                ),
+            }
+            for item in outcome["rounds"]
+        ]
+        final_counts = outcome["rounds"][-1]["counts"] if outcome["rounds"] else {}
+        totals = np.array([final_counts.get(i, 0.0) for i in range(len(option_ids))])
+        total_ballots = ranks.shape[0]
+        choices = outcome["choices"]
+        ballot_weights = weights if weights is not None else np.ones(total_ballots)
+
+        def totals_for(mask: np.ndarray) -> np.ndarray:
+            counted = mask & (choices >= 0)
+            return np.bincount(
+                choices[counted], weights=ballot_weights[counted], minlength=len(option_ids)
+            )
+
+    elif session.method == VotingMethod.APPROVAL:
+        approvals = load_approval_ballots(db, session.id, option_ids, voters, levels)
+        weights = _ballot_weights(db, session, voters, result)
+        totals = approval_totals(approvals, weights)
+        winner_index = _winner_from_totals(totals)
+        total_ballots = approvals.shape[0]
+
+        def totals_for(mask: np.ndarray) -> np.ndarray:
+            return approval_totals(approvals[mask], weights[mask] if weights is not None else None)
+
+    elif session.method == VotingMethod.QUADRATIC:
+        allocations = load_quadratic_ballots(db, session.id, option_ids, voters, levels)
+        weights = _ballot_weights(db, session, voters, result)
+        outcome = quadratic_totals(allocations, settings.QUADRATIC_VOICE_CREDITS, weights)
+        totals = outcome["totals"]
+        winner_index = _winner_from_totals(totals)
+        total_ballots = allocations.shape[0]
+        result["valid_ballots"] = outcome["valid_ballots"]
+        result["invalid_ballots"] = outcome["invalid_ballots"]
+        result["voice_credits"] = settings.QUADRATIC_VOICE_CREDITS
+
+        def totals_for(mask: np.ndarray) -> np.ndarray:
+            return quadratic_totals(
+                allocations[mask],
+                settings.QUADRATIC_VOICE_CREDITS,
+                weights[mask] if weights is not None else None,
+            )["totals"]
+    else:
+        raise ValueError(f"Unsupported voting method for tally engine: {session.method}")
+
+    result["total_votes"] = int(total_ballots)
+    result["options"] = [
+        {
+            "option_id": option.id,
+            "value": option.value,
+            "title": option.title,
+            "votes": float(totals[position]) if position < len(totals) else 0.0,
+        }
+        for position, option in enumerate(options)
+    ]
+    result["winner_option_id"] = option_ids[winner_index] if winner_index is not None else None
+    result["tie"] = winner_index is None and total_ballots > 0
+    result["by_level"] = _level_breakdown(levels, options, totals_for)
+    return result
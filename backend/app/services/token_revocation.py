@@ -0,0 +1,155 @@
+"""
+Revogacao de tokens JWT por jti (logout no servidor).
+
+A tabela revoked_tokens e a fonte da verdade. Cada worker espelha os jti
+revogados em um filtro de Bloom: o caso comum (token nao revogado) custa uma
+sonda em memoria e so os acertos do filtro consultam o banco, que descarta os
+falsos positivos. O filtro e alimentado pelas linhas com revoked_at recente a
+cada TOKEN_REVOCATION_SYNC_SECONDS, relendo uma janela de sobreposicao porque
+reinserir um jti nao muda o filtro; revogacoes feitas neste processo entram na
+hora. Quando os itens passam da capacidade, o filtro e reconstruido apenas com
+os tokens ainda nao expirados.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import dialect_insert
+from app.core.logging import get_logger
+from app.models.token import RevokedToken
+
+logger = get_logger("token_revocation")
+
+# Linhas commitadas fora de ordem (transacoes longas) ainda entram na proxima leitura.
+_FEED_OVERLAP = timedelta(minutes=5)
+
+
+class BloomFilter:
+    """Filtro de Bloom sobre bytearray, dimensionado pela capacidade e taxa de falso positivo."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(1, capacity)
+        self.num_bits = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, key: str) -> Iterator[int]:
+        # Hash duplo (Kirsch-Mitzenmacher) sobre um unico blake2b de 128 bits.
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str) -> None:
+        added = False
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            if not self._bits[position >> 3] & mask:
+                self._bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class TokenRevocationList:
+    def __init__(self, sync_seconds: float, capacity: int, error_rate: float):
+        self._sync_seconds = sync_seconds
+        self._capacity = capacity
+        self._error_rate = error_rate
+        self._filter: Optional[BloomFilter] = None
+        self._synced_at: Optional[datetime] = None
+        self._next_sync = 0.0
+        self._lock = threading.Lock()
+
+    def is_revoked(self, db: Session, jti: Optional[str]) -> bool:
+        """Tokens sem jti (emitidos antes da revogacao existir) nunca constam como revogados."""
+        if not jti:
+            return False
+        if time.monotonic() >= self._next_sync:
+            self.sync(db)
+        bloom = self._filter
+        if bloom is not None and jti not in bloom:
+            return False
+        return db.query(RevokedToken.id).filter(RevokedToken.jti == jti).first() is not None
+
+    def revoke(self, db: Session, payload: Dict[str, Any]) -> bool:
+        """
+        Registra a revogacao de um token ja validado (o commit fica com o
+        chamador). Retorna False se o token nao tem jti.
+        """
+        jti = payload.get("jti")
+        if not jti:
+            return False
+        # Logouts concorrentes do mesmo token: a segunda insercao vira no-op.
+        db.execute(
+            dialect_insert(db, RevokedToken.__table__)
+            .values(
+                jti=jti,
+                user_id=int(payload["sub"]) if payload.get("sub") else None,
+                token_type=payload.get("type") or "access",
+                expires_at=datetime.utcfromtimestamp(payload["exp"]),
+                revoked_at=datetime.utcnow(),
+            )
+            .on_conflict_do_nothing(index_elements=["jti"])
+        )
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(jti)
+        return True
+
+    def sync(self, db: Session) -> None:
+        with self._lock:
+            if time.monotonic() < self._next_sync:
+                return
+            now = datetime.utcnow()
+            bloom = self._filter
+            if bloom is None or self._synced_at is None or bloom.count > bloom.capacity:
+                self._filter = self._rebuild(db, now)
+            else:
+                for (jti,) in db.query(RevokedToken.jti).filter(
+                    RevokedToken.revoked_at >= self._synced_at - _FEED_OVERLAP
+                ):
+                    bloom.add(jti)
+            self._synced_at = now
+            self._next_sync = time.monotonic() + self._sync_seconds
+
+    def _rebuild(self, db: Session, now: datetime) -> BloomFilter:
+        jtis = [
+            jti
+            for (jti,) in db.query(RevokedToken.jti).filter(RevokedToken.expires_at > now)
+        ]
+        bloom = BloomFilter(max(self._capacity, 2 * len(jtis)), self._error_rate)
+        for jti in jtis:
+            bloom.add(jti)
+        logger.info(
+            "Revocation filter rebuilt: %s tokens, %s bits, %s hashes",
+            len(jtis),
+            bloom.num_bits,
+            bloom.num_hashes,
+        )
+        return bloom
+
+    def clear(self) -> None:
+        with self._lock:
+            self._filter = None
+            self._synced_at = None
+            self._next_sync = 0.0
+
+
+token_revocation = TokenRevocationList(
+    settings.TOKEN_REVOCATION_SYNC_SECONDS,
+    capacity=settings.TOKEN_REVOCATION_FILTER_CAPACITY,
+    error_rate=settings.TOKEN_REVOCATION_FILTER_ERROR_RATE,
+)
@@ -0,0 +1,203 @@
+"""
+Serie temporal de comparecimento por sessao de votacao.
+
+Com VOTE_TURNOUT_BUCKETS_ENABLED, cada voto aceito incrementa um bucket
+(sessao, minuto, nivel do eleitor, parcela) na mesma transacao do voto; o lote
+agrega antes de gravar, entao um flush de 500 votos no mesmo minuto vira
+poucos upserts, e com COUNTER_SHARDS > 1 votos concorrentes do mesmo minuto
+caem em linhas diferentes. Desligado (padrao), o voto nao escreve nada aqui e
+a serie sai de um GROUP BY em votes na leitura. Buckets por hora sao somados
+na leitura a partir dos de minuto. rebuild_turnout_buckets recalcula tudo a
+partir de votes (backfill ou conferencia).
+"""
+
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import dialect_insert
+from app.core.logging import get_logger
+from app.models.turnout import VoteTurnoutBucket
+from app.models.user import UserLevel
+from app.models.vote import Vote, VotingSession
+from app.services.counters import pick_shard
+
+logger = get_logger("services.turnout")
+
+TURNOUT_GRANULARITIES = ("minute", "hour")
+
+
+def bucket_start(moment: datetime, granularity: str = "minute") -> datetime:
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(second=0, microsecond=0)
+
+
+def increment_turnout_buckets(
+    db: Session,
+    deltas: Dict[Tuple[int, datetime, UserLevel], int],
+) -> None:
+    """Upsert de {(session_id, minuto, nivel): votos}, em ordem fixa de chaves."""
+    table = VoteTurnoutBucket.__table__
+    now = datetime.utcnow()
+    for (session_id, start, level), delta in sorted(
+        deltas.items(), key=lambda item: (item[0][0], item[0][1], item[0][2].value)
+    ):
+        stmt = dialect_insert(db, table).values(
+            session_id=session_id,
+            bucket_start=start,
+            user_level=level,
+            shard=pick_shard(),
+            votes_count=delta,
+            updated_at=now,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["session_id", "bucket_start", "user_level", "shard"],
+            set_={
+                "votes_count": table.c.votes_count + stmt.excluded.votes_count,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        db.execute(stmt)
+
+
+def _minute_expression(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        return func.date_trunc("minute", Vote.voted_at)
+    return func.strftime("%Y-%m-%d %H:%M:00", Vote.voted_at)
+
+
+def _count_votes_by_minute(
+    db: Session, session_ids: List[int]
+) -> List[Tuple[int, datetime, UserLevel, int]]:
+    """
+    (session_id, minuto, nivel, votos) agregados direto de votes, pelo nivel
+    gravado no voto (o do eleitor quando votou, nao o atual).
+    """
+    minute = _minute_expression(db)
+    rows = (
+        db.query(Vote.session_id, minute, Vote.user_level, func.count(Vote.id))
+        .filter(Vote.session_id.in_(session_ids))
+        .group_by(Vote.session_id, minute, Vote.user_level)
+        .all()
+    )
+    counts: Counter = Counter()
+    for session_id, start, level, votes_count in rows:
+        start = datetime.fromisoformat(start) if isinstance(start, str) else start
+        counts[(session_id, start, level or UserLevel.REGISTERED)] += votes_count
+    return [
+        (session_id, start, level, votes_count)
+        for (session_id, start, level), votes_count in counts.items()
+    ]
+
+
+def rebuild_turnout_buckets(
+    db: Session,
+    session_ids: Optional[Iterable[int]] = None,
+) -> int:
+    """
+    Recalcula os buckets das sessoes a partir de votes, com um GROUP BY por
+    minuto e nivel do voto. Nao faz commit; retorna a quantidade de buckets gravados.
+    """
+    # Sessoes arquivadas nao tem mais votos em votes; os buckets ficam como estao.
+    query = db.query(VotingSession.id).filter(VotingSession.archived_at.is_(None))
+    if session_ids is not None:
+        query = query.filter(VotingSession.id.in_(list(session_ids)))
+    session_ids = [session_id for (session_id,) in query]
+    if not session_ids:
+        return 0
+
+    rows = _count_votes_by_minute(db, session_ids)
+
+    db.query(VoteTurnoutBucket).filter(
+        VoteTurnoutBucket.session_id.in_(session_ids)
+    ).delete(synchronize_session=False)
+
+    now = datetime.utcnow()
+    db.add_all(
+        VoteTurnoutBucket(
+            session_id=session_id,
+            bucket_start=start,
+            user_level=level,
+            votes_count=votes_count,
+            updated_at=now,
+        )
+        for session_id, start, level, votes_count in rows
+    )
+    db.flush()
+    logger.info(
+        "Rebuilt %s turnout buckets for %s voting sessions", len(rows), len(session_ids)
+    )
+    return len(rows)
+
+
+def get_turnout_series(
+    db: Session,
+    session: VotingSession,
+    granularity: str = "minute",
+) -> Dict:
+    """
+    Serie ordenada de buckets com votos do intervalo, total acumulado e quebra
+    por nivel, dos buckets ou, com eles desligados, direto de votes. O
+    percentual de comparecimento usa o eleitorado congelado na abertura,
+    quando existe.
+    """
+    if granularity not in TURNOUT_GRANULARITIES:
+        raise ValueError(f"Unsupported granularity: {granularity}")
+
+    if settings.VOTE_TURNOUT_BUCKETS_ENABLED or session.archived_at is not None:
+        # Sessoes arquivadas nao tem mais votos em votes; valem os buckets gravados.
+        rows = (
+            db.query(
+                VoteTurnoutBucket.bucket_start,
+                VoteTurnoutBucket.user_level,
+                VoteTurnoutBucket.votes_count,
+            )
+            .filter(VoteTurnoutBucket.session_id == session.id)
+            .all()
+        )
+    else:
+        rows = [
+            (start, level, votes_count)
+            for _, start, level, votes_count in _count_votes_by_minute(db, [session.id])
+        ]
+
+    grouped: Dict[datetime, Counter] = {}
+    for start, level, votes_count in rows:
+        key = bucket_start(start, granularity)
+        grouped.setdefault(key, Counter())[level.name] += votes_count
+
+    eligible = session.eligible_voters_count
+    buckets: List[Dict] = []
+    cumulative = 0
+    cumulative_by_level: Counter = Counter()
+    for start in sorted(grouped):
+        by_level = grouped[start]
+        votes = sum(by_level.values())
+        cumulative += votes
+        cumulative_by_level.update(by_level)
+        buckets.append(
+            {
+                "bucket_start": start,
+                "votes": votes,
+                "cumulative_votes": cumulative,
+                "by_level": dict(by_level),
+                "turnout_percentage": (
+                    round(cumulative * 100 / eligible, 2) if eligible else None
+                ),
+            }
+        )
+
+    return {
+        "session_id": session.id,
+        "granularity": granularity,
+        "total_votes": cumulative,
+        "eligible_voters": eligible,
+        "turnout_percentage": round(cumulative * 100 / eligible, 2) if eligible else None,
+        "by_level": dict(cumulative_by_level),
+        "buckets": buckets,
+    }
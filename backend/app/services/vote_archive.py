@@ -0,0 +1,192 @@
+"""
+Arquivamento dos votos de sessoes encerradas.
+
+Votos de sessoes concluidas ou canceladas sao imutaveis, mas continuam
+inflando a tabela votes e os indices usados no caminho do voto. O arquivamento
+move os votos, em lotes, para vote_archive_batches como NDJSON comprimido
+(zlib), com sha256 do conteudo, e vote_archive_voters guarda em qual lote
+esta o voto de cada eleitor. Cada lote e gravado e apagado de votes na mesma
+transacao, entao o processo pode ser interrompido e retomado sem duplicar nem
+perder cedulas. O resultado, a raiz Merkle, os nos da arvore e os buckets de
+comparecimento permanecem, e os votos arquivados continuam saindo na
+exportacao.
+"""
+
+import hashlib
+import json
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
+
+from app.core.logging import get_logger
+from app.models.vote import Vote, VoteArchiveBatch, VoteArchiveVoter, VotingSession, VotingStatus
+from app.services.turnout import rebuild_turnout_buckets
+
+logger = get_logger("services.vote_archive")
+
+ARCHIVE_CHUNK_SIZE = 5000
+FINALIZED_STATUSES = (VotingStatus.COMPLETED, VotingStatus.CANCELLED)
+
+
+def archive_row(vote: Vote) -> Dict[str, Any]:
+    """Linha arquivada no formato da exportacao, para votos legados ou compactos."""
+    return {
+        "id": vote.id,
+        "session_id": vote.session_id,
+        "proposal_id": vote.proposal_id,
+        "user_id": vote.user_id,
+        "option_id": vote.option_id,
+        "choice": vote.selected_value,
+        "vote_data": vote.ballot,
+        "vote_hash": vote.receipt,
+        "ip_address": vote.ip_address,
+        "user_agent": vote.user_agent,
+        "voted_at": vote.voted_at.isoformat() if vote.voted_at else None,
+    }
+
+
+def encode_batch(rows: List[Dict[str, Any]]) -> Tuple[bytes, str]:
+    data = "".join(
+        json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n" for row in rows
+    ).encode("utf-8")
+    return zlib.compress(data, 9), hashlib.sha256(data).hexdigest()
+
+
+def decode_batch(batch: VoteArchiveBatch) -> List[Dict[str, Any]]:
+    data = zlib.decompress(batch.payload)
+    if hashlib.sha256(data).hexdigest() != batch.checksum:
+        raise ValueError(f"Checksum mismatch in vote archive batch {batch.id}")
+    return [json.loads(line) for line in data.decode("utf-8").splitlines()]
+
+
+def archivable_session_ids(db: Session, older_than_days: int) -> List[int]:
+    """Sessoes encerradas ha mais de N dias e ainda nao arquivadas."""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    closed_at = func.coalesce(VotingSession.result_calculated_at, VotingSession.ends_at)
+    return [
+        session_id
+        for (session_id,) in db.query(VotingSession.id)
+        .filter(
+            VotingSession.status.in_(FINALIZED_STATUSES),
+            VotingSession.archived_at.is_(None),
+            closed_at < cutoff,
+        )
+        .order_by(VotingSession.id)
+    ]
+
+
+def archive_next_chunk(
+    db: Session,
+    session_id: int,
+    chunk_size: int = ARCHIVE_CHUNK_SIZE,
+) -> int:
+    """
+    Move o proximo lote de votos da sessao para o arquivo, sem commit.
+
+    Retorna quantos votos foram movidos; 0 indica que a sessao terminou de ser
+    arquivada (archived_at e preenchido nessa chamada).
+    """
+    session = (
+        db.query(VotingSession).filter(VotingSession.id == session_id).with_for_update().first()
+    )
+    if session is None:
+        raise ValueError(f"Voting session {session_id} not found")
+    if session.archived_at is not None:
+        return 0
+    if session.status not in FINALIZED_STATUSES:
+        raise ValueError(f"Voting session {session_id} is not closed")
+    if session.status == VotingStatus.COMPLETED and session.result_metadata is None:
+        raise ValueError(f"Voting session {session_id} has no stored result")
+
+    first_chunk = (
+        db.query(VoteArchiveBatch.id).filter(VoteArchiveBatch.session_id == session_id).first()
+        is None
+    )
+    if first_chunk:
+        # A serie de comparecimento de sessoes arquivadas sai dos buckets;
+        # congela-os a partir de votes antes de o primeiro lote sair de la.
+        rebuild_turnout_buckets(db, [session_id])
+
+    votes = (
+        db.query(Vote)
+        .options(joinedload(Vote.option))
+        .filter(Vote.session_id == session_id)
+        .order_by(Vote.id)
+        .limit(chunk_size)
+        .all()
+    )
+    if not votes:
+        session.archived_at = datetime.utcnow()
+        db.add(session)
+        db.flush()
+        logger.info("Voting session %s archived", session_id)
+        return 0
+
+    payload, checksum = encode_batch([archive_row(vote) for vote in votes])
+    voted_at = [vote.voted_at for vote in votes if vote.voted_at is not None]
+    batch = VoteArchiveBatch(
+        session_id=session_id,
+        proposal_id=session.proposal_id,
+        first_vote_id=votes[0].id,
+        last_vote_id=votes[-1].id,
+        votes_count=len(votes),
+        first_voted_at=min(voted_at) if voted_at else None,
+        last_voted_at=max(voted_at) if voted_at else None,
+        payload=payload,
+        checksum=checksum,
+    )
+    db.add(batch)
+    db.flush()
+    db.bulk_insert_mappings(
+        VoteArchiveVoter,
+        [{"session_id": session_id, "user_id": vote.user_id, "batch_id": batch.id} for vote in votes],
+    )
+    db.query(Vote).filter(
+        Vote.session_id == session_id,
+        Vote.id.between(votes[0].id, votes[-1].id),
+    ).delete(synchronize_session=False)
+    db.flush()
+    return len(votes)
+
+
+def iter_archived_votes(
+    db: Session,
+    session_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Linhas arquivadas, lote a lote, com os mesmos filtros da exportacao."""
+    query = db.query(VoteArchiveBatch)
+    if session_id is not None:
+        query = query.filter(VoteArchiveBatch.session_id == session_id)
+    if since is not None:
+        query = query.filter(VoteArchiveBatch.last_voted_at >= since)
+    if until is not None:
+        query = query.filter(VoteArchiveBatch.first_voted_at < until)
+
+    batches = query.order_by(VoteArchiveBatch.session_id, VoteArchiveBatch.first_vote_id)
+    for batch in batches.yield_per(10):
+        for row in decode_batch(batch):
+            if since is not None or until is not None:
+                voted_at = datetime.fromisoformat(row["voted_at"])
+                if since is not None and voted_at < since:
+                    continue
+                if until is not None and voted_at >= until:
+                    continue
+            yield row
+
+
+def find_archived_vote(db: Session, session_id: int, user_id: int) -> Optional[Dict[str, Any]]:
+    """Voto arquivado do usuario na sessao; descomprime so o lote que o contem."""
+    batch = (
+        db.query(VoteArchiveBatch)
+        .join(VoteArchiveVoter, VoteArchiveVoter.batch_id == VoteArchiveBatch.id)
+        .filter(VoteArchiveVoter.session_id == session_id, VoteArchiveVoter.user_id == user_id)
+        .first()
+    )
+    if batch is None:
+        return None
+    return next((row for row in decode_batch(batch) if row["user_id"] == user_id), None)
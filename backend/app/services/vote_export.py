@@ -0,0 +1,175 @@
+"""
+Exportacao em streaming das cedulas de sessoes encerradas (NDJSON ou CSV).
+
+As linhas saem de um cursor do servidor (stream_results + yield_per), entao a
+memoria fica constante mesmo em sessoes com milhoes de votos. O corpo e
+resumido em sha256 enquanto e gerado e a ultima linha traz o checksum e o
+numero de cedulas, para que o auditor confira o arquivo recebido. Votos ja
+arquivados (app.services.vote_archive) saem depois dos da tabela votes.
+"""
+
+import csv
+import hashlib
+import io
+import itertools
+import json
+import zlib
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+from sqlalchemy.orm import Session, joinedload
+
+from app.models.vote import Vote, VotingSession
+from app.services.vote_archive import FINALIZED_STATUSES, iter_archived_votes
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_FETCH_SIZE = 5000
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+def export_columns(include_voters: bool) -> List[str]:
+    columns = ["id", "session_id", "proposal_id", "choice", "vote_data", "vote_hash", "voted_at"]
+    if include_voters:
+        columns.insert(3, "user_id")
+    return columns
+
+
+def iter_votes(
+    db: Session,
+    session_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Iterator[Vote]:
+    """Votos de sessoes encerradas, em ordem de id, lidos em lotes por cursor do servidor."""
+    query = (
+        db.query(Vote)
+        .join(VotingSession, VotingSession.id == Vote.session_id)
+        .filter(VotingSession.status.in_(FINALIZED_STATUSES))
+    )
+    if session_id is not None:
+        query = query.filter(Vote.session_id == session_id)
+    if since is not None:
+        query = query.filter(Vote.voted_at >= since)
+    if until is not None:
+        query = query.filter(Vote.voted_at < until)
+    return (
+        query.options(joinedload(Vote.option))
+        .order_by(Vote.id)
+        .execution_options(stream_results=True)
+        .yield_per(EXPORT_FETCH_SIZE)
+    )
+
+
+# Colunas lidas pelas propriedades de Vote, que valem para linhas legadas e compactas.
+_COLUMN_READERS = {"choice": "selected_value", "vote_data": "ballot", "vote_hash": "receipt"}
+
+
+def _row(vote: Union[Vote, Dict[str, Any]], columns: List[str]) -> Dict[str, Any]:
+    if isinstance(vote, dict):
+        # Linha arquivada: ja esta no formato da exportacao.
+        return {column: vote.get(column) for column in columns}
+    row = {column: getattr(vote, _COLUMN_READERS.get(column, column)) for column in columns}
+    if row.get("voted_at") is not None:
+        row["voted_at"] = row["voted_at"].isoformat()
+    return row
+
+
+def _ndjson_lines(votes: Iterable[Vote], columns: List[str]) -> Iterator[str]:
+    for vote in votes:
+        yield json.dumps(_row(vote, columns), ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def _csv_lines(votes: Iterable[Vote], columns: List[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    for vote in votes:
+        row = _row(vote, columns)
+        if "vote_data" in row:
+            row["vote_data"] = json.dumps(row["vote_data"], ensure_ascii=False, separators=(",", ":"))
+        writer.writerow([row[column] for column in columns])
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _checksum_line(fmt: str, digest: str, rows: int) -> str:
+    if fmt == "csv":
+        return f"# sha256={digest} rows={rows}\n"
+    return json.dumps({"checksum": {"algorithm": "sha256", "value": digest, "rows": rows}}) + "\n"
+
+
+def stream_votes_export(
+    votes: Iterable[Vote],
+    fmt: str = "ndjson",
+    include_voters: bool = False,
+) -> Iterator[bytes]:
+    """
+    Serializa as cedulas em blocos de ~64 KiB. O checksum cobre todos os bytes
+    anteriores a linha final (sem compressao).
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    columns = export_columns(include_voters)
+    digest = hashlib.sha256()
+    rows = 0
+
+    def _counted(items: Iterable[Vote]) -> Iterator[Vote]:
+        nonlocal rows
+        for item in items:
+            rows += 1
+            yield item
+
+    lines = _csv_lines if fmt == "csv" else _ndjson_lines
+    pending: List[bytes] = []
+    pending_size = 0
+    for text in lines(_counted(votes), columns):
+        data = text.encode("utf-8")
+        digest.update(data)
+        pending.append(data)
+        pending_size += len(data)
+        if pending_size >= EXPORT_CHUNK_BYTES:
+            yield b"".join(pending)
+            pending, pending_size = [], 0
+
+    pending.append(_checksum_line(fmt, digest.hexdigest(), rows).encode("utf-8"))
+    yield b"".join(pending)
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = container gzip
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_votes(
+    session_factory: Callable[[], Session],
+    fmt: str = "ndjson",
+    session_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    include_voters: bool = False,
+    compress: bool = False,
+) -> Iterator[bytes]:
+    """Gera o arquivo de exportacao com uma sessao de banco propria, fechada ao final."""
+    db = session_factory()
+    try:
+        votes = itertools.chain(
+            iter_votes(db, session_id=session_id, since=since, until=until),
+            iter_archived_votes(db, session_id=session_id, since=since, until=until),
+        )
+        chunks = stream_votes_export(
+            votes,
+            fmt=fmt,
+            include_voters=include_voters,
+        )
+        if compress:
+            chunks = gzip_stream(chunks)
+        yield from chunks
+    finally:
+        db.close()
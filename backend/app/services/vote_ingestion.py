@@ -0,0 +1,540 @@
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import literal_column, null
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal, dialect_insert
+from app.core.logging import get_logger
+from app.models.proposal import Proposal
+from app.models.user import UserLevel
+from app.models.vote import Vote, VotingSession
+from app.services.counters import counter_expression, increment_counter, read_counters
+from app.services.merkle import append_leaves
+from app.services.tally import increment_option_tally
+from app.services.turnout import bucket_start, increment_turnout_buckets
+from app.services.vote_storage import compact_storage_enabled, compact_vote_data
+
+logger = get_logger("services.vote_ingestion")
+
+
+class DuplicateVoteError(Exception):
+    """O eleitor ja possui voto registrado na sessao (uq_session_user_vote)."""
+
+
+class PendingVote:
+    """Cedula ja validada, pronta para gravacao (direta ou em lote)."""
+
+    __slots__ = (
+        "session_id",
+        "proposal_id",
+        "user_id",
+        "option_id",
+        "choice",
+        "vote_data",
+        "vote_hash",
+        "voted_at",
+        "option_weights",
+        "user_level",
+        "future",
+    )
+
+    def __init__(
+        self,
+        session_id: int,
+        proposal_id: int,
+        user_id: int,
+        option_id: int,
+        choice: str,
+        vote_data: Dict[str, Any],
+        vote_hash: str,
+        option_weights: Optional[Dict[int, int]] = None,
+        user_level: Optional[UserLevel] = None,
+    ):
+        self.session_id = session_id
+        self.proposal_id = proposal_id
+        self.user_id = user_id
+        self.option_id = option_id
+        self.choice = choice
+        self.vote_data = vote_data
+        self.vote_hash = vote_hash
+        self.voted_at = datetime.utcnow()
+        # Peso de cada opcao nos contadores (aprovacao/quadratico marcam varias).
+        self.option_weights = option_weights or {option_id: 1}
+        self.user_level = user_level
+        self.future: Future = Future()
+
+    def as_row(self) -> Dict[str, Any]:
+        if compact_storage_enabled():
+            return {
+                "session_id": self.session_id,
+                "proposal_id": self.proposal_id,
+                "user_id": self.user_id,
+                "option_id": self.option_id,
+                "vote_data": compact_vote_data(self.vote_data),
+                "vote_digest": bytes.fromhex(self.vote_hash),
+                "voted_at": self.voted_at,
+                "user_level": self.user_level,
+            }
+        return {
+            "session_id": self.session_id,
+            "proposal_id": self.proposal_id,
+            "user_id": self.user_id,
+            "choice": self.choice,
+            "vote_data": self.vote_data,
+            "vote_hash": self.vote_hash,
+            "voted_at": self.voted_at,
+            "user_level": self.user_level,
+        }
+
+
+class _QueuedWriter:
+    """
+    Thread que drena uma fila em lotes: espera o primeiro item e junta o que
+    chegar ate o fim do intervalo (ou ate max_batch_size) antes de gravar.
+    """
+
+    thread_name = "queued-writer"
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        flush_interval_ms: int = 5,
+        max_batch_size: int = 500,
+    ):
+        self._session_factory = session_factory
+        self._flush_interval = flush_interval_ms / 1000
+        self._max_batch_size = max_batch_size
+        self._queue: "queue.Queue[Optional[PendingVote]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name=self.thread_name, daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Interrompe a fila depois de gravar o que ja foi aceito."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def _enqueue(self, pending: PendingVote) -> None:
+        self.start()
+        self._queue.put(pending)
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+
+            batch = [first]
+            deadline = time.monotonic() + self._flush_interval
+            stopping = False
+            while len(batch) < self._max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._flush(batch)
+            if stopping:
+                return
+
+    def _flush(self, batch: List[PendingVote]) -> None:
+        raise NotImplementedError
+
+
+class VoteBatcher(_QueuedWriter):
+    """
+    Fila em processo que grava votos em lotes (write-behind).
+
+    Cada lote vira um INSERT ... ON CONFLICT DO NOTHING RETURNING, seguido de um
+    unico incremento de contador por sessao/proposta/opcao e um commit; as
+    folhas Merkle do lote entram logo depois, em transacao curta propria. Se o
+    lote falhar, os votos sao regravados um a um, e so os que falharem de novo
+    recebem o erro. O chamador recebe um Future resolvido com o recibo
+    definitivo ou com DuplicateVoteError quando a constraint
+    uq_session_user_vote rejeita o voto.
+    """
+
+    thread_name = "vote-batcher"
+
+    def submit(self, pending: PendingVote) -> Future:
+        self._enqueue(pending)
+        return pending.future
+
+    def _flush(self, batch: List[PendingVote]) -> None:
+        # Cliques duplos dentro do mesmo lote: o primeiro vence.
+        unique: Dict[tuple, PendingVote] = {}
+        duplicates: List[PendingVote] = []
+        for pending in batch:
+            key = (pending.session_id, pending.user_id)
+            if key in unique:
+                duplicates.append(pending)
+            else:
+                unique[key] = pending
+
+        try:
+            db = self._session_factory()
+        except Exception as exc:
+            logger.error("Vote batch flush failed (%s votes): %s", len(batch), exc)
+            for pending in batch:
+                pending.future.set_exception(exc)
+            return
+
+        failed: Dict[tuple, Exception] = {}
+        try:
+            try:
+                receipts = record_votes(db, list(unique.values()))
+                db.commit()
+            except Exception as exc:
+                # Uma linha ruim nao derruba o lote: refaz voto a voto.
+                db.rollback()
+                logger.warning(
+                    "Vote batch flush failed (%s votes), retrying one by one: %s",
+                    len(unique),
+                    exc,
+                )
+                receipts, failed = _record_one_by_one(db, list(unique.values()))
+            append_committed_leaves(db, list(unique.values()), receipts)
+        finally:
+            db.close()
+
+        for key, pending in unique.items():
+            if key in failed:
+                pending.future.set_exception(failed[key])
+            elif key in receipts:
+                pending.future.set_result(receipts[key])
+            else:
+                duplicates.append(pending)
+        for pending in duplicates:
+            pending.future.set_exception(DuplicateVoteError())
+
+        logger.info(
+            "Vote batch flushed: %s accepted, %s duplicates, %s failed",
+            len(batch) - len(duplicates) - len(failed),
+            len(duplicates),
+            len(failed),
+        )
+
+
+def _record_one_by_one(
+    db: Session, pending_votes: List[PendingVote]
+) -> Tuple[Dict[tuple, Dict[str, Any]], Dict[tuple, Exception]]:
+    """Grava cada voto em transacao propria; retorna (recibos, falhas por chave)."""
+    receipts: Dict[tuple, Dict[str, Any]] = {}
+    failed: Dict[tuple, Exception] = {}
+    for pending in pending_votes:
+        key = (pending.session_id, pending.user_id)
+        try:
+            receipts.update(record_votes(db, [pending]))
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            logger.error("Vote for session %s failed: %s", pending.session_id, exc)
+            failed[key] = exc
+    return receipts, failed
+
+
+def record_votes(
+    db: Session,
+    pending_votes: List[PendingVote],
+    apply_counters: bool = True,
+) -> Dict[tuple, Dict[str, Any]]:
+    """
+    Grava cedulas validadas e, com apply_counters, aplica os contadores, sem commit.
+
+    Retorna recibos {(session_id, user_id): {...}} apenas para os votos aceitos;
+    os ausentes foram rejeitados por uq_session_user_vote. As folhas Merkle
+    ficam para depois do commit (append_committed_leaves ou defer_vote_writes).
+
+    Sem apply_counters (caminho da requisicao) a gravacao e um unico INSERT:
+    contadores e folhas ficam para defer_vote_writes depois do commit, e o
+    total_votes do recibo e o contador lido no proprio RETURNING mais os votos
+    deste INSERT, sem os que ainda estao na fila do DeferredVoteWriter.
+    """
+    inserted = insert_votes(
+        db,
+        [pending.as_row() for pending in pending_votes],
+        with_session_total=not apply_counters,
+    )
+    accepted = [
+        pending
+        for pending in pending_votes
+        if (pending.session_id, pending.user_id) in inserted
+    ]
+    if apply_counters:
+        totals = apply_vote_counters(db, accepted)
+    else:
+        per_session = Counter(pending.session_id for pending in accepted)
+        totals = {
+            pending.session_id: inserted[(pending.session_id, pending.user_id)][2]
+            + per_session[pending.session_id]
+            for pending in accepted
+        }
+
+    receipts: Dict[tuple, Dict[str, Any]] = {}
+    for pending in accepted:
+        key = (pending.session_id, pending.user_id)
+        vote_id, voted_at, _ = inserted[key]
+        receipts[key] = {
+            "vote_id": vote_id,
+            "voted_at": voted_at,
+            "total_votes": totals[pending.session_id],
+            "receipt": pending.vote_hash,
+            # Preenchido por append_committed_leaves no modo em lote; no caminho
+            # da requisicao a folha entra depois (DeferredVoteWriter).
+            "merkle_leaf_index": None,
+        }
+    return receipts
+
+
+def insert_votes(
+    db: Session,
+    rows: List[Dict[str, Any]],
+    with_session_total: bool = False,
+) -> Dict[tuple, tuple]:
+    """
+    Insere votos ignorando conflitos em uq_session_user_vote.
+
+    Retorna {(session_id, user_id): (vote_id, voted_at, total)} apenas dos votos
+    gravados; total e o total_votes da sessao antes dos contadores deste voto
+    (com with_session_total; senao None).
+    """
+    if not rows:
+        return {}
+    table = Vote.__table__
+    # O compilador nao correlaciona subconsultas do RETURNING com a tabela do
+    # INSERT; a coluna vai qualificada em texto para apontar a linha inserida.
+    total = (
+        counter_expression(
+            VotingSession, literal_column(f"{table.name}.session_id"), "total_votes"
+        )
+        if with_session_total
+        else null()
+    )
+    stmt = (
+        dialect_insert(db, table)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["session_id", "user_id"])
+        .returning(table.c.id, table.c.session_id, table.c.user_id, table.c.voted_at, total)
+    )
+    return {
+        (session_id, user_id): (vote_id, voted_at, session_total)
+        for vote_id, session_id, user_id, voted_at, session_total in db.execute(stmt)
+    }
+
+
+def apply_vote_counters(db: Session, accepted: List[PendingVote]) -> Dict[int, int]:
+    """Aplica um incremento por sessao, proposta e opcao; retorna os totais das sessoes."""
+    per_session = Counter(pending.session_id for pending in accepted)
+    per_proposal = Counter(pending.proposal_id for pending in accepted)
+    per_option: Counter = Counter()
+    for pending in accepted:
+        for option_id, weight in pending.option_weights.items():
+            per_option[(pending.session_id, option_id)] += weight
+
+    # Ordem fixa de linhas para que lotes concorrentes nao entrem em deadlock.
+    totals: Dict[int, Optional[int]] = {}
+    for session_id, delta in sorted(per_session.items()):
+        totals[session_id] = increment_counter(
+            db, VotingSession, session_id, "total_votes", delta
+        )
+    for proposal_id, delta in sorted(per_proposal.items()):
+        increment_counter(db, Proposal, proposal_id, "votes_count", delta)
+    for (session_id, option_id), delta in sorted(per_option.items()):
+        increment_option_tally(db, session_id, option_id, delta)
+    if settings.VOTE_TURNOUT_BUCKETS_ENABLED:
+        increment_turnout_buckets(
+            db,
+            Counter(
+                (
+                    pending.session_id,
+                    bucket_start(pending.voted_at),
+                    pending.user_level or UserLevel.REGISTERED,
+                )
+                for pending in accepted
+            ),
+        )
+
+    # Com contadores fragmentados o total exato exige somar as parcelas.
+    unresolved = [session_id for session_id, total in totals.items() if total is None]
+    if unresolved:
+        totals.update(read_counters(db, VotingSession, unresolved, "total_votes"))
+    return totals
+
+
+def append_vote_leaves(db: Session, accepted: List[PendingVote]) -> Dict[tuple, int]:
+    """
+    Acrescenta os votos aceitos a arvore Merkle de cada sessao; retorna as posicoes.
+
+    Cada sessao e bloqueada (FOR UPDATE) antes do acrescimo; sessoes ja
+    seladas no encerramento sao puladas, pois append_missing_leaves ja
+    incluiu esses votos.
+    """
+    by_session: Dict[int, List[PendingVote]] = {}
+    for pending in accepted:
+        by_session.setdefault(pending.session_id, []).append(pending)
+
+    positions: Dict[tuple, int] = {}
+    # Ordem fixa de sessoes para que lotes concorrentes nao se bloqueiem mutuamente.
+    for session_id in sorted(by_session):
+        sealed = (
+            db.query(VotingSession.merkle_root)
+            .filter(VotingSession.id == session_id)
+            .with_for_update()
+            .scalar()
+        )
+        if sealed is not None:
+            continue
+        pendings = by_session[session_id]
+        first = append_leaves(db, session_id, [pending.vote_hash for pending in pendings])
+        for offset, pending in enumerate(pendings):
+            positions[(session_id, pending.user_id)] = first + offset
+    return positions
+
+
+def append_committed_leaves(
+    db: Session,
+    pending_votes: List[PendingVote],
+    receipts: Dict[tuple, Dict[str, Any]],
+) -> None:
+    """
+    Acrescenta a arvore Merkle os votos ja commitados, em uma transacao curta
+    propria, e preenche merkle_leaf_index nos recibos. Uma falha aqui nao
+    desfaz os votos: eles entram na arvore no encerramento da sessao.
+    """
+    accepted = [
+        pending for pending in pending_votes if (pending.session_id, pending.user_id) in receipts
+    ]
+    if not accepted:
+        return
+    try:
+        positions = append_vote_leaves(db, accepted)
+        db.commit()
+    except Exception as exc:
+        db.rollback()
+        logger.error("Merkle append failed for %s committed votes: %s", len(accepted), exc)
+        return
+    for key, position in positions.items():
+        receipts[key]["merkle_leaf_index"] = position
+
+
+class DeferredVoteWriter(_QueuedWriter):
+    """
+    Escritas dos votos gravados no caminho da requisicao (modo sync e
+    /votes/batch) que nao precisam estar na resposta: contadores (total,
+    proposta, opcoes, comparecimento) e folhas Merkle.
+
+    A cada intervalo a fila vira um incremento por sessao/proposta/opcao e um
+    acrescimo Merkle por sessao, em duas transacoes curtas; as linhas quentes
+    sao bloqueadas uma vez por intervalo, nao uma vez por voto. A fila e do
+    processo: se ele cair, os votos ja commitados ficam sem folha ate o
+    encerramento (append_missing_leaves) e sem contador ate a apuracao final
+    (que recalcula total_votes) ou app/scripts/rebuild_vote_tallies.py.
+    """
+
+    thread_name = "vote-deferred-writer"
+
+    def submit(self, pending_votes: List[PendingVote]) -> None:
+        for pending in pending_votes:
+            self._enqueue(pending)
+
+    def _flush(self, batch: List[PendingVote]) -> None:
+        db = self._session_factory()
+        try:
+            try:
+                apply_vote_counters(db, batch)
+                db.commit()
+            except Exception as exc:
+                db.rollback()
+                logger.error("Deferred vote counters failed for %s votes: %s", len(batch), exc)
+            try:
+                append_vote_leaves(db, batch)
+                db.commit()
+            except Exception as exc:
+                db.rollback()
+                logger.error("Deferred Merkle append failed for %s votes: %s", len(batch), exc)
+        finally:
+            db.close()
+
+
+def defer_vote_writes(
+    pending_votes: List[PendingVote],
+    receipts: Dict[tuple, Dict[str, Any]],
+) -> None:
+    """
+    Agenda contadores e folhas dos votos ja commitados por
+    record_votes(apply_counters=False); a prova e buscada depois pelo recibo.
+    """
+    accepted = [
+        pending for pending in pending_votes if (pending.session_id, pending.user_id) in receipts
+    ]
+    if accepted:
+        get_deferred_vote_writer().submit(accepted)
+
+
+_batcher: Optional[VoteBatcher] = None
+_deferred_writer: Optional[DeferredVoteWriter] = None
+_batcher_lock = threading.Lock()
+
+
+def get_vote_batcher() -> VoteBatcher:
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = VoteBatcher(
+                flush_interval_ms=settings.VOTE_BATCH_FLUSH_MS,
+                max_batch_size=settings.VOTE_BATCH_MAX_SIZE,
+            )
+        return _batcher
+
+
+def shutdown_vote_batcher() -> None:
+    global _batcher
+    with _batcher_lock:
+        batcher, _batcher = _batcher, None
+    if batcher:
+        batcher.stop()
+
+
+def get_deferred_vote_writer() -> DeferredVoteWriter:
+    global _deferred_writer
+    with _batcher_lock:
+        if _deferred_writer is None:
+            _deferred_writer = DeferredVoteWriter(
+                flush_interval_ms=settings.VOTE_DEFERRED_FLUSH_MS,
+                max_batch_size=settings.VOTE_BATCH_MAX_SIZE,
+            )
+        return _deferred_writer
+
+
+def shutdown_deferred_vote_writer() -> None:
+    global _deferred_writer
+    with _batcher_lock:
+        writer, _deferred_writer = _deferred_writer, None
+    if writer:
+        writer.stop()
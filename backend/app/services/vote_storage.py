@@ -0,0 +1,89 @@
+"""
+Formato de armazenamento das cedulas (legado x compacto).
+
+No formato compacto a linha de votes guarda a opcao principal em option_id
+(inteiro com FK), o comprovante como 32 bytes em vote_digest e apenas a parte
+do vote_data que a opcao nao descreve. O voto simples fica sem JSON. Os
+leitores aceitam os dois formatos, entao a conversao pode rodar em lotes com o
+sistema no ar.
+"""
+
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.models.vote import Vote
+
+logger = get_logger("services.vote_storage")
+
+STORAGE_MODES = ("legacy", "compact")
+COMPACT_BATCH_SIZE = 2000
+
+# Chaves que repetem dados de voting_options (id, valor e titulo).
+_REDUNDANT_KEYS = ("option_id", "value", "title", "values")
+
+
+def compact_storage_enabled() -> bool:
+    return settings.VOTE_STORAGE_MODE == "compact"
+
+
+def compact_vote_data(vote_data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Remove do vote_data o que option_id ja descreve; None quando nada sobra."""
+    remaining = {
+        key: value for key, value in (vote_data or {}).items() if key not in _REDUNDANT_KEYS
+    }
+    return remaining or None
+
+
+def ballot_data(vote_data: Optional[Dict[str, Any]], option_id: Optional[int]) -> Dict[str, Any]:
+    """vote_data como a apuracao espera, para linhas legadas ou compactas."""
+    if vote_data:
+        return vote_data
+    return {"option_id": option_id} if option_id is not None else {}
+
+
+def _primary_option_id(vote_data: Dict[str, Any]) -> Optional[int]:
+    if vote_data.get("option_id") is not None:
+        return vote_data["option_id"]
+    if vote_data.get("ranking"):
+        return vote_data["ranking"][0]
+    if vote_data.get("approved"):
+        return vote_data["approved"][0]
+    allocations = vote_data.get("allocations") or {}
+    if allocations:
+        return int(max(allocations, key=lambda option_id: allocations[option_id]))
+    return None
+
+
+def compact_vote_batch(db: Session, after_id: int = 0, batch_size: int = COMPACT_BATCH_SIZE) -> int:
+    """
+    Converte o proximo lote de linhas legadas (id > after_id) para o formato
+    compacto. Nao faz commit; retorna o maior id visto, ou 0 quando acabou.
+    """
+    votes = (
+        db.query(Vote)
+        .filter(Vote.id > after_id, Vote.vote_digest.is_(None), Vote.vote_hash.isnot(None))
+        .order_by(Vote.id)
+        .limit(batch_size)
+        .with_for_update()
+        .all()
+    )
+    for vote in votes:
+        vote_data = vote.vote_data or {}
+        option_id = vote.option_id or _primary_option_id(vote_data)
+        if option_id is None:
+            # Cedula sem opcao identificavel: mantem o texto para nao perder a escolha.
+            vote.vote_digest = bytes.fromhex(vote.vote_hash)
+            vote.vote_hash = None
+            continue
+        vote.option_id = option_id
+        vote.vote_data = compact_vote_data(vote_data)
+        vote.vote_digest = bytes.fromhex(vote.vote_hash)
+        vote.vote_hash = None
+        vote.choice = None
+    db.flush()
+    if votes:
+        logger.info("Compacted %s votes (ids %s..%s)", len(votes), votes[0].id, votes[-1].id)
+    return votes[-1].id if votes else 0
@@ -0,0 +1,299 @@
+import heapq
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal, try_advisory_xact_lock
+from app.core.logging import get_logger
+from app.models.vote import VotingSession, VotingStatus
+from app.services.electorate import snapshot_electorate
+from app.services.session_cache import active_session_cache
+from app.services.tally import finalize_session_result
+
+logger = get_logger("services.voting_scheduler")
+
+# Namespace dos advisory locks de transicao de sessao (pg_try_advisory_xact_lock(ns, id)).
+SESSION_LOCK_NAMESPACE = 7411
+
+OPEN = "open"
+CLOSE = "close"
+
+
+def open_voting_session(db: Session, session_id: int) -> bool:
+    """Ativa uma sessao agendada cujo inicio ja passou. Idempotente; faz commit."""
+    if not try_advisory_xact_lock(db, SESSION_LOCK_NAMESPACE, session_id):
+        db.rollback()
+        return False
+
+    session = db.query(VotingSession).filter(VotingSession.id == session_id).first()
+    now = datetime.utcnow()
+    if (
+        not session
+        or session.status != VotingStatus.SCHEDULED
+        or (session.starts_at and session.starts_at > now)
+    ):
+        db.rollback()
+        return False
+
+    session.status = VotingStatus.ACTIVE
+    snapshot_electorate(db, session)
+    db.add(session)
+    db.commit()
+    active_session_cache.invalidate(session.proposal_id)
+    logger.info("Voting session %s opened", session_id)
+    return True
+
+
+def close_voting_session(db: Session, session_id: int) -> bool:
+    """
+    Encerra uma sessao ativa vencida em duas transacoes: ACTIVE -> TALLYING
+    e commitado antes da apuracao, para que os demais workers deixem de
+    aceitar votos enquanto ela roda; a segunda grava a apuracao final em
+    result_metadata e passa a COMPLETED. Uma sessao que ficou em TALLYING
+    (queda no meio) e retomada pela segunda etapa. Idempotente; faz commit.
+    """
+    if not _begin_tally(db, session_id):
+        return False
+    return _complete_tally(db, session_id)
+
+
+def _locked_session(db: Session, session_id: int) -> Optional[VotingSession]:
+    if not try_advisory_xact_lock(db, SESSION_LOCK_NAMESPACE, session_id):
+        db.rollback()
+        return None
+    return (
+        db.query(VotingSession)
+        .filter(VotingSession.id == session_id)
+        .with_for_update()
+        .first()
+    )
+
+
+def _begin_tally(db: Session, session_id: int) -> bool:
+    session = _locked_session(db, session_id)
+    if session is not None and session.status == VotingStatus.TALLYING:
+        db.rollback()
+        return True
+    now = datetime.utcnow()
+    if (
+        not session
+        or session.status != VotingStatus.ACTIVE
+        or not session.ends_at
+        or session.ends_at > now
+    ):
+        db.rollback()
+        return False
+
+    session.status = VotingStatus.TALLYING
+    db.add(session)
+    db.commit()
+    active_session_cache.invalidate(session.proposal_id)
+    return True
+
+
+def _complete_tally(db: Session, session_id: int) -> bool:
+    session = _locked_session(db, session_id)
+    if not session or session.status != VotingStatus.TALLYING:
+        db.rollback()
+        return False
+
+    result = finalize_session_result(db, session)
+    session.status = VotingStatus.COMPLETED
+    db.add(session)
+    db.commit()
+    logger.info(
+        "Voting session %s closed with %s votes",
+        session_id,
+        result["total_votes"],
+    )
+    return True
+
+
+class VotingScheduler:
+    """
+    Agenda em processo as transicoes das sessoes de votacao.
+
+    Mantem um heap (instante, sessao, transicao) alimentado por `schedule()` e
+    por uma ressincronizacao periodica com o banco, para enxergar sessoes
+    criadas por outros workers. Cada transicao roda sob advisory lock, de modo
+    que apenas um worker a executa.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        resync_seconds: int = 60,
+    ):
+        self._session_factory = session_factory
+        self._resync_seconds = resync_seconds
+        self._heap: List[Tuple[datetime, int, str]] = []
+        self._due: Dict[Tuple[int, str], datetime] = {}
+        self._condition = threading.Condition()
+        self._stopped = True
+        self._thread: Optional[threading.Thread] = None
+        self._next_resync = 0.0
+        self._closing: Set[int] = set()
+
+    def start(self) -> None:
+        with self._condition:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopped = False
+            self._next_resync = 0.0
+            self._thread = threading.Thread(
+                target=self._run, name="voting-scheduler", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join(5)
+        self._thread = None
+
+    def schedule(
+        self,
+        session_id: int,
+        status: VotingStatus,
+        starts_at: Optional[datetime],
+        ends_at: Optional[datetime],
+    ) -> None:
+        """Registra (ou atualiza) as proximas transicoes de uma sessao."""
+        with self._condition:
+            if status == VotingStatus.SCHEDULED and starts_at:
+                self._push(starts_at, session_id, OPEN)
+            if status in (VotingStatus.SCHEDULED, VotingStatus.ACTIVE) and ends_at:
+                self._push(ends_at, session_id, CLOSE)
+            elif status == VotingStatus.TALLYING:
+                # Apuracao interrompida: retoma ja.
+                self._push(ends_at or datetime.utcnow(), session_id, CLOSE)
+            self._condition.notify_all()
+
+    def request_close(self, session_id: int, ends_at: datetime) -> None:
+        """
+        Pede o encerramento de uma sessao ja vencida (fallback das requisicoes
+        de voto). A apuracao nunca roda na sessao de banco da requisicao: vai
+        para o agendador ou, com ele parado, para uma thread com sessao propria.
+        """
+        with self._condition:
+            if not self._stopped:
+                self._push(ends_at, session_id, CLOSE)
+                self._condition.notify_all()
+                return
+            if session_id in self._closing:
+                return
+            self._closing.add(session_id)
+        threading.Thread(
+            target=self._close_detached,
+            args=(session_id,),
+            name=f"voting-close-{session_id}",
+            daemon=True,
+        ).start()
+
+    def _close_detached(self, session_id: int) -> None:
+        try:
+            self._run_transition(session_id, CLOSE)
+        finally:
+            with self._condition:
+                self._closing.discard(session_id)
+
+    def _push(self, due_at: datetime, session_id: int, transition: str) -> None:
+        key = (session_id, transition)
+        if self._due.get(key) == due_at:
+            return
+        self._due[key] = due_at
+        heapq.heappush(self._heap, (due_at, session_id, transition))
+
+    def _pop_due(self) -> List[Tuple[int, str]]:
+        now = datetime.utcnow()
+        due: List[Tuple[int, str]] = []
+        while self._heap and self._heap[0][0] <= now:
+            due_at, session_id, transition = heapq.heappop(self._heap)
+            # Entradas substituidas por um reagendamento sao descartadas.
+            if self._due.get((session_id, transition)) != due_at:
+                continue
+            del self._due[(session_id, transition)]
+            due.append((session_id, transition))
+        return due
+
+    def _wait_timeout(self) -> float:
+        timeout = max(self._next_resync - time.monotonic(), 0.0)
+        if self._heap:
+            until_due = (self._heap[0][0] - datetime.utcnow()).total_seconds()
+            timeout = min(timeout, max(until_due, 0.0))
+        return timeout
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if self._stopped:
+                    return
+                self._condition.wait(self._wait_timeout())
+                if self._stopped:
+                    return
+                due = self._pop_due()
+                resync = time.monotonic() >= self._next_resync
+
+            for session_id, transition in due:
+                self._run_transition(session_id, transition)
+            if resync:
+                self._resync()
+
+    def _run_transition(self, session_id: int, transition: str) -> None:
+        db = self._session_factory()
+        try:
+            if transition == OPEN:
+                open_voting_session(db, session_id)
+            else:
+                close_voting_session(db, session_id)
+        except Exception as exc:
+            db.rollback()
+            logger.error("Voting session %s %s failed: %s", session_id, transition, exc)
+        finally:
+            db.close()
+
+    def _resync(self) -> None:
+        db = self._session_factory()
+        try:
+            rows = (
+                db.query(
+                    VotingSession.id,
+                    VotingSession.status,
+                    VotingSession.starts_at,
+                    VotingSession.ends_at,
+                )
+                .filter(
+                    VotingSession.status.in_(
+                        [VotingStatus.SCHEDULED, VotingStatus.ACTIVE, VotingStatus.TALLYING]
+                    )
+                )
+                .all()
+            )
+        except Exception as exc:
+            logger.error("Voting scheduler resync failed: %s", exc)
+            rows = []
+        finally:
+            db.close()
+
+        for session_id, status, starts_at, ends_at in rows:
+            self.schedule(session_id, status, starts_at, ends_at)
+        with self._condition:
+            self._next_resync = time.monotonic() + self._resync_seconds
+
+
+voting_scheduler = VotingScheduler(resync_seconds=settings.VOTING_SCHEDULER_RESYNC_SECONDS)
+
+
+def start_voting_scheduler() -> None:
+    if settings.VOTING_SCHEDULER_ENABLED:
+        voting_scheduler.start()
+
+
+def stop_voting_scheduler() -> None:
+    voting_scheduler.stop()
@@ -0,0 +1,86 @@
+"""Montagem de dados para os testes, direto pelo ORM (sem passar pela API)."""
+
+import itertools
+import uuid
+from datetime import datetime, timedelta
+
+from app.models.proposal import Proposal, ProposalType
+from app.models.repository import Repository, RepositoryType, RepositoryVisibility
+from app.models.user import User, UserLevel
+from app.models.vote import Vote, VotingMethod, VotingOption, VotingSession, VotingStatus
+
+_sequence = itertools.count(1)
+
+
+def make_user(db, username=None, level=UserLevel.FILIADO, **fields):
+    username = username or f"user{next(_sequence)}"
+    user = User(
+        email=f"{username}@example.org", username=username, level=level, is_active=True, **fields
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+
+def make_session(
+    db,
+    author,
+    method=VotingMethod.SIMPLE,
+    status=VotingStatus.ACTIVE,
+    values=("yes", "no", "abstain"),
+    visibility=RepositoryVisibility.PUBLIC,
+):
+    index = next(_sequence)
+    now = datetime.utcnow()
+    repository = Repository(
+        name=f"Repo {index}",
+        slug=f"repo-{index}",
+        type=list(RepositoryType)[0],
+        visibility=visibility,
+    )
+    proposal = Proposal(
+        number=f"P-{index}",
+        title=f"Proposta {index}",
+        slug=f"proposta-{index}",
+        summary="-",
+        justification="-",
+        full_text="-",
+        type=ProposalType.AMENDMENT,
+        author=author,
+        repository=repository,
+        branch_name=f"proposta-{index}",
+    )
+    session = VotingSession(
+        proposal=proposal,
+        repository=repository,
+        title=f"Votacao {index}",
+        method=method,
+        status=status,
+        starts_at=now - timedelta(hours=1),
+        ends_at=now + timedelta(hours=1),
+    )
+    session.options = [
+        VotingOption(title=value.title(), value=value, order=order)
+        for order, value in enumerate(values)
+    ]
+    db.add(session)
+    db.commit()
+    return session
+
+
+def add_vote(db, session, user, value=None, vote_data=None):
+    """Voto no formato legado; `value` escolhe a opcao principal pelo valor."""
+    option = next((item for item in session.options if item.value == value), None)
+    vote = Vote(
+        session_id=session.id,
+        proposal_id=session.proposal_id,
+        user_id=user.id,
+        choice=value,
+        option_id=option.id if option else None,
+        vote_data=vote_data if vote_data is not None else ({"value": value} if value else None),
+        vote_hash=uuid.uuid4().hex * 2,
+        user_level=user.level,
+    )
+    db.add(vote)
+    db.commit()
+    return vote
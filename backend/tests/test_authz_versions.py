@@ -0,0 +1,48 @@
+"""Mapa user_id -> authz_version usado para aceitar as claims do access token."""
+
+from datetime import datetime, timedelta
+
+from app.models.user import User
+from app.services.principal_cache import AuthzVersionMap
+
+from tests.factories import make_user
+
+
+def _bump(db, user, changed_at):
+    db.query(User).filter(User.id == user.id).update(
+        {User.authz_version: User.authz_version + 1, User.authz_changed_at: changed_at},
+        synchronize_session=False,
+    )
+    db.commit()
+
+
+def test_refresh_reads_only_recently_changed_users(db):
+    changed = make_user(db)
+    stale = make_user(db)
+    versions = AuthzVersionMap(refresh_seconds=0, full_reload_seconds=3600)
+    assert versions.current(db, changed.id) == 0
+
+    _bump(db, changed, datetime.utcnow())
+    # Linha alterada sem tocar authz_changed_at: fora da leitura incremental.
+    _bump(db, stale, datetime.utcnow() - timedelta(days=1))
+
+    assert versions.current(db, changed.id) == 1
+    assert versions.current(db, stale.id) == 0
+
+
+def test_refresh_picks_up_new_users(db):
+    versions = AuthzVersionMap(refresh_seconds=0, full_reload_seconds=3600)
+    versions.refresh(db)
+
+    user = make_user(db)
+    assert versions.current(db, user.id) == 0
+
+
+def test_full_reload_drops_deleted_users(db):
+    user = make_user(db)
+    versions = AuthzVersionMap(refresh_seconds=0, full_reload_seconds=0)
+    assert versions.current(db, user.id) == 0
+
+    db.delete(user)
+    db.commit()
+    assert versions.current(db, user.id) is None
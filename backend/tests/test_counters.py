@@ -0,0 +1,39 @@
+from app.core.config import settings
+from app.models.repository import Repository, RepositoryType
+from app.services.counters import fold_counters, increment_counter, read_counters
+
+
+def _repository(db, proposals_count):
+    repository = Repository(
+        name="Repo", slug="repo", type=list(RepositoryType)[0], proposals_count=proposals_count
+    )
+    db.add(repository)
+    db.commit()
+    return repository.id
+
+
+def _proposals_count(db, repository_id):
+    return read_counters(db, Repository, [repository_id], "proposals_count")[repository_id]
+
+
+def test_canonical_decrement_stops_at_floor(db, monkeypatch):
+    monkeypatch.setattr(settings, "COUNTER_SHARDS", 1)
+    repository_id = _repository(db, 1)
+
+    assert increment_counter(db, Repository, repository_id, "proposals_count", -1, floor=0) == 0
+    assert increment_counter(db, Repository, repository_id, "proposals_count", -1, floor=0) is None
+    db.commit()
+
+    assert _proposals_count(db, repository_id) == 0
+
+
+def test_fold_never_leaves_sharded_counter_negative(db, monkeypatch):
+    monkeypatch.setattr(settings, "COUNTER_SHARDS", 4)
+    repository_id = _repository(db, 1)
+
+    for _ in range(3):
+        increment_counter(db, Repository, repository_id, "proposals_count", -1, floor=0)
+    fold_counters(db)
+    db.commit()
+
+    assert _proposals_count(db, repository_id) == 0
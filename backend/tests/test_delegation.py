@@ -0,0 +1,73 @@
+"""Resolucao de delegacoes de voto (democracia liquida)."""
+
+from app.core.config import settings
+from app.models.delegation import VoteDelegation
+from app.models.user import UserLevel
+from app.services.delegation import DelegationGraph, delegation_summary, resolve_session_weights
+
+from tests.factories import add_vote, make_session, make_user
+
+
+def test_chain_is_represented_by_the_first_direct_voter():
+    # 1 -> 2 -> 3 -> 4; 5 -> 3
+    graph = DelegationGraph({1: 2, 2: 3, 3: 4, 5: 3})
+
+    assert graph.add_direct_vote(4) == 5
+    assert graph.owner[1] == 4
+
+    # O voto direto de 2 destaca apenas a subarvore dele (1 e 2).
+    assert graph.add_direct_vote(2) == 2
+    assert graph.weight == {4: 3, 2: 2}
+    assert graph.owner[1] == 2
+    assert graph.owner[5] == 4
+
+    # Voto repetido nao muda os pesos.
+    assert graph.add_direct_vote(2) == 2
+    assert delegation_summary(graph.weight) == {
+        "direct_votes": 2,
+        "delegated_votes": 3,
+        "weighted_total": 5,
+    }
+
+
+def test_cycles_without_a_voter_are_not_represented():
+    graph = DelegationGraph({1: 2, 2: 3, 3: 1, 4: 1, 6: 7})
+
+    assert graph.find_cycles() == [[1, 2, 3]]
+    assert graph.would_create_cycle(7, 6)
+    assert not graph.would_create_cycle(7, 5)
+
+    graph.add_direct_vote(7)
+    assert graph.weight == {7: 2}
+    assert 4 not in graph.owner
+
+    # Um voto dentro do ciclo representa o restante dele e quem aponta para ele.
+    assert graph.add_direct_vote(2) == 4
+
+
+def test_session_weights_skip_ineligible_delegators(db, monkeypatch):
+    monkeypatch.setattr(settings, "VOTE_DELEGATION_ENABLED", True)
+    author = make_user(db)
+    session = make_session(db, author)
+    delegate = make_user(db)
+    delegator = make_user(db)
+    outsider = make_user(db, level=UserLevel.REGISTERED)
+    repository_id = session.repository_id
+    db.add_all(
+        [
+            VoteDelegation(
+                repository_id=repository_id, delegator_id=delegator.id, delegate_id=delegate.id
+            ),
+            VoteDelegation(
+                repository_id=repository_id, delegator_id=outsider.id, delegate_id=delegate.id
+            ),
+        ]
+    )
+    db.commit()
+    add_vote(db, session, delegate, "yes")
+    add_vote(db, session, author, "no")
+
+    assert resolve_session_weights(db, session) == {delegate.id: 2, author.id: 1}
+
+    monkeypatch.setattr(settings, "VOTE_DELEGATION_ENABLED", False)
+    assert resolve_session_weights(db, session) is None
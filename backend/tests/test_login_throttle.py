@@ -0,0 +1,71 @@
+import httpx
+import pytest
+
+from app.core import security
+from app.core.config import settings
+from app.models.user import User, UserLevel
+from app.services.login_throttle import LoginThrottle, MemoryBucketStore, RedisBucketStore
+
+
+def _install_throttle(monkeypatch, store):
+    monkeypatch.setattr(settings, "LOGIN_THROTTLE_ENABLED", True)
+    monkeypatch.setattr(settings, "LOGIN_THROTTLE_USER_BURST", 3)
+    monkeypatch.setattr(settings, "LOGIN_THROTTLE_USER_PER_MINUTE", 1.0)
+    monkeypatch.setattr(settings, "LOGIN_THROTTLE_FAILURE_COST", 1.0)
+    throttle = LoginThrottle(store)
+    monkeypatch.setattr("app.api.v1.endpoints.auth.login_throttle", throttle)
+    return throttle
+
+
+@pytest.fixture
+def redis_throttle(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # o fakeredis so executa Lua com o lupa
+    return _install_throttle(monkeypatch, RedisBucketStore(fakeredis.aioredis.FakeRedis()))
+
+
+@pytest.fixture
+def memory_throttle(monkeypatch):
+    return _install_throttle(monkeypatch, MemoryBucketStore())
+
+
+@pytest.mark.asyncio
+async def test_failed_logins_drain_redis_bucket(api, redis_throttle):
+    # Um unico event loop: o cliente redis.asyncio fica preso ao loop em que conectou.
+    async with httpx.AsyncClient(app=api, base_url="http://testserver") as client:
+
+        async def login(username):
+            return await client.post(
+                "/api/v1/auth/login", data={"username": username, "password": "wrong-password"}
+            )
+
+        for _ in range(settings.LOGIN_THROTTLE_USER_BURST):
+            assert (await login("ghost")).status_code == 401
+
+        response = await login("ghost")
+        assert response.status_code == 429
+        assert 0 < int(response.headers["Retry-After"]) <= 60
+
+        # O bucket e por username: outro nome no mesmo IP ainda passa.
+        assert (await login("someone-else")).status_code == 401
+
+
+def test_inactive_user_attempts_are_throttled(db, client, memory_throttle):
+    db.add(
+        User(
+            email="inactive@example.org",
+            username="inactive",
+            hashed_password=security.hash_password("password123"),
+            level=UserLevel.FILIADO,
+            is_active=False,
+        )
+    )
+    db.commit()
+
+    form = {"username": "inactive", "password": "password123"}
+    for _ in range(settings.LOGIN_THROTTLE_USER_BURST):
+        assert client.post("/api/v1/auth/login", data=form).status_code == 400
+
+    response = client.post("/api/v1/auth/login", data=form)
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
@@ -0,0 +1,60 @@
+import hashlib
+
+from app.models.vote import VotingSession
+from app.services.merkle import (
+    append_leaves,
+    compute_root,
+    inclusion_proof,
+    leaf_hash,
+    node_hash,
+    verify_inclusion,
+)
+
+from tests.factories import make_session, make_user
+
+
+def _reference_root(hashes):
+    """MTH da RFC 6962, recursivo, sobre os vote_hash."""
+    if len(hashes) == 1:
+        return leaf_hash(hashes[0])
+    split = 1 << ((len(hashes) - 1).bit_length() - 1)
+    return node_hash(_reference_root(hashes[:split]), _reference_root(hashes[split:]))
+
+
+def _hashes(count):
+    return [hashlib.sha256(str(index).encode()).hexdigest() for index in range(count)]
+
+
+def test_roots_and_proofs_match_reference_across_batches(db):
+    session = make_session(db, make_user(db))
+    hashes = _hashes(11)
+
+    appended = []
+    for batch in ([hashes[0]], hashes[1:4], hashes[4:5], hashes[5:11]):
+        first = append_leaves(db, session.id, batch)
+        db.commit()
+        assert first == len(appended)
+        appended.extend(batch)
+
+    for size in range(1, len(hashes) + 1):
+        root = compute_root(db, session.id, size)
+        assert root == _reference_root(hashes[:size])
+        for index in range(size):
+            path = inclusion_proof(db, session.id, index, size)
+            assert verify_inclusion(hashes[index], index, size, path, root)
+
+    assert db.get(VotingSession, session.id).merkle_leaf_count == len(hashes)
+
+
+def test_verify_rejects_wrong_leaf_and_index(db):
+    session = make_session(db, make_user(db))
+    hashes = _hashes(6)
+    append_leaves(db, session.id, hashes)
+    db.commit()
+
+    root = compute_root(db, session.id, 6)
+    path = inclusion_proof(db, session.id, 2, 6)
+    assert verify_inclusion(hashes[2], 2, 6, path, root)
+    assert not verify_inclusion(hashes[3], 2, 6, path, root)
+    assert not verify_inclusion(hashes[2], 3, 6, path, root)
+    assert not verify_inclusion(hashes[2], 6, 6, path, root)
@@ -0,0 +1,91 @@
+from app.models.delegation import VoteDelegation
+from app.models.user import UserLevel
+from app.models.vote import VotingMethod, VotingStatus
+from app.services.tally import finalize_session_result, level_breakdown
+from tests.factories import add_vote, make_session, make_user
+
+
+def _assert_levels_match_options(result):
+    by_level = result["by_level"]
+    assert sum(level["votes"] for level in by_level.values()) == result["total_votes"]
+    for option in result["options"]:
+        key = (option["value"] or option["title"]).lower()
+        level_total = sum(level["option_votes"].get(key, 0) for level in by_level.values())
+        assert level_total == option["votes"], key
+
+
+def _tallying_session(db, method, values=("a", "b", "c")):
+    session = make_session(db, make_user(db), method, VotingStatus.TALLYING, values)
+    return session, [option.id for option in session.options]
+
+
+def test_approval_levels_count_every_approved_option(db):
+    session, (a, b, c) = _tallying_session(db, VotingMethod.APPROVAL)
+    for level, approved in [
+        (UserLevel.FILIADO, [a, b]),
+        (UserLevel.FILIADO, [a, b, c]),
+        (UserLevel.SPECIAL, [a]),
+        (UserLevel.SPECIAL, [a, c]),
+    ]:
+        add_vote(db, session, make_user(db, level=level), vote_data={"approved": approved})
+
+    result = finalize_session_result(db, session)
+
+    assert result["by_level"]["FILIADO"]["option_votes"] == {"a": 2, "b": 2, "c": 1}
+    _assert_levels_match_options(result)
+
+
+def test_quadratic_levels_use_allocated_votes(db):
+    session, (a, b, c) = _tallying_session(db, VotingMethod.QUADRATIC)
+    for level in (UserLevel.FILIADO, UserLevel.SPECIAL):
+        allocations = {str(a): 4, str(b): 4, str(c): 4}
+        add_vote(db, session, make_user(db, level=level), vote_data={"allocations": allocations})
+    # Cedula acima do orcamento: invalida, nao entra em nenhum total.
+    over_budget = {"allocations": {str(a): 20}}
+    add_vote(db, session, make_user(db, level=UserLevel.FILIADO), vote_data=over_budget)
+
+    result = finalize_session_result(db, session)
+
+    assert result["by_level"]["SPECIAL"]["option_votes"] == {"a": 4, "b": 4, "c": 4}
+    _assert_levels_match_options(result)
+
+
+def test_ranked_levels_follow_final_round(db):
+    session, (a, b, c) = _tallying_session(db, VotingMethod.RANKED)
+    for level, ranking in [
+        (UserLevel.FILIADO, [a]),
+        (UserLevel.FILIADO, [a]),
+        (UserLevel.SPECIAL, [b]),
+        (UserLevel.SPECIAL, [b]),
+        (UserLevel.SPECIAL, [c, b]),
+    ]:
+        add_vote(db, session, make_user(db, level=level), vote_data={"ranking": ranking})
+
+    result = finalize_session_result(db, session)
+
+    assert result["winner_option_id"] == b
+    assert result["by_level"]["SPECIAL"]["option_votes"] == {"b": 3}
+    _assert_levels_match_options(result)
+
+
+def test_simple_levels_apply_delegated_weight(db):
+    session = make_session(db, make_user(db), status=VotingStatus.TALLYING)
+    delegate = make_user(db, level=UserLevel.SPECIAL)
+    for _ in range(2):
+        delegator = make_user(db, level=UserLevel.FILIADO)
+        db.add(
+            VoteDelegation(
+                repository_id=session.repository_id,
+                delegator_id=delegator.id,
+                delegate_id=delegate.id,
+            )
+        )
+    db.commit()
+    add_vote(db, session, delegate, "yes")
+    add_vote(db, session, make_user(db, level=UserLevel.FILIADO), "no")
+
+    result = finalize_session_result(db, session)
+
+    assert result["by_level"]["SPECIAL"] == {"votes": 1, "option_votes": {"yes": 3}}
+    _assert_levels_match_options(result)
+    assert level_breakdown(db, session) == result["by_level"]
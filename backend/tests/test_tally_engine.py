@@ -0,0 +1,60 @@
+import numpy as np
+
+from app.models.vote import VotingMethod, VotingStatus
+from app.services import tally_engine
+from tests.factories import add_vote, make_session, make_user
+
+
+def _option_ids(session):
+    return [option.id for option in session.options]
+
+
+def test_option_positions_with_trailing_empty_ballots():
+    lengths = np.array([2, 0, 0])
+    flat = np.array([1, 2])
+
+    rows, columns, positions = tally_engine._option_positions(lengths, flat, [1, 2])
+
+    assert rows.tolist() == [0, 0]
+    assert columns.tolist() == [0, 1]
+    assert positions.tolist() == [0, 1]
+
+
+def test_option_positions_skip_unknown_ids():
+    lengths = np.array([3, 1])
+    flat = np.array([9, 2, 1, 1])
+
+    rows, columns, positions = tally_engine._option_positions(lengths, flat, [1, 2])
+
+    assert rows.tolist() == [0, 0, 1]
+    assert columns.tolist() == [0, 1, 0]
+    assert positions.tolist() == [1, 0, 0]
+
+
+def test_ranked_tally_with_blank_last_ballot(db):
+    author = make_user(db)
+    session = make_session(db, author, VotingMethod.RANKED, VotingStatus.TALLYING, ("a", "b", "c"))
+    a, b, c = _option_ids(session)
+    add_vote(db, session, make_user(db), vote_data={"ranking": [a, b]})
+    add_vote(db, session, make_user(db), vote_data={"ranking": [b, c, a]})
+    add_vote(db, session, make_user(db), vote_data={"ranking": [a]})
+    add_vote(db, session, make_user(db), vote_data={"ranking": []})
+
+    ranks = tally_engine.load_ranked_ballots(db, session.id, [a, b, c])
+    assert ranks.tolist() == [[0, 1, -1], [1, 2, 0], [0, -1, -1], [-1, -1, -1]]
+
+    result = tally_engine.tally_session(db, session)
+    assert result["winner_option_id"] == a
+
+
+def test_approval_tally_with_blank_last_ballot(db):
+    author = make_user(db)
+    session = make_session(db, author, VotingMethod.APPROVAL, VotingStatus.TALLYING, ("a", "b"))
+    a, b = _option_ids(session)
+    add_vote(db, session, make_user(db), vote_data={"approved": [a, b]})
+    add_vote(db, session, make_user(db), vote_data={"approved": [a]})
+    add_vote(db, session, make_user(db), vote_data={"approved": []})
+
+    approvals = tally_engine.load_approval_ballots(db, session.id, [a, b])
+    assert approvals.tolist() == [[True, True], [True, False], [False, False]]
+    assert tally_engine.tally_session(db, session)["winner_option_id"] == a
@@ -0,0 +1,28 @@
+"""Revogacao de tokens por jti."""
+
+from datetime import datetime, timedelta
+
+from app.models.token import RevokedToken
+from app.services.token_revocation import TokenRevocationList
+
+
+def _payload(jti):
+    expires_at = datetime.utcnow() + timedelta(minutes=30)
+    return {"jti": jti, "sub": "1", "type": "access", "exp": int(expires_at.timestamp())}
+
+
+def test_revoking_the_same_jti_twice_is_a_noop(db, SessionLocal):
+    revocations = TokenRevocationList(sync_seconds=0, capacity=100, error_rate=0.01)
+
+    # A segunda revogacao ainda nao enxerga a primeira (mesma situacao de dois
+    # logouts concorrentes): o INSERT com ON CONFLICT nao pode falhar.
+    other = SessionLocal()
+    assert revocations.revoke(db, _payload("abc"))
+    assert revocations.revoke(other, _payload("abc"))
+    db.commit()
+    other.commit()
+    other.close()
+
+    assert db.query(RevokedToken).filter(RevokedToken.jti == "abc").count() == 1
+    assert revocations.is_revoked(db, "abc")
+    assert not revocations.is_revoked(db, "outro")
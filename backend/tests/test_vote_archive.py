@@ -0,0 +1,40 @@
+"""Arquivamento de votos de sessoes encerradas."""
+
+from app.models.vote import VoteArchiveBatch, VotingStatus
+from app.services import vote_archive
+from app.services.tally import finalize_session_result
+from app.services.vote_archive import archive_next_chunk, find_archived_vote, iter_archived_votes
+
+from tests.factories import add_vote, make_session, make_user
+
+
+def _archived_session(db, author, voters, chunk_size):
+    session = make_session(db, author)
+    for index in range(voters):
+        add_vote(db, session, make_user(db), "yes" if index % 2 else "no")
+    finalize_session_result(db, session)
+    session.status = VotingStatus.COMPLETED
+    db.commit()
+    while archive_next_chunk(db, session.id, chunk_size=chunk_size):
+        pass
+    db.commit()
+    return session
+
+
+def test_find_archived_vote_decodes_a_single_batch(db, monkeypatch):
+    author = make_user(db)
+    session = _archived_session(db, author, voters=7, chunk_size=3)
+    assert db.query(VoteArchiveBatch).filter_by(session_id=session.id).count() == 3
+    last_row = list(iter_archived_votes(db, session_id=session.id))[-1]
+
+    decoded = []
+    decode_batch = vote_archive.decode_batch
+    monkeypatch.setattr(
+        vote_archive, "decode_batch", lambda batch: decoded.append(batch.id) or decode_batch(batch)
+    )
+
+    assert find_archived_vote(db, session.id, last_row["user_id"]) == last_row
+    assert len(decoded) == 1
+
+    assert find_archived_vote(db, session.id, author.id) is None
+    assert len(decoded) == 1
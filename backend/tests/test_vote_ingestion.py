@@ -0,0 +1,129 @@
+import uuid
+
+import pytest
+
+from app.core.config import settings
+from app.models.turnout import VoteTurnoutBucket
+from app.models.user import User, UserLevel
+from app.models.vote import VoteMerkleNode, VotingOptionTally, VotingSession
+from app.services.counters import read_counters
+from app.services.merkle import compute_root, find_leaf, inclusion_proof, verify_inclusion
+from app.services.tally import get_option_tallies
+from app.services.turnout import get_turnout_series, rebuild_turnout_buckets
+from app.services.vote_ingestion import DeferredVoteWriter, PendingVote, VoteBatcher, record_votes
+
+from tests.factories import make_session, make_user
+
+
+def _pending(session, user, value):
+    option = next(item for item in session.options if item.value == value)
+    return PendingVote(
+        session_id=session.id,
+        proposal_id=session.proposal_id,
+        user_id=user.id,
+        option_id=option.id,
+        choice=option.value,
+        vote_data={"option_id": option.id, "value": option.value},
+        vote_hash=uuid.uuid4().hex * 2,
+        user_level=user.level,
+    )
+
+
+def _cast(db, session, choices):
+    pendings = []
+    for value in choices:
+        pending = _pending(session, make_user(db), value)
+        record_votes(db, [pending])
+        db.commit()
+        pendings.append(pending)
+    return pendings
+
+
+def test_sharded_option_tallies_and_turnout_sum_to_the_votes(db, monkeypatch):
+    monkeypatch.setattr(settings, "COUNTER_SHARDS", 4)
+    monkeypatch.setattr(settings, "VOTE_TURNOUT_BUCKETS_ENABLED", True)
+    session = make_session(db, make_user(db))
+
+    _cast(db, session, ["yes"] * 30 + ["no"] * 10)
+
+    assert get_option_tallies(db, [session.id])[session.id] == {"yes": 30, "no": 10, "abstain": 0}
+    shards = {shard for (shard,) in db.query(VotingOptionTally.shard)}
+    assert len(shards) > 1
+    assert read_counters(db, VotingSession, [session.id], "total_votes") == {session.id: 40}
+    assert get_turnout_series(db, session)["total_votes"] == 40
+
+
+def test_turnout_without_buckets_reads_the_votes(db, monkeypatch):
+    monkeypatch.setattr(settings, "VOTE_TURNOUT_BUCKETS_ENABLED", False)
+    session = make_session(db, make_user(db))
+
+    _cast(db, session, ["yes", "no", "yes"])
+
+    series = get_turnout_series(db, session)
+    assert series["total_votes"] == 3
+    assert series["by_level"] == {"FILIADO": 3}
+
+
+def test_turnout_keeps_the_level_the_voter_had_when_voting(db, monkeypatch):
+    monkeypatch.setattr(settings, "VOTE_TURNOUT_BUCKETS_ENABLED", False)
+    session = make_session(db, make_user(db))
+    pending = _cast(db, session, ["yes"])[0]
+
+    db.query(User).filter(User.id == pending.user_id).update({User.level: UserLevel.REGISTERED})
+    db.commit()
+    rebuild_turnout_buckets(db, [session.id])
+
+    assert get_turnout_series(db, session)["by_level"] == {"FILIADO": 1}
+    assert [level for (level,) in db.query(VoteTurnoutBucket.user_level)] == [UserLevel.FILIADO]
+
+
+def test_deferred_writer_appends_committed_votes(db, SessionLocal):
+    session = make_session(db, make_user(db))
+    pendings = _cast(db, session, ["yes", "no", "abstain", "yes", "no"])
+    assert db.query(VoteMerkleNode).count() == 0
+
+    writer = DeferredVoteWriter(session_factory=SessionLocal, flush_interval_ms=1)
+    writer.submit(pendings[:2])
+    writer.submit(pendings[2:])
+    writer.stop()
+
+    db.expire_all()
+    tree_size = db.get(VotingSession, session.id).merkle_leaf_count
+    assert tree_size == len(pendings)
+    root = compute_root(db, session.id, tree_size)
+    for pending in pendings:
+        index = find_leaf(db, session.id, pending.vote_hash)
+        path = inclusion_proof(db, session.id, index, tree_size)
+        assert verify_inclusion(pending.vote_hash, index, tree_size, path, root)
+
+
+def test_deferred_writer_skips_sealed_sessions(db, SessionLocal):
+    session = make_session(db, make_user(db))
+    pendings = _cast(db, session, ["yes"])
+    session.merkle_root = "00" * 32
+    db.commit()
+
+    writer = DeferredVoteWriter(session_factory=SessionLocal, flush_interval_ms=1)
+    writer.submit(pendings)
+    writer.stop()
+
+    db.expire_all()
+    assert db.get(VotingSession, session.id).merkle_leaf_count == 0
+
+
+def test_batcher_isolates_a_failing_vote(db, SessionLocal):
+    session = make_session(db, make_user(db))
+    good = [_pending(session, make_user(db), "yes") for _ in range(2)]
+    bad = _pending(session, make_user(db), "no")
+    bad.vote_data = {"value": object()}  # nao serializa: derruba o INSERT do lote
+
+    batcher = VoteBatcher(session_factory=SessionLocal, flush_interval_ms=200)
+    futures = [batcher.submit(pending) for pending in (good[0], bad, good[1])]
+    batcher.stop()
+
+    assert futures[0].result(timeout=1)["total_votes"] == 1
+    assert futures[2].result(timeout=1)["total_votes"] == 2
+    with pytest.raises(Exception):
+        futures[1].result(timeout=1)
+    db.expire_all()
+    assert db.get(VotingSession, session.id).total_votes == 2
@@ -0,0 +1,112 @@
+from concurrent.futures import Future
+
+import pytest
+from sqlalchemy import event
+
+from app.api import deps
+from app.api.v1.endpoints import votes as votes_endpoint
+from app.core.config import settings
+from app.main import app as fastapi_app
+from app.models.proposal import ProposalStatus
+from app.models.vote import VotingSession
+from app.services import vote_ingestion
+from app.services.principal_cache import Principal
+from app.services.session_cache import active_session_cache
+from app.services.tally import get_option_tallies
+
+from tests.factories import make_session, make_user
+
+
+@pytest.fixture
+def deferred_writer(SessionLocal, monkeypatch):
+    # Intervalo longo: nada e gravado ate stop(), que drena a fila.
+    writer = vote_ingestion.DeferredVoteWriter(
+        session_factory=SessionLocal, flush_interval_ms=60_000
+    )
+    monkeypatch.setattr(vote_ingestion, "_deferred_writer", writer)
+    yield writer
+    writer.stop()
+
+
+@pytest.fixture
+def voting_session(db, monkeypatch):
+    monkeypatch.setattr(settings, "VOTE_INGESTION_MODE", "sync")
+    active_session_cache.clear()
+    session = make_session(db, make_user(db))
+    session.proposal.status = ProposalStatus.VOTING
+    db.commit()
+    yield session
+    active_session_cache.clear()
+
+
+def _voter(db):
+    user = make_user(db)
+    return Principal(user.id, user.username, user.level, True, False, True)
+
+
+def _vote(client, proposal_id, principal, option):
+    fastapi_app.dependency_overrides[deps.get_current_active_principal] = lambda: principal
+    return client.post(f"/api/v1/votes/proposals/{proposal_id}/vote", json={"option": option})
+
+
+def test_sync_vote_is_a_single_insert(engine, db, client, voting_session, deferred_writer):
+    proposal_id = voting_session.proposal_id
+    assert _vote(client, proposal_id, _voter(db), "yes").status_code == 200
+    deferred_writer.stop()
+    voter = _voter(db)
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split(None, 1)[0].upper())
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = _vote(client, proposal_id, voter, "no")
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert response.status_code == 200, response.text
+    assert statements == ["SELECT", "INSERT"], statements
+    assert response.json()["total_votes"] == 2
+
+    deferred_writer.stop()
+    db.expire_all()
+    stored = db.get(VotingSession, voting_session.id)
+    assert stored.total_votes == 2
+    assert stored.merkle_leaf_count == 2
+    assert get_option_tallies(db, [voting_session.id])[voting_session.id] == {
+        "yes": 1,
+        "no": 1,
+        "abstain": 0,
+    }
+
+
+def test_sync_duplicate_vote_is_rejected(db, client, voting_session, deferred_writer):
+    voter = _voter(db)
+    proposal_id = voting_session.proposal_id
+    assert _vote(client, proposal_id, voter, "yes").status_code == 200
+    assert _vote(client, proposal_id, voter, "no").status_code == 400
+
+    deferred_writer.stop()
+    db.expire_all()
+    assert db.get(VotingSession, voting_session.id).total_votes == 1
+
+
+class _StalledBatcher:
+    def submit(self, pending):
+        return Future()
+
+
+def test_batched_vote_timeout_returns_the_receipt(db, client, voting_session, monkeypatch):
+    monkeypatch.setattr(settings, "VOTE_INGESTION_MODE", "batched")
+    monkeypatch.setattr(settings, "VOTE_BATCH_RECEIPT_TIMEOUT_SECONDS", 0.01)
+    monkeypatch.setattr(votes_endpoint, "get_vote_batcher", lambda: _StalledBatcher())
+
+    response = _vote(client, voting_session.proposal_id, _voter(db), "yes")
+
+    assert response.status_code == 202
+    receipt = response.json()["receipt"]
+    assert response.headers["location"] == (
+        f"/api/v1/voting/sessions/{voting_session.id}/proof?receipt={receipt}"
+    )
@@ -0,0 +1,44 @@
+from sqlalchemy import event
+
+from app.api import deps
+from app.main import app as fastapi_app
+from app.services.principal_cache import Principal
+from tests.factories import add_vote, make_session, make_user
+
+
+def _open_session(db, author):
+    session = make_session(db, author)
+    add_vote(db, session, author, "yes")
+
+
+def _count_statements(engine, client):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        response = client.get("/api/v1/voting/sessions/active")
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    assert response.status_code == 200, response.text
+    return len(statements), response.json()
+
+
+def test_list_active_sessions_query_count_is_constant(engine, db, client):
+    author = make_user(db, "voter")
+    principal = Principal(author.id, author.username, author.level, True, False, True)
+    fastapi_app.dependency_overrides[deps.get_current_active_principal] = lambda: principal
+
+    _open_session(db, author)
+    single_count, single = _count_statements(engine, client)
+
+    for _ in range(5):
+        _open_session(db, author)
+    many_count, many = _count_statements(engine, client)
+
+    assert len(single) == 1
+    assert len(many) == 6
+    assert all(item["user_state"]["has_voted"] for item in many)
+    assert many_count == single_count
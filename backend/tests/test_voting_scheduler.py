@@ -0,0 +1,49 @@
+"""Transicoes de sessao feitas pelo agendador."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.vote import VotingStatus
+from app.services import voting_scheduler
+from app.services.voting_scheduler import close_voting_session
+
+from tests.factories import add_vote, make_session, make_user
+
+
+@pytest.fixture
+def expired_session(db):
+    author = make_user(db)
+    session = make_session(db, author)
+    add_vote(db, session, author, "yes")
+    session.ends_at = datetime.utcnow() - timedelta(minutes=1)
+    db.commit()
+    return session
+
+
+def failing_tally(db, session):
+    raise RuntimeError("apuracao interrompida")
+
+
+def test_tallying_is_committed_before_the_tally(db, expired_session, monkeypatch):
+    monkeypatch.setattr(voting_scheduler, "finalize_session_result", failing_tally)
+    with pytest.raises(RuntimeError):
+        close_voting_session(db, expired_session.id)
+    db.rollback()
+
+    db.refresh(expired_session)
+    assert expired_session.status == VotingStatus.TALLYING
+
+
+def test_interrupted_tally_is_resumed(db, expired_session, monkeypatch):
+    monkeypatch.setattr(voting_scheduler, "finalize_session_result", failing_tally)
+    with pytest.raises(RuntimeError):
+        close_voting_session(db, expired_session.id)
+    db.rollback()
+    monkeypatch.undo()
+
+    assert close_voting_session(db, expired_session.id)
+    db.refresh(expired_session)
+    assert expired_session.status == VotingStatus.COMPLETED
+    assert expired_session.total_votes == 1
+    assert not close_voting_session(db, expired_session.id)
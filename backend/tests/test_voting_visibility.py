@@ -0,0 +1,85 @@
+"""Visibilidade do repositorio nos endpoints de votacao fora do CRUD."""
+
+import pytest
+
+from app.api.v1.endpoints import voting
+from app.core import security
+from app.models.repository import RepositoryVisibility
+from app.models.user import UserLevel
+from app.models.vote import VotingStatus
+from app.services.merkle import append_leaves, verify_inclusion
+from app.services.principal_cache import principal_cache
+
+from tests.factories import add_vote, make_session, make_user
+
+
+@pytest.fixture(autouse=True)
+def fresh_principals():
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
+
+@pytest.fixture
+def stream_db(SessionLocal, monkeypatch):
+    # O stream abre sua propria sessao curta, fora do get_db.
+    monkeypatch.setattr(voting, "SessionLocal", SessionLocal)
+
+
+def _auth(user):
+    return {"Authorization": f"Bearer {security.create_access_token({'sub': str(user.id)})}"}
+
+
+def test_stream_hides_affiliates_only_session(client, db, stream_db):
+    author = make_user(db)
+    outsider = make_user(db, level=UserLevel.REGISTERED)
+    session = make_session(db, author, visibility=RepositoryVisibility.AFFILIATES_ONLY)
+
+    response = client.get(f"/api/v1/voting/sessions/{session.id}/stream", headers=_auth(outsider))
+    assert response.status_code == 404
+
+
+def test_stream_checks_status_after_visibility(client, db, stream_db):
+    author = make_user(db)
+    session = make_session(
+        db,
+        author,
+        status=VotingStatus.COMPLETED,
+        visibility=RepositoryVisibility.AFFILIATES_ONLY,
+    )
+
+    response = client.get(f"/api/v1/voting/sessions/{session.id}/stream", headers=_auth(author))
+    assert response.status_code == 400
+
+
+def test_stream_requires_token(client, db, stream_db):
+    session = make_session(db, make_user(db))
+
+    response = client.get(f"/api/v1/voting/sessions/{session.id}/stream")
+    assert response.status_code == 401
+
+
+def _proof_for(client, session, user, receipt):
+    return client.get(
+        f"/api/v1/voting/sessions/{session.id}/proof",
+        params={"receipt": receipt},
+        headers=_auth(user),
+    )
+
+
+def test_proof_hides_affiliates_only_session(client, db):
+    author = make_user(db)
+    outsider = make_user(db, level=UserLevel.REGISTERED)
+    session = make_session(db, author, visibility=RepositoryVisibility.AFFILIATES_ONLY)
+    receipt = add_vote(db, session, author, "yes").receipt
+    append_leaves(db, session.id, [receipt])
+    db.commit()
+
+    assert _proof_for(client, session, outsider, receipt).status_code == 404
+
+    response = _proof_for(client, session, author, receipt)
+    assert response.status_code == 200
+    proof = response.json()
+    assert verify_inclusion(
+        receipt, proof["leaf_index"], proof["tree_size"], proof["audit_path"], proof["root"]
+    )